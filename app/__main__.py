@@ -0,0 +1,182 @@
+"""
+Compares two files side by side, or two directory trees.
+
+Usage: python -m app LEFT RIGHT [--diff-engine NAME] [--language NAME] [--encoding NAME]
+                                [--ignore-whitespace] [--ignore-case]
+                                [--format {gui,unified,json}] [--context N] [--tokens]
+                                [--cache-dir DIR | --no-cache]
+                                [--trace FILE] [--trace-slow MS] [--overlay]
+
+Either file may be "-" to read standard input. With --format unified or json
+the differences are written to standard output without starting Qt, and the
+exit status is 1 if the files differ, as for diff(1).
+
+Diff results are cached on disk, so comparing the same files again skips the diff;
+the least recently used ones are deleted once the cache exceeds 256 MB.
+
+--trace writes the timings of diffing, highlighting and painting as a Chrome
+trace file (chrome://tracing, Perfetto), --trace-slow logs the slower calls,
+and --overlay shows the recent timings over the window.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Optional, TextIO
+
+from app.app_logger import logger
+from app.core.diff_cache import DiffCache, default_diff_cache, set_default_diff_cache
+from app.core.diff_engines import DIFF_ENGINES
+from app.core.file_loader import STDIN, LineReader, read_lines
+from app.core.tracing import Tracer, default_tracer, set_default_tracer
+
+# Output formats; all but "gui" are written to standard output
+FORMATS: tuple[str, ...] = ("gui", "unified", "json")
+
+# Where diff results are cached between sessions by default
+CACHE_DIRECTORY: str = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                    "diff_widget")
+
+
+def parse_arguments(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parses the command line.
+
+    :param argv: The arguments without the program name; sys.argv if omitted.
+    """
+    parser = argparse.ArgumentParser(prog="python -m app",
+                                     description="Compare two files side by side, or two directories.")
+    parser.add_argument("left", help='left file or directory, or "-" for standard input')
+    parser.add_argument("right", help='right file or directory, or "-" for standard input')
+    parser.add_argument("--diff-engine", choices=sorted(DIFF_ENGINES), default="difflib")
+    parser.add_argument("--language", help="language of both files; guessed from the file names by default")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--ignore-whitespace", action="store_true", help="ignore changes in whitespace")
+    parser.add_argument("--ignore-case", action="store_true", help="ignore changes in case")
+    parser.add_argument("--semantic", action="store_true",
+                        help="diff Python files function by function and class by class")
+    parser.add_argument("--format", choices=FORMATS, default="gui",
+                        help="show a window (default), or write a unified diff or JSON hunks")
+    parser.add_argument("--context", type=int, default=3, help="unchanged lines around unified diff hunks")
+    parser.add_argument("--tokens", action="store_true", help="add the token spans of the lines to JSON hunks")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument("--cache-dir", default=CACHE_DIRECTORY, help=f"where diffs are cached (default: {CACHE_DIRECTORY})")
+    cache.add_argument("--no-cache", action="store_true", help="do not read or write cached diffs")
+    parser.add_argument("--trace", metavar="FILE", help="write the timings of the hot paths as a Chrome trace")
+    parser.add_argument("--trace-slow", metavar="MS", type=float, help="log the calls taking longer than MS")
+    parser.add_argument("--overlay", action="store_true", help="show recent frame and diff timings")
+    arguments = parser.parse_args(argv)
+    if arguments.overlay and arguments.format != "gui":
+        parser.error(f"--overlay shows timings over the window, not with --format {arguments.format}")
+    if arguments.left == STDIN and arguments.right == STDIN:
+        parser.error("only one file can be read from standard input")
+    if os.path.isdir(arguments.left) and os.path.isdir(arguments.right):
+        if arguments.format != "gui":
+            parser.error(f"--format {arguments.format} compares two files")
+        return arguments
+    for path in (arguments.left, arguments.right):
+        if os.path.isdir(path):
+            parser.error(f"cannot compare a directory with a file: {path}")
+        if path != STDIN and not os.path.isfile(path):
+            parser.error(f"no such file: {path}")
+    return arguments
+
+
+def write_diff(arguments: argparse.Namespace, stream: TextIO) -> int:
+    """
+    Writes the differences of two files as a unified diff or as JSON Lines,
+    one hunk per line, hunk by hunk. Qt is not imported.
+
+    :param arguments: The parsed command line.
+    :param stream: Where the differences are written.
+    :return: The exit status: 0 if the files are equal, 1 if they differ.
+    """
+    # Imported here, so that --help stays fast
+    from app.core.lexer_registry import default_registry
+    from app.core.text_compare import TextComparison
+
+    comparison: TextComparison = TextComparison(arguments.diff_engine, ignore_whitespace=arguments.ignore_whitespace,
+                                                ignore_case=arguments.ignore_case, cache=default_diff_cache())
+    readers: list[LineReader] = [
+        read_lines(path, encoding=arguments.encoding, reader=LineReader(comparison.diff_engine.interner))
+        for path in (arguments.left, arguments.right)]
+    left, right = readers[0].lines, readers[1].lines
+    language: Optional[str] = None
+    if arguments.semantic or arguments.tokens:
+        named: list[str] = [path for path in (arguments.left, arguments.right) if path != STDIN]
+        language = default_registry().resolve(arguments.language, named[0] if named else None,
+                                              content="\n".join(left[:100]))
+    comparison.semantic = arguments.semantic and language == "python"
+    opcodes = comparison.diff(left, right, readers[0].ids, readers[1].ids)
+    if arguments.format == "unified":
+        stream.writelines(comparison.unified_diff(left, right, opcodes, arguments.left, arguments.right,
+                                                  arguments.context))
+    else:
+        lexer = default_registry().get_lexer(language) if arguments.tokens else None
+        for hunk in comparison.hunks(left, right, opcodes, lexer):
+            stream.write(json.dumps(hunk, ensure_ascii=False) + "\n")
+    return 1 if any(opcode[0] != 'equal' for opcode in opcodes) else 0
+
+
+def show_window(arguments: argparse.Namespace) -> int:
+    """
+    Opens a comparison window and runs the event loop.
+
+    :return: The exit status.
+    """
+    from PySide6.QtWidgets import QApplication, QWidget
+    app: QApplication = QApplication(sys.argv[:1])
+
+    from app.widgets.code_compare_widget import CodeCompareWidget
+    from app.widgets.directory_compare_widget import DirectoryCompareWidget
+    options: dict = dict(encoding=arguments.encoding, diff_engine=arguments.diff_engine, language=arguments.language,
+                         ignore_whitespace=arguments.ignore_whitespace, ignore_case=arguments.ignore_case,
+                         semantic=arguments.semantic)
+    widget: QWidget
+    if os.path.isdir(arguments.left):
+        widget = DirectoryCompareWidget(arguments.left, arguments.right, **options)
+    else:
+        widget = CodeCompareWidget.from_files(arguments.left, arguments.right, **options)
+    widget.setWindowTitle(f"{arguments.left} - {arguments.right}")
+    widget.showMaximized()
+    if arguments.overlay:
+        from app.widgets.performance_overlay import PerformanceOverlay
+        PerformanceOverlay(widget).show()
+    return app.exec()
+
+
+def start_tracing(arguments: argparse.Namespace) -> None:
+    """
+    Enables the tracer if the command line asks for timings.
+    """
+    if arguments.trace is None and arguments.trace_slow is None and not arguments.overlay:
+        return
+    set_default_tracer(Tracer(enabled=True, record=arguments.trace is not None, slow_ms=arguments.trace_slow))
+    if arguments.trace_slow is not None:
+        # Slow calls are logged as warnings, which the application log drops by default
+        logger.setLevel(logging.WARNING)
+        for handler in logger.handlers:
+            handler.setLevel(logging.WARNING)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Compares the files of the command line.
+
+    :return: The exit status.
+    """
+    arguments = parse_arguments(argv)
+    set_default_diff_cache(DiffCache(max_bytes=0) if arguments.no_cache else DiffCache(directory=arguments.cache_dir))
+    start_tracing(arguments)
+    try:
+        if arguments.format == "gui":
+            return show_window(arguments)
+        return write_diff(arguments, sys.stdout)
+    finally:
+        if arguments.trace is not None:
+            default_tracer().write(arguments.trace)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,61 @@
 # app_logger.py
 import logging
-from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+# Имя файла журнала и параметры ротации
+LOG_PATH: str = "../app.log"
+MAX_BYTES: int = 5 * 1024 * 1024  # Максимальный размер файла (5 MB)
+BACKUP_COUNT: int = 3  # Количество резервных копий логов
+
+
+class LazyFileHandler(logging.Handler):
+    """
+    Writes records to a rotating log file that is set up on the first record.
+
+    Neither logging.handlers is imported nor the file opened at import time,
+    so starting the application costs nothing until something is logged.
+    """
+
+    def __init__(self, path: str = LOG_PATH, level: int = logging.NOTSET) -> None:
+        """
+        :param path: The log file.
+        :param level: Records below this level are dropped.
+        """
+        super().__init__(level)
+        self.path: str = path
+        self.__handler: Optional[logging.Handler] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Writes a record, creating the rotating file handler first if needed.
+
+        A log file that cannot be opened is reported by handleError, like any
+        other handler failure, instead of raising into the code that logged.
+        """
+        try:
+            if self.__handler is None:
+                from logging.handlers import RotatingFileHandler
+                self.__handler = RotatingFileHandler(self.path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+                self.__handler.setFormatter(self.formatter)
+            self.__handler.emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        """
+        Closes the log file, if it was opened.
+        """
+        if self.__handler is not None:
+            self.__handler.close()
+        super().close()
+
 
 # Создание логгера
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)  # Уровень логирования настроен на ERROR
 
-# Настройка обработчика для записи логов в файл
-file_handler = RotatingFileHandler(
-    "../app.log",        # Имя файла
-    maxBytes=5 * 1024 * 1024,  # Максимальный размер файла (5 MB)
-    backupCount=3     # Количество резервных копий логов
-)
+# Настройка обработчика для записи логов в файл; файл открывается при первой записи
+file_handler = LazyFileHandler(LOG_PATH)
 file_handler.setLevel(logging.ERROR)
 
 # Настройка форматтера
@@ -0,0 +1,296 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional, Sequence, Union
+
+from app.app_logger import logger
+from app.core.diff_engines import Opcode
+from app.core.hunk_table import HunkTable
+
+# Start of every cache file: format name and version, then the line counts of both sides
+_HEADER: struct.Struct = struct.Struct("<4sII")
+_MAGIC: bytes = b"DWC1"
+
+# Extension of the cache files
+_SUFFIX: str = ".opcodes"
+
+
+class DiffCache:
+    """
+    Content-addressed cache of diff results.
+
+    A comparison is keyed by a hash of both texts and of the options that
+    change its result, so reopening the same pair of files, in any widget or
+    session, skips the diff. Results are kept encoded: four unsigned 32-bit
+    integers per hunk, the equal runs between hunks being implied. The
+    in-memory LRU holds at most ``max_bytes`` of them; with a ``directory``
+    every result is also written there, one file per key, and read back on a
+    memory miss. The files least recently used, by modification time, are
+    deleted when the store grows over ``max_disk_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = 32 << 20, directory: Optional[str] = None,
+                 max_disk_bytes: int = 256 << 20) -> None:
+        """
+        :param max_bytes: Budget of the in-memory entries; 0 keeps nothing in memory.
+        :param directory: Directory of the on-disk store, created if needed; None for memory only.
+        :param max_disk_bytes: Budget of the on-disk store.
+        """
+        self.max_bytes: int = max_bytes
+        self.directory: Optional[str] = directory
+        self.max_disk_bytes: int = max_disk_bytes
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.__entries: OrderedDict[bytes, bytes] = OrderedDict()
+        self.__size: int = 0
+        # Size of the on-disk store, counted when the first file is written
+        self.__disk_size: Optional[int] = None
+        self.__lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def key(left: Sequence[str], right: Sequence[str], options: str = "") -> bytes:
+        """
+        Returns the key of a comparison.
+
+        :param left: Lines of the left text.
+        :param right: Lines of the right text.
+        :param options: Everything besides the texts that changes the result, e.g. the engine.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        for lines in (left, right):
+            # Hashed separately, so that a line moving from one side to the other changes the key
+            digest.update(hashlib.blake2b("\n".join(lines).encode("utf-8", "surrogatepass")).digest())
+            digest.update(len(lines).to_bytes(8, "little"))
+        digest.update(options.encode())
+        return digest.digest()
+
+    def get(self, key: bytes, lengths: Optional[tuple[int, int]] = None) -> Optional[list[Opcode]]:
+        """
+        Returns the opcodes stored under a key, or None, and counts the hit or miss.
+
+        :param key: Key of the comparison.
+        :param lengths: Numbers of lines of both texts; an entry for other
+            lengths, such as a damaged file, is a miss.
+        """
+        with self.__lock:
+            data: Optional[bytes] = self.__entries.get(key)
+            if data is not None:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return decode_opcodes(data)
+        data = self.__read(key)
+        if data is not None:
+            try:
+                table: HunkTable = decode_hunks(data)
+                if lengths is not None and table.lengths != lengths:
+                    raise ValueError(f"{table.lengths} lines instead of {lengths}")
+                _check_bounds(table)
+            except ValueError as error:
+                logger.error(f"Ignoring a damaged diff cache entry: {error}")
+            else:
+                with self.__lock:
+                    self.disk_hits += 1
+                    self.__remember(key, data)
+                return table.opcodes()
+        with self.__lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: bytes, opcodes: Union[Sequence[Opcode], HunkTable]) -> None:
+        """
+        Stores the opcodes of a comparison, or their hunk table.
+        """
+        data: bytes = encode_opcodes(opcodes)
+        with self.__lock:
+            self.__remember(key, data)
+        self.__write(key, data)
+
+    def clear(self) -> None:
+        """
+        Drops the in-memory entries and resets the counters; the on-disk store is kept.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters and the size of the in-memory entries.
+        """
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "entries": len(self.__entries), "bytes": self.__size}
+
+    def __remember(self, key: bytes, data: bytes) -> None:
+        """
+        Adds an entry to the in-memory LRU, evicting the least recently used ones over the budget.
+        """
+        if len(data) > self.max_bytes:
+            return
+        previous: Optional[bytes] = self.__entries.pop(key, None)
+        if previous is not None:
+            self.__size -= len(previous)
+        self.__entries[key] = data
+        self.__size += len(data)
+        while self.__size > self.max_bytes:
+            self.__size -= len(self.__entries.popitem(last=False)[1])
+
+    def __path(self, key: bytes) -> str:
+        """
+        Returns the path of the cache file of a key.
+        """
+        return os.path.join(self.directory, key.hex() + _SUFFIX)
+
+    def __read(self, key: bytes) -> Optional[bytes]:
+        """
+        Returns the data of a key from the on-disk store, or None.
+        """
+        if self.directory is None:
+            return None
+        path: str = self.__path(key)
+        try:
+            with open(path, "rb") as file:
+                data: bytes = file.read()
+            # Marks the file as recently used, so that it is evicted last
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as error:
+            logger.error(f"Cannot read the diff cache: {error}")
+            return None
+
+    def __write(self, key: bytes, data: bytes) -> None:
+        """
+        Writes the data of a key to the on-disk store, atomically so that
+        concurrent sessions never read a partial file.
+        """
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary, self.__path(key))
+            with self.__lock:
+                if self.__disk_size is None:
+                    self.__disk_size = sum(entry.stat().st_size for entry in self.__disk_entries())
+                else:
+                    self.__disk_size += len(data)
+                if self.__disk_size > self.max_disk_bytes:
+                    self.__evict_files()
+        except OSError as error:
+            logger.error(f"Cannot write the diff cache: {error}")
+
+    def __disk_entries(self) -> list[os.DirEntry]:
+        """
+        Returns the cache files of the on-disk store.
+        """
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.name.endswith(_SUFFIX)]
+
+    def __evict_files(self) -> None:
+        """
+        Deletes the least recently used files until the store is under three quarters of its budget.
+
+        Files of other sessions are counted again first, so the budget holds for all of them together.
+        """
+        files: list[tuple[float, int, str]] = []
+        for entry in self.__disk_entries():
+            try:
+                stat: os.stat_result = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        self.__disk_size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.__disk_size <= self.max_disk_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.__disk_size -= size
+
+
+def encode_opcodes(opcodes: Union[Sequence[Opcode], HunkTable]) -> bytes:
+    """
+    Encodes opcodes, or their hunk table: a header with the line counts, then
+    (i1, i2, j1, j2) of every hunk. Equal runs and tags are implied by the bounds.
+    """
+    table: HunkTable = opcodes if isinstance(opcodes, HunkTable) else HunkTable.from_opcodes(opcodes)
+    bounds: array = table.interleaved()
+    if sys.byteorder == "big":
+        bounds.byteswap()
+    return _HEADER.pack(_MAGIC, *table.lengths) + bounds.tobytes()
+
+
+def decode_hunks(data: bytes) -> HunkTable:
+    """
+    Decodes the hunk table of opcodes encoded by encode_opcodes.
+
+    :raises ValueError: If the data is not in that format.
+    """
+    if len(data) < _HEADER.size or (len(data) - _HEADER.size) % 16:
+        raise ValueError("Truncated diff cache entry")
+    magic, len_a, len_b = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"Unknown diff cache format: {magic!r}")
+    bounds: array = array('I', data[_HEADER.size:])
+    if sys.byteorder == "big":
+        bounds.byteswap()
+    return HunkTable.from_interleaved(bounds, (len_a, len_b))
+
+
+def _check_bounds(table: HunkTable) -> None:
+    """
+    Checks that the hunks of a table are in order and within the lines of both sides.
+
+    :raises ValueError: If they are not.
+    """
+    for side in (0, 1):
+        end: int = 0
+        for start, stop in zip(table.starts(side), table.ends(side)):
+            if start < end or stop < start:
+                raise ValueError("Hunks out of order")
+            end = stop
+        if end > table.lengths[side]:
+            raise ValueError("Hunks past the last line")
+
+
+def decode_opcodes(data: bytes) -> list[Opcode]:
+    """
+    Decodes opcodes encoded by encode_opcodes.
+
+    :raises ValueError: If the data is not in that format.
+    """
+    return decode_hunks(data).opcodes()
+
+
+_default_cache: Optional[DiffCache] = None
+
+
+def default_diff_cache() -> DiffCache:
+    """
+    Returns the cache shared by all comparisons, in memory only unless set_default_diff_cache was called.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DiffCache()
+    return _default_cache
+
+
+def set_default_diff_cache(cache: DiffCache) -> None:
+    """
+    Replaces the cache shared by all comparisons, e.g. by one with an on-disk store.
+    """
+    global _default_cache
+    _default_cache = cache
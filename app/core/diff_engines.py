@@ -0,0 +1,437 @@
+import difflib
+from math import isqrt
+from typing import Hashable, Sequence, Union
+
+# A single difflib-style opcode: (tag, i1, i2, j1, j2)
+Opcode = tuple[str, int, int, int, int]
+
+# A run of equal items: (i, j, size), meaning a[i:i + size] == b[j:j + size]
+Match = tuple[int, int, int]
+
+
+class DiffEngine:
+    """
+    Base class for line diff algorithms.
+
+    Every engine returns difflib-style opcodes, so callers do not need to know
+    which algorithm produced them.
+    """
+
+    name: str = ""
+
+    def get_opcodes(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Opcode]:
+        """
+        Returns the opcodes that turn sequence ``a`` into sequence ``b``.
+
+        :param a: The old sequence (usually lines of the left document).
+        :param b: The new sequence (usually lines of the right document).
+        :return: List of ``(tag, i1, i2, j1, j2)`` tuples as produced by
+                 ``difflib.SequenceMatcher.get_opcodes``.
+        """
+        return opcodes_from_matches(self.get_matches(a, b), len(a), len(b))
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        """
+        Returns the runs of equal items shared by both sequences.
+
+        :param a: The old sequence.
+        :param b: The new sequence.
+        :return: List of ``(i, j, size)`` runs, in any order.
+        """
+        raise NotImplementedError
+
+
+class DifflibEngine(DiffEngine):
+    """
+    Diff engine backed by ``difflib.SequenceMatcher``.
+
+    Quadratic in the worst case; kept as the reference implementation.
+    """
+
+    name = "difflib"
+
+    def __init__(self, autojunk: bool = True) -> None:
+        """
+        :param autojunk: Passed through to ``difflib.SequenceMatcher``.
+        """
+        self.autojunk: bool = autojunk
+
+    def get_opcodes(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Opcode]:
+        matcher = difflib.SequenceMatcher(None, a, b, autojunk=self.autojunk)
+        return matcher.get_opcodes()
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        matcher = difflib.SequenceMatcher(None, a, b, autojunk=self.autojunk)
+        return [tuple(block) for block in matcher.get_matching_blocks()[:-1]]
+
+
+class MyersEngine(DiffEngine):
+    """
+    Linear-space O(ND) diff by Eugene Myers, the default algorithm of git.
+
+    Lines that appear on only one side are discarded before the search, and
+    the search gives up on an optimal answer once the edit cost of a region
+    exceeds a bound derived from ``min_cost``, so adversarial inputs stay
+    tractable.
+    """
+
+    name = "myers"
+
+    def __init__(self, min_cost: int = 256) -> None:
+        """
+        :param min_cost: Lower bound of the per-region edit cost after which
+                         the search settles for an approximate split.
+        """
+        self.min_cost: int = min_cost
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        matches: list[Match] = []
+        alo, ahi, blo, bhi = _trim(a, b, 0, len(a), 0, len(b), matches)
+        if alo < ahi and blo < bhi:
+            self.match_region(a, b, alo, ahi, blo, bhi, matches)
+        return matches
+
+    def match_region(self, a: Sequence[Hashable], b: Sequence[Hashable],
+                     alo: int, ahi: int, blo: int, bhi: int, out: list[Match]) -> None:
+        """
+        Appends the matches between ``a[alo:ahi]`` and ``b[blo:bhi]`` to ``out``.
+        """
+        # Lines without a counterpart on the other side can never be matched.
+        # Dropping them shrinks the search space, often to nothing.
+        in_b = set(b[blo:bhi])
+        a_index = [i for i in range(alo, ahi) if a[i] in in_b]
+        in_a = {a[i] for i in a_index}
+        b_index = [j for j in range(blo, bhi) if b[j] in in_a]
+        if not a_index or not b_index:
+            return
+
+        ra = [a[i] for i in a_index]
+        rb = [b[j] for j in b_index]
+        max_cost = max(self.min_cost, isqrt(len(ra) + len(rb)))
+        reduced: list[Match] = []
+        _myers(ra, rb, reduced, max_cost)
+
+        # Map the matches back to the original positions, splitting runs
+        # wherever discarded lines separated them.
+        for i, j, size in reduced:
+            start_i, start_j = a_index[i], b_index[j]
+            run = 1
+            for k in range(1, size):
+                oi, oj = a_index[i + k], b_index[j + k]
+                if oi == start_i + run and oj == start_j + run:
+                    run += 1
+                else:
+                    out.append((start_i, start_j, run))
+                    start_i, start_j, run = oi, oj, 1
+            out.append((start_i, start_j, run))
+
+
+class HistogramEngine(DiffEngine):
+    """
+    Histogram diff as implemented by git (an extension of patience diff).
+
+    Regions are split recursively around the longest run that contains the
+    least frequent common line, which tends to produce readable hunks for
+    source code. Regions made only of very frequent lines fall back to Myers.
+    """
+
+    name = "histogram"
+
+    def __init__(self, max_chain: int = 64) -> None:
+        """
+        :param max_chain: Lines occurring more often than this on the left
+                          side are never used as split anchors.
+        """
+        self.max_chain: int = max_chain
+        self.fallback: MyersEngine = MyersEngine()
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        matches: list[Match] = []
+        stack: list[tuple[int, int, int, int]] = [(0, len(a), 0, len(b))]
+        while stack:
+            alo, ahi, blo, bhi = _trim(a, b, *stack.pop(), matches)
+            if alo >= ahi or blo >= bhi:
+                continue
+            anchor = self.find_anchor(a, b, alo, ahi, blo, bhi)
+            if anchor is None:
+                self.fallback.match_region(a, b, alo, ahi, blo, bhi, matches)
+                continue
+            i, j, size = anchor
+            if size:
+                matches.append(anchor)
+                stack.append((i + size, ahi, j + size, bhi))
+                stack.append((alo, i, blo, j))
+        return matches
+
+    def find_anchor(self, a: Sequence[Hashable], b: Sequence[Hashable],
+                    alo: int, ahi: int, blo: int, bhi: int) -> Union[Match, None]:
+        """
+        Finds the run used to split ``a[alo:ahi]`` and ``b[blo:bhi]``.
+
+        :return: The ``(i, j, size)`` run, ``(alo, blo, 0)`` if the regions
+                 share no line at all, or ``None`` if every shared line is too
+                 frequent to be a useful anchor.
+        """
+        occurrences: dict[Hashable, list[int]] = {}
+        for i in range(alo, ahi):
+            occurrences.setdefault(a[i], []).append(i)
+
+        best: Match = (alo, blo, 0)
+        best_count: int = self.max_chain + 1
+        has_common: bool = False
+        j = blo
+        while j < bhi:
+            positions = occurrences.get(b[j])
+            if positions is None:
+                j += 1
+                continue
+            has_common = True
+            if len(positions) > best_count:
+                j += 1
+                continue
+            next_j = j + 1
+            for i in positions:
+                run, count = _extend(a, b, i, j, alo, ahi, blo, bhi, occurrences)
+                next_j = max(next_j, run[1] + run[2])
+                if run[2] > best[2] or count < best_count:
+                    best, best_count = run, count
+            j = next_j
+
+        if has_common and not best[2]:
+            return None
+        return best
+
+
+def _extend(a: Sequence[Hashable], b: Sequence[Hashable], i: int, j: int,
+            alo: int, ahi: int, blo: int, bhi: int,
+            occurrences: dict[Hashable, list[int]]) -> tuple[Match, int]:
+    """
+    Grows the match at ``(i, j)`` in both directions.
+
+    :return: The run and the lowest occurrence count of any line in it.
+    """
+    count = len(occurrences[a[i]])
+    start_i, start_j = i, j
+    while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+        start_i -= 1
+        start_j -= 1
+        count = min(count, len(occurrences[a[start_i]]))
+    end_i, end_j = i + 1, j + 1
+    while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+        count = min(count, len(occurrences[a[end_i]]))
+        end_i += 1
+        end_j += 1
+    return (start_i, start_j, end_i - start_i), count
+
+
+def _trim(a: Sequence[Hashable], b: Sequence[Hashable], alo: int, ahi: int,
+          blo: int, bhi: int, out: list[Match]) -> tuple[int, int, int, int]:
+    """
+    Moves the common prefix and suffix of two regions to ``out``.
+
+    :return: The bounds of what is left of both regions.
+    """
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start:
+        out.append((start, blo - (alo - start), alo - start))
+    end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+    if ahi < end:
+        out.append((ahi, bhi, end - ahi))
+    return alo, ahi, blo, bhi
+
+
+def _myers(a: Sequence[Hashable], b: Sequence[Hashable], out: list[Match], max_cost: int) -> None:
+    """
+    Appends the matches between ``a`` and ``b`` to ``out`` using the
+    divide-and-conquer variant of Myers' algorithm.
+    """
+    stack: list[tuple[int, int, int, int]] = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = _trim(a, b, *stack.pop(), out)
+        if alo >= ahi or blo >= bhi:
+            continue
+        split = _middle_snake(a, b, alo, ahi, blo, bhi, max_cost)
+        if split is None:
+            continue
+        x, y = split
+        stack.append((x, ahi, y, bhi))
+        stack.append((alo, x, blo, y))
+
+
+def _middle_snake(a: Sequence[Hashable], b: Sequence[Hashable], alo: int, ahi: int,
+                  blo: int, bhi: int, max_cost: int) -> Union[tuple[int, int], None]:
+    """
+    Finds a point on an optimal edit path through the given regions.
+
+    The forward and backward searches run simultaneously and meet in the
+    middle. Once ``max_cost`` is exceeded the furthest forward point is used
+    instead, which keeps the cost bounded at the price of minimality.
+
+    :return: Absolute ``(x, y)`` split point, or ``None`` if no split was found.
+    """
+    search = _SnakeSearch(a, b, alo, ahi, blo, bhi, max_cost)
+    for d in range(search.max_d):
+        split = search.forward(d)
+        if split is None:
+            split = search.backward(d)
+        if split is not None:
+            return alo + split[0], blo + split[1]
+        if d >= max_cost:
+            x, y = search.furthest
+            if 0 < x + y < search.n + search.m:
+                return alo + x, blo + y
+            return None
+    return None
+
+
+class _SnakeSearch:
+    """
+    State of the bidirectional search used by ``_middle_snake``.
+
+    Coordinates are relative to the start of the regions; ``forward_v`` and
+    ``backward_v`` hold the furthest x reached on each diagonal.
+    """
+
+    def __init__(self, a: Sequence[Hashable], b: Sequence[Hashable], alo: int, ahi: int,
+                 blo: int, bhi: int, max_cost: int) -> None:
+        self.a, self.b = a, b
+        self.alo, self.ahi, self.blo, self.bhi = alo, ahi, blo, bhi
+        self.n: int = ahi - alo
+        self.m: int = bhi - blo
+        self.max_d: int = (self.n + self.m + 1) // 2
+        # The search never runs past max_cost, so the arrays can stay small
+        self.offset: int = min(self.max_d, max_cost) + 2
+        self.size: int = 2 * self.offset + 1
+        self.forward_v: list[int] = [-1] * self.size
+        self.backward_v: list[int] = [-1] * self.size
+        self.forward_v[self.offset + 1] = 0
+        self.backward_v[self.offset + 1] = 0
+        self.delta: int = self.n - self.m
+        self.odd: bool = self.delta % 2 != 0
+        self.k1_start = self.k1_end = self.k2_start = self.k2_end = 0
+        self.furthest: tuple[int, int] = (0, 0)
+
+    def forward(self, d: int) -> Union[tuple[int, int], None]:
+        """
+        Extends every forward path by one edit.
+
+        :return: The split point if the paths overlap, otherwise ``None``.
+        """
+        a, b, alo, blo, n, m = self.a, self.b, self.alo, self.blo, self.n, self.m
+        v, offset = self.forward_v, self.offset
+        best_x = best_y = 0
+        for k in range(-d + self.k1_start, d + 1 - self.k1_end, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x > n:
+                self.k1_end += 2
+            elif y > m:
+                self.k1_start += 2
+            else:
+                if x + y > best_x + best_y:
+                    best_x, best_y = x, y
+                if self.odd and x >= n - self.reached(self.backward_v, self.delta - k):
+                    return x, y
+        self.furthest = (best_x, best_y)
+        return None
+
+    def backward(self, d: int) -> Union[tuple[int, int], None]:
+        """
+        Extends every backward path by one edit.
+
+        :return: The split point if the paths overlap, otherwise ``None``.
+        """
+        a, b, ahi, bhi, n, m = self.a, self.b, self.ahi, self.bhi, self.n, self.m
+        v, offset = self.backward_v, self.offset
+        for k in range(-d + self.k2_start, d + 1 - self.k2_end, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[ahi - x - 1] == b[bhi - y - 1]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x > n:
+                self.k2_end += 2
+            elif y > m:
+                self.k2_start += 2
+            elif not self.odd and self.reached(self.forward_v, self.delta - k) >= n - x:
+                forward_x = self.forward_v[offset + self.delta - k]
+                return forward_x, forward_x - (self.delta - k)
+        return None
+
+    def reached(self, v: list[int], k: int) -> int:
+        """
+        Returns the furthest x of diagonal ``k`` in ``v``, or a value that
+        never satisfies an overlap test if the diagonal was not visited.
+        """
+        index = self.offset + k
+        if 0 <= index < self.size and v[index] != -1:
+            return v[index]
+        return -self.size - self.n
+
+
+def opcodes_from_matches(matches: list[Match], len_a: int, len_b: int) -> list[Opcode]:
+    """
+    Converts matching runs into difflib-style opcodes.
+
+    :param matches: Non-overlapping ``(i, j, size)`` runs, in any order.
+    :param len_a: Length of the old sequence.
+    :param len_b: Length of the new sequence.
+    :return: List of ``(tag, i1, i2, j1, j2)`` tuples covering both sequences.
+    """
+    opcodes: list[Opcode] = []
+    i = j = 0
+    for ai, bj, size in sorted(matches) + [(len_a, len_b, 0)]:
+        if size and ai == i and bj == j and opcodes and opcodes[-1][0] == 'equal':
+            # Adjacent runs collapse into a single equal opcode
+            _, i1, _, j1, _ = opcodes.pop()
+        else:
+            if i < ai and j < bj:
+                opcodes.append(('replace', i, ai, j, bj))
+            elif i < ai:
+                opcodes.append(('delete', i, ai, j, bj))
+            elif j < bj:
+                opcodes.append(('insert', i, ai, j, bj))
+            i1, j1 = ai, bj
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', i1, i, j1, j))
+    return opcodes
+
+
+DIFF_ENGINES: dict[str, type[DiffEngine]] = {
+    DifflibEngine.name: DifflibEngine,
+    MyersEngine.name: MyersEngine,
+    HistogramEngine.name: HistogramEngine,
+}
+
+
+def get_diff_engine(engine: Union[str, DiffEngine]) -> DiffEngine:
+    """
+    Returns a diff engine instance.
+
+    :param engine: Name of a registered engine or an engine instance.
+    :return: The diff engine.
+    """
+    if isinstance(engine, DiffEngine):
+        return engine
+    try:
+        return DIFF_ENGINES[engine]()
+    except KeyError:
+        raise ValueError(f"Unknown diff engine: {engine!r}") from None
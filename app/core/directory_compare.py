@@ -0,0 +1,174 @@
+import hashlib
+import os
+from typing import Optional
+
+from app.core.diff_engines import DiffEngine
+from app.core.file_loader import LineReader, read_lines
+from app.core.line_interner import InterningEngine
+
+# Status of a file in a directory comparison
+PENDING: str = "pending"
+IDENTICAL: str = "identical"
+CHANGED: str = "changed"
+ADDED: str = "added"
+REMOVED: str = "removed"
+BINARY: str = "binary"
+ERROR: str = "error"
+
+# Bytes read at a time when hashing a file
+HASH_CHUNK_SIZE: int = 1 << 20
+
+# Bytes of the start of a file searched for a NUL byte, which marks a binary file
+BINARY_SNIFF_SIZE: int = 8192
+
+# (size, modification time in nanoseconds) of a file
+FileStat = tuple[int, int]
+
+# What a comparison finds out about a changed pair: (status, deleted lines, inserted lines, error message)
+FileResult = tuple[str, int, int, str]
+
+
+class FilePair:
+    """
+    A file of either tree and what is known about how the two versions differ.
+    """
+
+    def __init__(self, path: str, left: Optional[FileStat], right: Optional[FileStat]) -> None:
+        """
+        :param path: Path relative to both roots, with "/" separators.
+        :param left: Size and modification time on the left, None if the file is only on the right.
+        :param right: Size and modification time on the right, None if the file is only on the left.
+        """
+        self.path: str = path
+        self.left: Optional[FileStat] = left
+        self.right: Optional[FileStat] = right
+        self.status: str = _initial_status(left, right)
+        # Lines only on the left and only on the right, once compared
+        self.deleted: int = 0
+        self.inserted: int = 0
+        self.error: str = ""
+
+    def __repr__(self) -> str:
+        return f"FilePair({self.path!r}, {self.status})"
+
+    def update(self, result: FileResult) -> None:
+        """
+        Records the result of comparing the contents.
+        """
+        self.status, self.deleted, self.inserted, self.error = result
+
+
+def _initial_status(left: Optional[FileStat], right: Optional[FileStat]) -> str:
+    """
+    Returns the status known from the metadata alone: files of the same size
+    and modification time are taken as identical without reading them.
+    """
+    if left is None:
+        return ADDED
+    if right is None:
+        return REMOVED
+    return IDENTICAL if left == right else PENDING
+
+
+def scan_tree(root: str) -> dict[str, FileStat]:
+    """
+    Returns the size and modification time of every file under a directory,
+    keyed by path relative to it. Symbolic links to directories are not followed.
+    """
+    files: dict[str, FileStat] = {}
+    stack: list[tuple[str, str]] = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, prefix + entry.name + "/"))
+                elif entry.is_file():
+                    stat: os.stat_result = entry.stat()
+                    files[prefix + entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def pair_trees(left_root: str, right_root: str) -> list[FilePair]:
+    """
+    Returns the files of both trees sorted by path, with the status known
+    without reading them; the others are PENDING.
+    """
+    left: dict[str, FileStat] = scan_tree(left_root)
+    right: dict[str, FileStat] = scan_tree(right_root)
+    return [FilePair(path, left.get(path), right.get(path)) for path in sorted(left.keys() | right.keys())]
+
+
+def file_digest(path: str) -> bytes:
+    """
+    Returns a BLAKE2b digest of the contents of a file.
+    """
+    digest = hashlib.blake2b()
+    buffer: bytearray = bytearray(HASH_CHUNK_SIZE)
+    view: memoryview = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        while size := file.readinto(buffer):
+            digest.update(view[:size])
+    return digest.digest()
+
+
+def is_binary(path: str) -> bool:
+    """
+    Returns whether a file looks binary, i.e. has a NUL byte near its start.
+    """
+    with open(path, "rb") as file:
+        return b"\0" in file.read(BINARY_SNIFF_SIZE)
+
+
+def compare_files(left_path: str, right_path: str, engine: DiffEngine, same_size: bool = True,
+                  encoding: str = "utf-8") -> FileResult:
+    """
+    Compares the contents of two files.
+
+    Files of the same size are hashed first, and only diffed if the digests
+    differ; files of different sizes cannot be identical and are diffed at
+    once. Binary files are never diffed.
+
+    :param left_path: Path of the left file.
+    :param right_path: Path of the right file.
+    :param engine: Diff engine counting the changed lines.
+    :param same_size: Whether both files have the same size.
+    :param encoding: Text encoding of both files.
+    """
+    try:
+        if same_size and file_digest(left_path) == file_digest(right_path):
+            return IDENTICAL, 0, 0, ""
+        if is_binary(left_path) or is_binary(right_path):
+            return BINARY, 0, 0, ""
+        if not isinstance(engine, InterningEngine):
+            engine = InterningEngine(engine)
+        engine.interner.clear()
+        left: LineReader = read_lines(left_path, encoding=encoding, reader=LineReader(engine.interner))
+        right: LineReader = read_lines(right_path, encoding=encoding, reader=LineReader(engine.interner))
+        deleted: int = 0
+        inserted: int = 0
+        for tag, i1, i2, j1, j2 in engine.get_opcodes(left.ids, right.ids):
+            if tag != 'equal':
+                deleted += i2 - i1
+                inserted += j2 - j1
+    except (OSError, LookupError) as error:
+        return ERROR, 0, 0, str(error)
+    # Files differing only in ignored whitespace or case compare as identical
+    return (CHANGED if deleted or inserted else IDENTICAL), deleted, inserted, ""
+
+
+def compare_batch(left_root: str, right_root: str, pairs: list[tuple[int, str, bool]], engine: DiffEngine,
+                  encoding: str = "utf-8") -> list[tuple[int, FileResult]]:
+    """
+    Compares a batch of files; module level so that it can run in a child process.
+
+    :param left_root: The left directory.
+    :param right_root: The right directory.
+    :param pairs: (index, relative path, whether both files have the same size) of every file.
+    :param engine: Diff engine counting the changed lines.
+    :param encoding: Text encoding of the files.
+    :return: (index, result) of every file, in order.
+    """
+    return [(index, compare_files(os.path.join(left_root, path), os.path.join(right_root, path), engine,
+                                  same_size, encoding))
+            for index, path, same_size in pairs]
@@ -0,0 +1,131 @@
+import codecs
+import io
+import mmap
+import os
+import sys
+from array import array
+from typing import BinaryIO, Iterator, Optional
+
+from app.core.line_interner import LineInterner
+
+# Name standing for standard input
+STDIN: str = "-"
+
+# Bytes decoded per chunk
+CHUNK_SIZE: int = 1 << 18
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE, encoding: str = "utf-8",
+                errors: str = "replace") -> Iterator[str]:
+    """
+    Yields the text of a file chunk by chunk, with line endings translated to "\\n".
+
+    Regular files are memory mapped, so only the chunk being decoded is copied
+    out of the page cache; standard input and other streams are read in chunks
+    of the same size. Multi-byte characters and "\\r\\n" pairs split between two
+    chunks are decoded incrementally.
+
+    :param path: Path of the file, or "-" for standard input.
+    :param chunk_size: Number of bytes decoded at a time.
+    :param encoding: Text encoding of the file.
+    :param errors: How undecodable bytes are handled, as for ``bytes.decode``.
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors), translate=True)
+    if path == STDIN:
+        chunks: Iterator[bytes] = _stream_chunks(sys.stdin.buffer, chunk_size)
+    else:
+        chunks = _file_chunks(path, chunk_size)
+    for chunk in chunks:
+        text: str = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _file_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+    """
+    Yields the bytes of a file through a memory map; empty files cannot be mapped and yield nothing.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), chunk_size):
+                yield mapped[start:start + chunk_size]
+
+
+def _stream_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """
+    Yields the bytes of a stream until it is exhausted, each chunk as soon as
+    some bytes are available rather than once ``chunk_size`` of them are.
+    """
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        chunk: bytes = read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class LineReader:
+    """
+    Splits text fed chunk by chunk into lines and interns every line as it
+    is completed, so a loaded document is split and interned in a single pass.
+
+    Lines follow ``str.split("\\n")``: a text ending with a newline ends with an
+    empty line, as a QTextDocument ends with an empty block.
+    """
+
+    def __init__(self, interner: Optional[LineInterner] = None) -> None:
+        """
+        :param interner: Gives the line IDs; share one between the documents
+                         that are diffed together. A new one if omitted.
+        """
+        self.interner: LineInterner = interner if interner is not None else LineInterner()
+        self.lines: list[str] = []
+        # ID of every line, in order; the diff runs on these
+        self.ids: array = array('i')
+        self.__pending: str = ""
+        self.__closed: bool = False
+
+    def feed(self, text: str) -> None:
+        """
+        Adds a chunk of text.
+
+        :raises ValueError: If the reader has been closed.
+        """
+        if self.__closed:
+            raise ValueError("LineReader is closed")
+        parts: list[str] = (self.__pending + text).split('\n')
+        self.__pending = parts.pop()
+        self.lines.extend(parts)
+        self.ids.extend(self.interner.intern_lines(parts))
+
+    def close(self) -> None:
+        """
+        Completes the last line. Closing twice has no effect.
+        """
+        if not self.__closed:
+            self.__closed = True
+            self.lines.append(self.__pending)
+            self.ids.append(self.interner.intern(self.__pending))
+            self.__pending = ""
+
+
+def read_lines(path: str, chunk_size: int = CHUNK_SIZE, encoding: str = "utf-8",
+               reader: Optional[LineReader] = None) -> LineReader:
+    """
+    Reads a whole file into a closed LineReader.
+
+    :param path: Path of the file, or "-" for standard input.
+    :param chunk_size: Number of bytes decoded at a time.
+    :param encoding: Text encoding of the file.
+    :param reader: Reader to fill; a new one if omitted.
+    """
+    reader = reader if reader is not None else LineReader()
+    for text in read_chunks(path, chunk_size, encoding):
+        reader.feed(text)
+    reader.close()
+    return reader
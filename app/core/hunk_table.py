@@ -0,0 +1,128 @@
+from array import array
+from typing import Iterable, Iterator, Union
+
+from app.core.diff_engines import Opcode
+
+
+def hunk_tag(i1: int, i2: int, j1: int, j2: int) -> str:
+    """
+    Returns the tag of a hunk, implied by its bounds.
+    """
+    return 'replace' if i1 < i2 and j1 < j2 else 'delete' if i1 < i2 else 'insert'
+
+
+class HunkTable:
+    """
+    The hunks of a diff, stored by column.
+
+    Each bound (i1, i2, j1, j2) of every hunk is one unsigned 32-bit integer in
+    its own array, so a hunk costs 16 bytes instead of a tuple of a tag and
+    four integers, and the start and end columns of either side can be
+    binary searched as they are. Tags and the equal runs between hunks are
+    implied by the bounds; hunks are turned back into opcode tuples only when
+    they are read, a few at a time.
+    """
+
+    __slots__ = ("columns", "lengths")
+
+    def __init__(self, columns: tuple[array, array, array, array], lengths: tuple[int, int]) -> None:
+        """
+        :param columns: Arrays of type 'I' of i1, i2, j1 and j2 of the hunks, in order.
+        :param lengths: Number of lines of the left and of the right side.
+        """
+        self.columns: tuple[array, array, array, array] = columns
+        self.lengths: tuple[int, int] = lengths
+
+    @classmethod
+    def from_opcodes(cls, opcodes: Iterable[Opcode]) -> 'HunkTable':
+        """
+        Returns the table of the non-equal opcodes, the lengths being taken from the last opcode.
+        """
+        ordered: list[Opcode] = opcodes if isinstance(opcodes, list) else list(opcodes)
+        hunks: list[Opcode] = [opcode for opcode in ordered if opcode[0] != 'equal']
+        columns = tuple(array('I', [hunk[column] for hunk in hunks]) for column in range(1, 5))
+        lengths: tuple[int, int] = (ordered[-1][2], ordered[-1][4]) if ordered else (0, 0)
+        return cls(columns, lengths)
+
+    @classmethod
+    def from_interleaved(cls, bounds: array, lengths: tuple[int, int]) -> 'HunkTable':
+        """
+        Returns the table of bounds stored hunk after hunk, as (i1, i2, j1, j2) of each.
+        """
+        return cls(tuple(bounds[column::4] for column in range(4)), lengths)
+
+    def interleaved(self) -> array:
+        """
+        Returns the bounds hunk after hunk, as (i1, i2, j1, j2) of each.
+        """
+        bounds: array = array('I', bytes(16 * len(self)))
+        for column in range(4):
+            bounds[column::4] = self.columns[column]
+        return bounds
+
+    def starts(self, side: int) -> array:
+        """
+        Returns the start lines of the hunks on one side, in increasing order.
+
+        :param side: 0 for the left side, 1 for the right side.
+        """
+        return self.columns[2 * side]
+
+    def ends(self, side: int) -> array:
+        """
+        Returns the end lines of the hunks on one side, in increasing order.
+
+        :param side: 0 for the left side, 1 for the right side.
+        """
+        return self.columns[2 * side + 1]
+
+    def opcodes(self) -> list[Opcode]:
+        """
+        Returns the opcodes covering both sides, equal runs included.
+        """
+        opcodes: list[Opcode] = []
+        i: int = 0
+        j: int = 0
+        for i1, i2, j1, j2 in zip(*self.columns):
+            if i < i1:
+                opcodes.append(('equal', i, i1, j, j1))
+            opcodes.append((hunk_tag(i1, i2, j1, j2), i1, i2, j1, j2))
+            i, j = i2, j2
+        if i < self.lengths[0]:
+            opcodes.append(('equal', i, self.lengths[0], j, self.lengths[1]))
+        return opcodes
+
+    def nbytes(self) -> int:
+        """
+        Returns the size of the bounds, in bytes.
+        """
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Opcode, list[Opcode]]:
+        if isinstance(index, slice):
+            return list(zip(*(self.__tags(index), *(column[index] for column in self.columns))))
+        i1, i2, j1, j2 = (column[index] for column in self.columns)
+        return hunk_tag(i1, i2, j1, j2), i1, i2, j1, j2
+
+    def __iter__(self) -> Iterator[Opcode]:
+        for i1, i2, j1, j2 in zip(*self.columns):
+            yield hunk_tag(i1, i2, j1, j2), i1, i2, j1, j2
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, HunkTable):
+            return self.columns == other.columns
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HunkTable({len(self)} hunks, lengths={self.lengths})"
+
+    def __tags(self, index: slice) -> list[str]:
+        """
+        Returns the tags of a slice of the hunks.
+        """
+        return [hunk_tag(*bounds) for bounds in zip(*(column[index] for column in self.columns))]
@@ -0,0 +1,179 @@
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from app.core.diff_engines import DiffEngine, Opcode
+
+LEFT: int = 0
+RIGHT: int = 1
+
+
+class IncrementalDiff:
+    """
+    Line diff of two documents that is kept up to date edit by edit.
+
+    An edit only re-diffs the hunks around the edited lines. The region is
+    anchored on unchanged lines a few lines away from the edit, so the cost of
+    an update depends on the size of the surrounding hunks, not of the files.
+    """
+
+    def __init__(self, engine: DiffEngine, left_lines: list[str], right_lines: list[str],
+                 opcodes: Optional[list[Opcode]] = None, context: int = 3) -> None:
+        """
+        :param engine: The diff engine used for the initial diff and every update.
+        :param left_lines: Lines of the left document.
+        :param right_lines: Lines of the right document.
+        :param opcodes: Opcodes of the two documents if already computed.
+        :param context: Number of unchanged lines re-diffed around each edit.
+        """
+        self.engine: DiffEngine = engine
+        self.lines: tuple[list[str], list[str]] = (list(left_lines), list(right_lines))
+        self.opcodes: list[Opcode] = opcodes if opcodes is not None else engine.get_opcodes(left_lines, right_lines)
+        self.context: int = context
+        # One byte per line, 1 if the line is part of a difference
+        self.status: tuple[bytearray, bytearray] = (bytearray(len(left_lines)), bytearray(len(right_lines)))
+        mark_differences(self.status, self.opcodes)
+
+    def replace_lines(self, side: int, start: int, stop: int, new_lines: list[str]) -> tuple[list[int], list[int]]:
+        """
+        Applies an edit to one document and updates the diff around it.
+
+        :param side: LEFT or RIGHT.
+        :param start: First replaced line.
+        :param stop: Line after the last replaced line, in the old numbering.
+        :param new_lines: The lines replacing ``lines[side][start:stop]``.
+        :return: Line numbers, in the new numbering, of the left and right lines
+                 whose status changed or whose text was replaced.
+        """
+        other: int = 1 - side
+        delta: int = len(new_lines) - (stop - start)
+        lo, other_lo, prefix = self.__cut_before(side, max(0, start - self.context))
+        hi, other_hi, suffix = self.__cut_after(side, min(len(self.lines[side]), stop + self.context))
+
+        self.lines[side][start:stop] = new_lines
+        region: list[list[str]] = [[], []]
+        region[side] = self.lines[side][lo:hi + delta]
+        region[other] = self.lines[other][other_lo:other_hi]
+        offsets: list[int] = [0, 0]
+        offsets[side], offsets[other] = lo, other_lo
+        middle: list[Opcode] = [
+            (tag, i1 + offsets[LEFT], i2 + offsets[LEFT], j1 + offsets[RIGHT], j2 + offsets[RIGHT])
+            for tag, i1, i2, j1, j2 in self.engine.get_opcodes(region[LEFT], region[RIGHT])
+        ]
+        suffix = [_shift(opcode, side, delta) for opcode in suffix]
+        self.opcodes = prefix + middle + suffix
+        _merge_at(self.opcodes, len(prefix) + len(middle))
+        _merge_at(self.opcodes, len(prefix))
+
+        # Recompute the status of the re-diffed region and report what changed
+        new_status: tuple[bytearray, bytearray] = (bytearray(len(region[LEFT])), bytearray(len(region[RIGHT])))
+        mark_differences(new_status, middle, offsets[LEFT], offsets[RIGHT])
+
+        changed: list[list[int]] = [[], []]
+        edited_end: int = start + len(new_lines)
+        for line in range(lo, hi + delta):
+            if start <= line < edited_end:
+                changed[side].append(line)
+                continue
+            old_line = line if line < start else line - delta
+            if self.status[side][old_line] != new_status[side][line - lo]:
+                changed[side].append(line)
+        for line in range(other_lo, other_hi):
+            if self.status[other][line] != new_status[other][line - other_lo]:
+                changed[other].append(line)
+
+        self.status[side][lo:hi] = new_status[side]
+        self.status[other][other_lo:other_hi] = new_status[other]
+        return changed[LEFT], changed[RIGHT]
+
+    def __cut_before(self, side: int, position: int) -> tuple[int, int, list[Opcode]]:
+        """
+        Finds where the re-diffed region starts.
+
+        :return: The start on both sides and the opcodes entirely before it.
+        """
+        if not self.opcodes:
+            return 0, 0, []
+        index: int = bisect_right(self.opcodes, position, key=lambda opcode: opcode[1 + 2 * side]) - 1
+        tag, *bounds = self.opcodes[index]
+        start, other_start = bounds[2 * side], bounds[2 - 2 * side]
+        if tag != 'equal':
+            return start, other_start, self.opcodes[:index]
+        offset: int = position - start
+        prefix: list[Opcode] = self.opcodes[:index]
+        if offset:
+            prefix.append(_slice_equal(self.opcodes[index], 0, offset))
+        return position, other_start + offset, prefix
+
+    def __cut_after(self, side: int, position: int) -> tuple[int, int, list[Opcode]]:
+        """
+        Finds where the re-diffed region ends.
+
+        :return: The end on both sides and the opcodes entirely after it.
+        """
+        index: int = bisect_left(self.opcodes, position, key=lambda opcode: opcode[2 + 2 * side])
+        if index == len(self.opcodes):
+            return len(self.lines[side]), len(self.lines[1 - side]), []
+        tag, *bounds = self.opcodes[index]
+        start, end = bounds[2 * side], bounds[2 * side + 1]
+        other_start, other_end = bounds[2 - 2 * side], bounds[3 - 2 * side]
+        if tag != 'equal':
+            return end, other_end, self.opcodes[index + 1:]
+        offset: int = position - start
+        suffix: list[Opcode] = self.opcodes[index + 1:]
+        if position < end:
+            suffix.insert(0, _slice_equal(self.opcodes[index], offset, end - start))
+        return position, other_start + offset, suffix
+
+
+def mark_differences(status: tuple[bytearray, bytearray], opcodes: list[Opcode],
+                     left_offset: int = 0, right_offset: int = 0) -> None:
+    """
+    Sets the status byte of every line covered by a non-equal opcode.
+
+    :param status: Left and right status arrays, indexed by line minus offset.
+    :param opcodes: The opcodes to mark.
+    :param left_offset: Line number of ``status[LEFT][0]``.
+    :param right_offset: Line number of ``status[RIGHT][0]``.
+    """
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'equal':
+            status[LEFT][i1 - left_offset:i2 - left_offset] = b'\x01' * (i2 - i1)
+            status[RIGHT][j1 - right_offset:j2 - right_offset] = b'\x01' * (j2 - j1)
+
+
+def _slice_equal(opcode: Opcode, begin: int, end: int) -> Opcode:
+    """
+    Returns the part ``[begin, end)`` of an equal opcode, relative to its start.
+    """
+    _, i1, _, j1, _ = opcode
+    return 'equal', i1 + begin, i1 + end, j1 + begin, j1 + end
+
+
+def _shift(opcode: Opcode, side: int, delta: int) -> Opcode:
+    """
+    Moves an opcode by ``delta`` lines on one side.
+    """
+    tag, i1, i2, j1, j2 = opcode
+    if side == LEFT:
+        return tag, i1 + delta, i2 + delta, j1, j2
+    return tag, i1, i2, j1 + delta, j2 + delta
+
+
+def _merge_at(opcodes: list[Opcode], index: int) -> None:
+    """
+    Merges ``opcodes[index - 1]`` and ``opcodes[index]`` if they are of the same
+    kind, so the result looks like the output of a single diff.
+    """
+    if not 0 < index < len(opcodes):
+        return
+    tag_a, i1, _, j1, _ = opcodes[index - 1]
+    tag_b, _, i2, _, j2 = opcodes[index]
+    if (tag_a == 'equal') != (tag_b == 'equal'):
+        return
+    if tag_a == 'equal':
+        tag = 'equal'
+    elif i1 < i2 and j1 < j2:
+        tag = 'replace'
+    else:
+        tag = 'delete' if i1 < i2 else 'insert'
+    opcodes[index - 1:index + 1] = [(tag, i1, i2, j1, j2)]
@@ -0,0 +1,177 @@
+import re
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Optional
+
+from app.core.diff_engines import Opcode
+from app.core.line_interner import common_prefix, common_suffix
+
+# Character range [start, end) inside a line
+Range = tuple[int, int]
+
+# Words, runs of whitespace and single punctuation characters
+_TOKEN: re.Pattern = re.compile(r"\w+|\s+|[^\w\s]")
+
+GRANULARITIES: tuple[str, ...] = ("token", "char")
+
+
+class IntralineDiffer:
+    """
+    Finds the changed character ranges inside a pair of replaced lines.
+
+    The cost is bounded: the common prefix and suffix are stripped first, and
+    if what remains of either line is longer than ``max_line_length``, it is
+    reported as one changed range instead of being diffed. Results are cached
+    per line pair.
+    """
+
+    def __init__(self, granularity: str = "token", max_line_length: int = 1000, max_pairs: int = 100,
+                 cache_size: int = 10_000) -> None:
+        """
+        :param granularity: "token" to diff words and punctuation, "char" to diff characters.
+        :param max_line_length: Longest changed part of a line that is diffed.
+        :param max_pairs: Replaced hunks pairing more lines than this are not refined.
+        :param cache_size: Maximum number of line pairs kept in the cache.
+        :raises ValueError: If the granularity is unknown.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        self.granularity: str = granularity
+        self.max_line_length: int = max_line_length
+        self.max_pairs: int = max_pairs
+        self.cache_size: int = cache_size
+        self.__cache: OrderedDict[tuple[str, str], tuple[list[Range], list[Range]]] = OrderedDict()
+
+    def diff_lines(self, left: str, right: str) -> tuple[list[Range], list[Range]]:
+        """
+        Returns the changed ranges of both lines.
+
+        :param left: The left line.
+        :param right: The right line.
+        :return: Sorted, non-overlapping ranges of the left and of the right line.
+        """
+        key: tuple[str, str] = (left, right)
+        cached = self.__cache.get(key)
+        if cached is not None:
+            self.__cache.move_to_end(key)
+            return cached
+
+        result = self.__diff(left, right)
+        if self.cache_size:
+            self.__cache[key] = result
+            if len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+        return result
+
+    def paired_line(self, opcode: Opcode, side: int, line: int) -> Optional[int]:
+        """
+        Returns the line of the other side that a line of a replaced hunk is compared with.
+
+        Lines are paired in order; the surplus lines of the longer side, and all
+        lines of a hunk pairing more than ``max_pairs`` lines, have no pair.
+
+        :param opcode: The opcode containing the line.
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line number on that side.
+        """
+        tag, i1, i2, j1, j2 = opcode
+        if tag != 'replace' or min(i2 - i1, j2 - j1) > self.max_pairs:
+            return None
+        start, other_start = (i1, j1) if side == 0 else (j1, i1)
+        offset: int = line - start
+        return other_start + offset if offset < min(i2 - i1, j2 - j1) else None
+
+    def clear_cache(self) -> None:
+        """
+        Drops all cached results.
+        """
+        self.__cache.clear()
+
+    def __diff(self, left: str, right: str) -> tuple[list[Range], list[Range]]:
+        """
+        Diffs two lines without the cache.
+        """
+        prefix: int = common_prefix(left, right)
+        suffix: int = common_suffix(left, right, prefix)
+        left_end, right_end = len(left) - suffix, len(right) - suffix
+        if max(left_end, right_end) - prefix > self.max_line_length:
+            return _whole(prefix, left_end), _whole(prefix, right_end)
+
+        if self.granularity == "char":
+            left_units: list[str] = list(left[prefix:left_end])
+            right_units: list[str] = list(right[prefix:right_end])
+        else:
+            # Tokens must not be cut by the prefix or the suffix
+            token_prefix: int = _token_start(left, right, prefix)
+            token_ends: tuple[int, int] = (_token_end(left, left_end), _token_end(right, right_end))
+            if max(token_ends) - token_prefix > self.max_line_length:
+                # A huge word, as in minified code: the stripped part is precise enough
+                return _whole(prefix, left_end), _whole(prefix, right_end)
+            prefix, (left_end, right_end) = token_prefix, token_ends
+            left_units = _TOKEN.findall(left, prefix, left_end)
+            right_units = _TOKEN.findall(right, prefix, right_end)
+
+        left_offsets: list[int] = _offsets(left_units, prefix)
+        right_offsets: list[int] = _offsets(right_units, prefix)
+        left_ranges: list[Range] = []
+        right_ranges: list[Range] = []
+        matcher: SequenceMatcher = SequenceMatcher(None, left_units, right_units, autojunk=False)
+        for tag, a1, a2, b1, b2 in matcher.get_opcodes():
+            if tag != 'equal':
+                _add_range(left_ranges, left_offsets[a1], left_offsets[a2])
+                _add_range(right_ranges, right_offsets[b1], right_offsets[b2])
+        return left_ranges, right_ranges
+
+
+def _is_word(text: str, position: int) -> bool:
+    """
+    Returns whether the character at a position is a word character.
+    """
+    return 0 <= position < len(text) and (text[position].isalnum() or text[position] == '_')
+
+
+def _token_start(left: str, right: str, position: int) -> int:
+    """
+    Moves a common prefix length back to the start of the word it cuts.
+    """
+    while position > 0 and _is_word(left, position - 1) and (_is_word(left, position) or _is_word(right, position)):
+        position -= 1
+    return position
+
+
+def _token_end(text: str, position: int) -> int:
+    """
+    Moves the end of the changed part of a line forward to the end of the word it cuts.
+    """
+    while position < len(text) and position > 0 and _is_word(text, position - 1) and _is_word(text, position):
+        position += 1
+    return position
+
+
+def _offsets(units: list[str], start: int) -> list[int]:
+    """
+    Returns the character offset of each unit, followed by the end offset.
+    """
+    offsets: list[int] = [start]
+    for unit in units:
+        offsets.append(offsets[-1] + len(unit))
+    return offsets
+
+
+def _whole(start: int, end: int) -> list[Range]:
+    """
+    Returns the range [start, end) as a list, or no range if it is empty.
+    """
+    return [(start, end)] if end > start else []
+
+
+def _add_range(ranges: list[Range], start: int, end: int) -> None:
+    """
+    Appends a range, merging it with the previous one if they touch.
+    """
+    if end <= start:
+        return
+    if ranges and ranges[-1][1] >= start:
+        ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+    else:
+        ranges.append((start, end))
@@ -0,0 +1,215 @@
+import importlib
+import os
+import re
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Optional
+
+from app.core.stateful_lexer import StatefulLexer
+
+if TYPE_CHECKING:
+    from pygments.lexer import Lexer
+
+DEFAULT_LANGUAGE: str = "python"
+
+# Language -> (module, class) of the languages we compare most often, so that
+# resolving them never touches the full Pygments lexer table
+_BUILTIN_LEXERS: dict[str, tuple[str, str]] = {
+    "python": ("pygments.lexers.python", "PythonLexer"),
+    "yaml": ("pygments.lexers.data", "YamlLexer"),
+    "json": ("pygments.lexers.data", "JsonLexer"),
+    "sql": ("pygments.lexers.sql", "SqlLexer"),
+    "go": ("pygments.lexers.go", "GoLexer"),
+    "text": ("pygments.lexers.special", "TextLexer"),
+}
+
+_BUILTIN_EXTENSIONS: dict[str, str] = {
+    ".py": "python", ".pyi": "python", ".pyw": "python",
+    ".yaml": "yaml", ".yml": "yaml",
+    ".json": "json",
+    ".sql": "sql",
+    ".go": "go",
+    ".txt": "text",
+}
+
+_BUILTIN_MIMETYPES: dict[str, str] = {
+    "text/x-python": "python", "application/x-python": "python",
+    "text/x-yaml": "yaml", "application/x-yaml": "yaml",
+    "application/json": "json",
+    "text/x-sql": "sql", "application/sql": "sql",
+    "text/x-gosrc": "go",
+    "text/plain": "text",
+}
+
+_SHEBANG: re.Pattern = re.compile(r"#!\s*(?:\S*/)?(?:env\s+(?:-\S+\s+)*)?(?P<interpreter>[a-z]+)")
+_SQL_START: re.Pattern = re.compile(
+    r"(?:select\s|insert\s+into\s|update\s+\w+\s+set\s|delete\s+from\s|(?:create|alter|drop)\s+"
+    r"(?:table|view|index|schema|database|function|procedure|trigger)\s)", re.IGNORECASE)
+_GO_START: re.Pattern = re.compile(r"package\s+\w+\s*$", re.MULTILINE)
+_YAML_START: re.Pattern = re.compile(r"(?:---|%YAML|[\w.-]+:(?:\s|$))")
+
+
+class LexerRegistry:
+    """
+    Finds Pygments lexers by language, filename, MIME type or content.
+
+    Lexer modules are imported only when a language is first used, and one
+    lexer (with its token cache) is shared by every highlighter of a language.
+    Lookups try a small table of common languages first and then the static
+    Pygments lexer table; installed lexer plugins are never scanned.
+    """
+
+    def __init__(self) -> None:
+        self.__classes: dict[str, tuple[str, str]] = dict(_BUILTIN_LEXERS)
+        self.__lexers: dict[str, StatefulLexer] = {}
+
+    def get_lexer(self, language: str) -> StatefulLexer:
+        """
+        Returns the shared lexer of a language.
+
+        :param language: A language name or Pygments alias, e.g. "python" or "yml".
+        :raises ValueError: If Pygments has no lexer for the language.
+        """
+        language = self.canonical_name(language)
+        stateful_lexer = self.__lexers.get(language)
+        if stateful_lexer is None:
+            module_name, class_name = self.__classes[language]
+            lexer_class = getattr(importlib.import_module(module_name), class_name)
+            stateful_lexer = self.__lexers[language] = StatefulLexer(lexer_class())
+        return stateful_lexer
+
+    def canonical_name(self, language: str) -> str:
+        """
+        Returns the registry name of a language name or alias.
+
+        :raises ValueError: If Pygments has no lexer for the language.
+        """
+        language = language.lower()
+        if language in self.__classes:
+            return language
+        if f".{language}" in _BUILTIN_EXTENSIONS:
+            return _BUILTIN_EXTENSIONS[f".{language}"]
+        for class_name, (module_name, _, aliases, _, _) in _lexer_table():
+            if language in aliases:
+                return self.__register(aliases[0], module_name, class_name)
+        raise ValueError(f"Unknown language: {language}")
+
+    def language_for_filename(self, filename: str) -> Optional[str]:
+        """
+        Returns the language of a file from its name, or None if it is unknown.
+        """
+        basename: str = os.path.basename(filename)
+        language = _BUILTIN_EXTENSIONS.get(os.path.splitext(basename)[1].lower())
+        if language is not None:
+            return language
+        for class_name, (module_name, _, aliases, patterns, _) in _lexer_table():
+            if aliases and any(fnmatch(basename, pattern) for pattern in patterns):
+                return self.__register(aliases[0], module_name, class_name)
+        return None
+
+    def language_for_mimetype(self, mimetype: str) -> Optional[str]:
+        """
+        Returns the language of a MIME type, or None if it is unknown.
+        """
+        mimetype = mimetype.split(";")[0].strip().lower()
+        language = _BUILTIN_MIMETYPES.get(mimetype)
+        if language is not None:
+            return language
+        for class_name, (module_name, _, aliases, _, mimetypes) in _lexer_table():
+            if aliases and mimetype in mimetypes:
+                return self.__register(aliases[0], module_name, class_name)
+        return None
+
+    def language_for_content(self, text: str) -> Optional[str]:
+        """
+        Guesses the language from the beginning of a text, or returns None.
+
+        Only cheap checks are made (shebang line, leading JSON, SQL, Go and YAML
+        constructs); Pygments' own guessing imports every lexer module.
+        """
+        head: str = text.lstrip()[:4096]
+        shebang = _SHEBANG.match(head)
+        if shebang is not None:
+            interpreter = shebang.group("interpreter")
+            return "python" if interpreter.startswith("python") else self.__alias_or_none(interpreter)
+        if head and head[0] in "{[":
+            return "json"
+        if _SQL_START.match(head):
+            return "sql"
+        if _GO_START.match(head):
+            return "go"
+        if _YAML_START.match(head) and not head.startswith(("import ", "from ")):
+            return "yaml"
+        return None
+
+    def resolve(self, language: Optional[str] = None, filename: Optional[str] = None,
+                mimetype: Optional[str] = None, content: Optional[str] = None,
+                default: str = DEFAULT_LANGUAGE) -> str:
+        """
+        Picks the language of a document from the first conclusive hint.
+
+        :param language: Explicit language name or alias.
+        :param filename: Name or path of the file.
+        :param mimetype: MIME type of the content.
+        :param content: The text itself, sniffed as a last resort.
+        :param default: Language used when no hint is conclusive.
+        """
+        if language:
+            return self.canonical_name(language)
+        candidates = (
+            (filename, self.language_for_filename),
+            (mimetype, self.language_for_mimetype),
+            (content, self.language_for_content),
+        )
+        for hint, lookup in candidates:
+            if hint:
+                found = lookup(hint)
+                if found is not None:
+                    return found
+        return self.canonical_name(default)
+
+    def __alias_or_none(self, alias: str) -> Optional[str]:
+        """
+        Returns the registry name of an alias, or None if it is unknown.
+        """
+        try:
+            return self.canonical_name(alias)
+        except ValueError:
+            return None
+
+    def __register(self, language: str, module_name: str, class_name: str) -> str:
+        """
+        Records where the lexer class of a language lives and returns the language.
+        """
+        self.__classes.setdefault(language, (module_name, class_name))
+        return language
+
+
+def _lexer_table():
+    """
+    Returns the static Pygments lexer table as (class name, (module, name,
+    aliases, filename patterns, MIME types)) pairs, without importing any lexer.
+    """
+    from pygments.lexers._mapping import LEXERS
+    return LEXERS.items()
+
+
+_default_registry: Optional[LexerRegistry] = None
+
+
+def default_registry() -> LexerRegistry:
+    """
+    Returns the registry shared by all highlighters.
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = LexerRegistry()
+    return _default_registry
+
+
+def get_lexer(language: str) -> 'Lexer':
+    """
+    Returns the shared Pygments lexer of a language.
+
+    :param language: A language name or Pygments alias.
+    """
+    return default_registry().get_lexer(language).lexer
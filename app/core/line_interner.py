@@ -0,0 +1,164 @@
+from array import array
+from typing import Hashable, Iterable, Sequence
+
+from app.core.diff_engines import DiffEngine, Match, Opcode
+
+
+class LineInterner:
+    """
+    Maps every distinct line to a small integer ID.
+
+    Diffing IDs instead of strings makes every comparison an integer
+    comparison and every hash a cached int hash, and stores a document as one
+    4-byte item per line. Lines can be normalized before interning, so that
+    lines differing only in whitespace or case get the same ID.
+    """
+
+    def __init__(self, ignore_whitespace: bool = False, ignore_case: bool = False) -> None:
+        """
+        :param ignore_whitespace: Lines differing only in whitespace get the same ID.
+        :param ignore_case: Lines differing only in case get the same ID.
+        """
+        self.ignore_whitespace: bool = ignore_whitespace
+        self.ignore_case: bool = ignore_case
+        self.__ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of distinct (normalized) lines seen.
+        """
+        return len(self.__ids)
+
+    def normalize(self, line: str) -> str:
+        """
+        Returns the form of a line that is compared.
+        """
+        if self.ignore_whitespace:
+            line = "".join(line.split())
+        if self.ignore_case:
+            line = line.casefold()
+        return line
+
+    def intern(self, line: str) -> int:
+        """
+        Returns the ID of a line, giving it a new one if it was never seen.
+        """
+        if self.ignore_whitespace or self.ignore_case:
+            line = self.normalize(line)
+        ids: dict[str, int] = self.__ids
+        line_id = ids.get(line)
+        if line_id is None:
+            line_id = ids[line] = len(ids)
+        return line_id
+
+    def intern_lines(self, lines: Iterable[str]) -> array:
+        """
+        Returns the IDs of lines as an ``array('i')``.
+        """
+        if self.ignore_whitespace or self.ignore_case:
+            lines = map(self.normalize, lines)
+        ids: dict[str, int] = self.__ids
+        setdefault = ids.setdefault
+        # setdefault evaluates len(ids) before inserting, so a new line gets the next ID
+        return array('i', [setdefault(line, len(ids)) for line in lines])
+
+    def clear(self) -> None:
+        """
+        Forgets every line. IDs handed out before must not be compared with new ones.
+        """
+        self.__ids.clear()
+
+
+class InterningEngine(DiffEngine):
+    """
+    Runs another diff engine on interned line IDs, after stripping the common
+    prefix and suffix of both documents.
+
+    Lines are given as strings, or as arrays of IDs from this engine's
+    interner (e.g. interned while a file was read), which are diffed as they
+    are. The opcodes are the ones the wrapped engine finds for the
+    unchanged-free middle, shifted back into place.
+    """
+
+    def __init__(self, engine: DiffEngine, ignore_whitespace: bool = False, ignore_case: bool = False) -> None:
+        """
+        :param engine: The engine doing the actual diff.
+        :param ignore_whitespace: Lines differing only in whitespace are equal.
+        :param ignore_case: Lines differing only in case are equal.
+        """
+        self.engine: DiffEngine = engine
+        self.name: str = engine.name
+        self.interner: LineInterner = LineInterner(ignore_whitespace, ignore_case)
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles the engine without the interned lines: a child process only ever gets IDs.
+        """
+        state: dict = dict(self.__dict__)
+        state["interner"] = LineInterner(self.interner.ignore_whitespace, self.interner.ignore_case)
+        return state
+
+    def interned(self, lines: Sequence[Hashable]) -> array:
+        """
+        Returns the IDs of lines, or the lines themselves if they are IDs already.
+        """
+        return lines if isinstance(lines, array) else self.interner.intern_lines(lines)
+
+    def get_opcodes(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Opcode]:
+        a, b = self.interned(a), self.interned(b)
+        prefix: int = common_prefix(a, b)
+        suffix: int = common_suffix(a, b, prefix)
+        a_end, b_end = len(a) - suffix, len(b) - suffix
+        opcodes: list[Opcode] = []
+        if prefix:
+            opcodes.append(('equal', 0, prefix, 0, prefix))
+        if prefix < a_end or prefix < b_end:
+            # Lists index faster than arrays, which box every item they return
+            middle_a, middle_b = a[prefix:a_end].tolist(), b[prefix:b_end].tolist()
+            for tag, i1, i2, j1, j2 in self.engine.get_opcodes(middle_a, middle_b):
+                _append(opcodes, (tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+        if suffix:
+            _append(opcodes, ('equal', a_end, len(a), b_end, len(b)))
+        return opcodes
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        return [(i1, j1, i2 - i1) for tag, i1, i2, j1, j2 in self.get_opcodes(a, b) if tag == 'equal']
+
+
+def common_prefix(a: Sequence, b: Sequence) -> int:
+    """
+    Returns the length of the common prefix of two sequences.
+    """
+    low, high = 0, min(len(a), len(b))
+    # Binary search on slice comparisons, which run in C
+    while low < high:
+        middle: int = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix(a: Sequence, b: Sequence, prefix: int = 0) -> int:
+    """
+    Returns the length of the common suffix of two sequences, not overlapping a common prefix.
+    """
+    low, high = 0, min(len(a), len(b)) - prefix
+    while low < high:
+        middle: int = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _append(opcodes: list[Opcode], opcode: Opcode) -> None:
+    """
+    Appends an opcode, merging it into the previous one if both are equal runs.
+    """
+    if opcodes and opcode[0] == 'equal' == opcodes[-1][0]:
+        previous: Opcode = opcodes.pop()
+        opcode = ('equal', previous[1], opcode[2], previous[3], opcode[4])
+    opcodes.append(opcode)
@@ -0,0 +1,115 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Optional, Union
+
+from app.core.diff_engines import Opcode
+from app.core.hunk_table import HunkTable
+
+
+class LineMap:
+    """
+    Maps line positions of one side of a diff to the other side.
+
+    Only the hunks (non-equal opcodes) are kept, in a HunkTable whose bound
+    columns are sorted, so a lookup is a binary search over the hunks. Positions inside a
+    hunk are mapped proportionally, which keeps synchronized scrolling smooth
+    across hunks of different lengths.
+    """
+
+    def __init__(self, opcodes: Union[Iterable[Opcode], HunkTable]) -> None:
+        """
+        :param opcodes: Opcodes covering both documents, in order, or their hunk table.
+        """
+        self.hunks: HunkTable = opcodes if isinstance(opcodes, HunkTable) else HunkTable.from_opcodes(opcodes)
+        self.__starts: tuple[array, array] = (self.hunks.starts(0), self.hunks.starts(1))
+        self.__ends: tuple[array, array] = (self.hunks.ends(0), self.hunks.ends(1))
+
+    def bounds(self, side: int) -> tuple[array, array]:
+        """
+        Returns the start lines and the end lines of the hunks on one side.
+
+        :param side: 0 for the left side, 1 for the right side.
+        """
+        return self.__starts[side], self.__ends[side]
+
+    def map_line(self, side: int, line: float) -> float:
+        """
+        Returns the position on the other side matching a position on one side.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line position, possibly fractional, on that side.
+        """
+        index: int = bisect_right(self.__starts[side], line) - 1
+        if index < 0:
+            return line
+        start, end = self.__starts[side][index], self.__ends[side][index]
+        other_start, other_end = self.__starts[1 - side][index], self.__ends[1 - side][index]
+        if line < end:
+            return other_start + (line - start) * (other_end - other_start) / (end - start)
+        return other_end + (line - end)
+
+    def hunks_between(self, side: int, first: int, last: int) -> list[Opcode]:
+        """
+        Returns the hunks touching the lines [first, last] of one side,
+        including insertion points (empty hunks) inside that range.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param first: First line of the range.
+        :param last: Last line of the range.
+        """
+        index: int = bisect_left(self.__ends[side], first)
+        stop: int = bisect_right(self.__starts[side], last, lo=index)
+        return self.hunks[index:stop]
+
+    def nearest_hunk(self, side: int, line: float) -> Optional[int]:
+        """
+        Returns the index of the hunk containing a line of one side, or of the
+        closest hunk if none does, or None if there are no hunks.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line position, possibly fractional, on that side.
+        """
+        if not self.hunks:
+            return None
+        starts, ends = self.__starts[side], self.__ends[side]
+        index: int = bisect_right(starts, line)
+        if index == 0:
+            return 0
+        if index == len(starts) or line < ends[index - 1]:
+            return index - 1
+        # Between two hunks: the one whose edge is closer
+        return index - 1 if line - ends[index - 1] <= starts[index] - line else index
+
+    def hunk_at(self, side: int, line: int) -> Optional[int]:
+        """
+        Returns the index of the hunk containing a line of one side, or None.
+        An insertion point (empty hunk) contains the line it is placed before.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line number on that side.
+        """
+        index: int = bisect_right(self.__starts[side], line) - 1
+        if index < 0:
+            return None
+        start, end = self.__starts[side][index], self.__ends[side][index]
+        return index if line < end or line == start else None
+
+    def next_hunk(self, side: int, line: int) -> Optional[int]:
+        """
+        Returns the index of the first hunk starting after a line of one side, or None.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line number on that side.
+        """
+        index: int = bisect_right(self.__starts[side], line)
+        return index if index < len(self.hunks) else None
+
+    def previous_hunk(self, side: int, line: int) -> Optional[int]:
+        """
+        Returns the index of the last hunk starting before a line of one side, or None.
+
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line number on that side.
+        """
+        index: int = bisect_left(self.__starts[side], line) - 1
+        return index if index >= 0 else None
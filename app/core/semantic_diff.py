@@ -0,0 +1,318 @@
+import ast
+import hashlib
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence
+
+from app.core.diff_engines import DiffEngine, Match, Opcode, opcodes_from_matches
+from app.core.tracing import DIFF, traced
+
+# Kinds of definitions
+FUNCTION: str = "def"
+CLASS: str = "class"
+
+# Top-level lines that continue the statement above them instead of starting one
+_CONTINUATION: re.Pattern = re.compile(r"(?:else|elif|except|finally)\b|[)\]}]")
+
+
+class Definition:
+    """
+    A function or a class of a Python source, with the lines it spans.
+    """
+
+    __slots__ = ("kind", "name", "start", "end", "children")
+
+    def __init__(self, kind: str, name: str, start: int, end: int, children: list['Definition']) -> None:
+        """
+        :param kind: FUNCTION or CLASS.
+        :param name: Name of the function or class.
+        :param start: First line, decorators included, starting at 0.
+        :param end: Line after the last one.
+        :param children: Methods and nested classes of a class; empty for a function.
+        """
+        self.kind: str = kind
+        self.name: str = name
+        self.start: int = start
+        self.end: int = end
+        self.children: list[Definition] = children
+
+    def __repr__(self) -> str:
+        return f"Definition({self.kind!r}, {self.name!r}, {self.start}, {self.end})"
+
+    def shifted(self, offset: int) -> 'Definition':
+        """
+        Returns a copy moved down by a number of lines, children included.
+        """
+        return Definition(self.kind, self.name, self.start + offset, self.end + offset,
+                          [child.shifted(offset) for child in self.children])
+
+
+def _definitions(nodes: list[ast.stmt]) -> list[Definition]:
+    """
+    Returns the functions and classes among statements, with the members of the classes.
+    """
+    definitions: list[Definition] = []
+    for node in nodes:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            kind, children = FUNCTION, []
+        elif isinstance(node, ast.ClassDef):
+            kind, children = CLASS, _definitions(node.body)
+        else:
+            continue
+        start: int = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list]) - 1
+        definitions.append(Definition(kind, node.name, start, node.end_lineno, children))
+    return definitions
+
+
+def top_level_blocks(lines: Sequence[str]) -> list[int]:
+    """
+    Returns the lines where a top-level statement may start, the first line included.
+
+    A line starting in the first column starts a block unless it is blank, a
+    comment, a continuation such as ``else:`` or a closing bracket, or it
+    follows a decorator or a backslash. Lines inside a multi-line string or
+    bracket may still be taken for starts; parsing tells them apart.
+    """
+    starts: list[int] = [0]
+    # Whether the next line belongs to the statement of the previous one
+    joined: bool = True
+    for index, line in enumerate(lines):
+        if not line or line[0] == "#":
+            continue
+        if line[0] in " \t\f":
+            joined = False
+        else:
+            if not joined and not _CONTINUATION.match(line):
+                starts.append(index)
+            joined = line[0] == "@"
+        if line.endswith("\\"):
+            joined = True
+    return starts
+
+
+class ParseCache:
+    """
+    Definitions of Python sources, cached per content hash of every top-level block.
+
+    A source is cut into top-level blocks without parsing it, and each block
+    is parsed on its own. A block that does not parse, such as half a
+    multi-line string, is joined with the next ones until it does. After an
+    edit, only the blocks whose text changed are parsed again. The cache is
+    shared by diff workers, so its entries are only touched under a lock;
+    parsing itself runs outside it.
+    """
+
+    # Blocks joined before the rest of the source is parsed in one go
+    MAX_JOINED: int = 100
+
+    def __init__(self, max_entries: int = 50_000) -> None:
+        """
+        :param max_entries: Maximum number of blocks kept.
+        """
+        self.max_entries: int = max_entries
+        # Number of calls to ast.parse
+        self.parses: int = 0
+        self.__entries: OrderedDict[bytes, Optional[list[Definition]]] = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+
+    def definitions(self, lines: Sequence[str]) -> Optional[list[Definition]]:
+        """
+        Returns the top-level functions and classes of a source, or None if it is not valid Python.
+
+        :param lines: Lines of the source.
+        """
+        starts: list[int] = top_level_blocks(lines) + [len(lines)]
+        definitions: list[Definition] = []
+        block: int = 0
+        while block < len(starts) - 1:
+            start: int = starts[block]
+            stop: int = block + 1
+            parsed: Optional[list[Definition]] = self.__parse(lines, start, starts[stop])
+            while parsed is None and stop < len(starts) - 1:
+                stop = stop + 1 if stop - block < self.MAX_JOINED else len(starts) - 1
+                parsed = self.__parse(lines, start, starts[stop])
+            if parsed is None:
+                return None
+            definitions.extend(definition.shifted(start) if start else definition for definition in parsed)
+            block = stop
+        return definitions
+
+    def clear(self) -> None:
+        """
+        Drops all cached blocks and resets the counter.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.parses = 0
+
+    def __parse(self, lines: Sequence[str], start: int, end: int) -> Optional[list[Definition]]:
+        """
+        Returns the definitions of the lines [start, end), counted from start, or None if they do not parse.
+        """
+        text: str = "\n".join(lines[start:end])
+        key: bytes = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+            self.parses += 1
+        try:
+            parsed: Optional[list[Definition]] = _definitions(ast.parse(text).body)
+        except (SyntaxError, ValueError):
+            parsed = None
+        if self.max_entries:
+            with self.__lock:
+                self.__entries[key] = parsed
+                self.__entries.move_to_end(key)
+                while len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+        return parsed
+
+
+def match_definitions(left: list[Definition], right: list[Definition]) -> list[tuple[Definition, Definition]]:
+    """
+    Pairs the definitions of both sides by kind and name, the n-th of a name
+    with the n-th, keeping the longest run of pairs in the same order on both sides.
+    """
+    positions: dict[tuple[str, str], list[int]] = {}
+    for index, definition in enumerate(right):
+        positions.setdefault((definition.kind, definition.name), []).append(index)
+    seen: dict[tuple[str, str], int] = {}
+    pairs: list[tuple[int, int]] = []
+    for index, definition in enumerate(left):
+        key: tuple[str, str] = (definition.kind, definition.name)
+        occurrence: int = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        candidates: Optional[list[int]] = positions.get(key)
+        if candidates is not None and occurrence < len(candidates):
+            pairs.append((index, candidates[occurrence]))
+    return [(left[i], right[j]) for i, j in _increasing(pairs)]
+
+
+def _increasing(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Returns the longest subsequence of pairs whose second items increase, in O(n log n).
+    """
+    tails: list[int] = []
+    tail_indexes: list[int] = []
+    previous: list[int] = []
+    for index, (_, j) in enumerate(pairs):
+        position: int = bisect_left(tails, j)
+        previous.append(tail_indexes[position - 1] if position else -1)
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+    kept: list[tuple[int, int]] = []
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index >= 0:
+        kept.append(pairs[index])
+        index = previous[index]
+    return kept[::-1]
+
+
+class SemanticEngine(DiffEngine):
+    """
+    Diffs two Python sources definition by definition.
+
+    Functions and classes are matched by kind and name. Matched pairs, and
+    the lines between them, are diffed separately with the line engine, and
+    the members of matched classes are matched the same way, so a refactored
+    function is compared with its old version instead of with whatever lines
+    look alike elsewhere, and no diff spans the whole file. Sources that are
+    not valid Python are diffed line by line.
+
+    The engine is made for one pair of sources, which it parses; the
+    sequences it is asked to diff are their lines, or keys standing for them
+    such as interned IDs.
+    """
+
+    name = "python"
+
+    def __init__(self, engine: DiffEngine, left: Sequence[str], right: Sequence[str],
+                 parse_cache: Optional[ParseCache] = None) -> None:
+        """
+        :param engine: The line engine diffing each region.
+        :param left: Lines of the left source.
+        :param right: Lines of the right source.
+        :param parse_cache: Cache of parsed blocks; the shared one if omitted.
+        """
+        self.engine: DiffEngine = engine
+        self.left: Sequence[str] = left
+        self.right: Sequence[str] = right
+        self.parse_cache: Optional[ParseCache] = parse_cache
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles the engine without the parse cache, which a child process builds anew.
+        """
+        return dict(self.__dict__, parse_cache=None)
+
+    @traced("SemanticEngine.get_opcodes", DIFF)
+    def get_opcodes(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Opcode]:
+        cache: ParseCache = self.parse_cache if self.parse_cache is not None else default_parse_cache()
+        left_definitions: Optional[list[Definition]] = cache.definitions(self.left)
+        right_definitions: Optional[list[Definition]] = (
+            cache.definitions(self.right) if left_definitions is not None else None)
+        if right_definitions is None:
+            return self.engine.get_opcodes(a, b)
+        matches: list[Match] = []
+        self.__diff_region(a, b, (0, len(a)), (0, len(b)), left_definitions, right_definitions, matches)
+        return opcodes_from_matches(matches, len(a), len(b))
+
+    def get_matches(self, a: Sequence[Hashable], b: Sequence[Hashable]) -> list[Match]:
+        return [(i1, j1, i2 - i1) for tag, i1, i2, j1, j2 in self.get_opcodes(a, b) if tag == 'equal']
+
+    def __diff_region(self, a: Sequence[Hashable], b: Sequence[Hashable], left: tuple[int, int],
+                      right: tuple[int, int], left_definitions: list[Definition],
+                      right_definitions: list[Definition], matches: list[Match]) -> None:
+        """
+        Adds the equal runs of a region of both sides, given the definitions inside it.
+        """
+        i, j = left[0], right[0]
+        for left_definition, right_definition in match_definitions(left_definitions, right_definitions):
+            self.__diff_lines(a, b, i, left_definition.start, j, right_definition.start, matches)
+            bounds: tuple[tuple[int, int], tuple[int, int]] = (
+                (left_definition.start, left_definition.end), (right_definition.start, right_definition.end))
+            if left_definition.children or right_definition.children:
+                self.__diff_region(a, b, *bounds, left_definition.children, right_definition.children, matches)
+            else:
+                self.__diff_lines(a, b, *bounds[0], *bounds[1], matches)
+            i, j = left_definition.end, right_definition.end
+        self.__diff_lines(a, b, i, left[1], j, right[1], matches)
+
+    def __diff_lines(self, a: Sequence[Hashable], b: Sequence[Hashable], i1: int, i2: int, j1: int, j2: int,
+                     matches: list[Match]) -> None:
+        """
+        Adds the equal runs of the lines a[i1:i2] and b[j1:j2], found by the line engine.
+        """
+        if i1 == i2 or j1 == j2:
+            return
+        for tag, a1, a2, b1, _ in self.engine.get_opcodes(a[i1:i2], b[j1:j2]):
+            if tag == 'equal':
+                matches.append((i1 + a1, j1 + b1, a2 - a1))
+
+
+_default_parse_cache: Optional[ParseCache] = None
+
+
+def default_parse_cache() -> ParseCache:
+    """
+    Returns the parse cache shared by all semantic diffs.
+    """
+    global _default_parse_cache
+    if _default_parse_cache is None:
+        _default_parse_cache = ParseCache()
+    return _default_parse_cache
+
+
+def set_default_parse_cache(cache: ParseCache) -> None:
+    """
+    Replaces the parse cache shared by all semantic diffs.
+    """
+    global _default_parse_cache
+    _default_parse_cache = cache
@@ -0,0 +1,197 @@
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterator, Union
+
+from pygments.token import Error, Whitespace, _TokenType
+
+if TYPE_CHECKING:
+    # pygments.lexer pulls in the plugin machinery; it is imported with the first lexer
+    from pygments.lexer import Lexer, RegexLexer
+
+# A token inside a line: (start, length, token type)
+Span = tuple[int, int, _TokenType]
+
+# State of a line that starts with an empty lexer stack
+ROOT_STATE: int = 0
+
+
+class TokenSpans:
+    """
+    The token spans of a line, stored compactly: starts and lengths in one
+    integer array, token types in a tuple. The token cache holds one of these
+    per line instead of a list of span tuples; iterating it gives the spans.
+    """
+
+    __slots__ = ("bounds", "types")
+
+    def __init__(self, bounds: array, types: tuple[_TokenType, ...]) -> None:
+        """
+        :param bounds: Array of type 'I' of the start and the length of every span.
+        :param types: Token type of every span.
+        """
+        self.bounds: array = bounds
+        self.types: tuple[_TokenType, ...] = types
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __iter__(self) -> Iterator[Span]:
+        return zip(self.bounds[0::2], self.bounds[1::2], self.types)
+
+    def __getitem__(self, index: int) -> Span:
+        index = range(len(self.types))[index]
+        return self.bounds[2 * index], self.bounds[2 * index + 1], self.types[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TokenSpans):
+            return self.bounds == other.bounds and self.types == other.types
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TokenSpans({list(self)!r})"
+
+
+class StatefulLexer:
+    """
+    Line-by-line front end for a Pygments lexer that carries state between lines.
+
+    The state at the end of a line (the lexer's state stack, which tells for
+    example that a triple-quoted string is still open) is interned to a small
+    integer so it can be stored with ``QSyntaxHighlighter.setCurrentBlockState``.
+    Results are cached per (line text, incoming state), so identical lines and
+    re-highlighting passes do not run the lexer again.
+    """
+
+    def __init__(self, lexer: 'Lexer', cache_size: int = 100_000) -> None:
+        """
+        :param lexer: The Pygments lexer to drive.
+        :param cache_size: Maximum number of lines kept in the token cache.
+        """
+        from pygments.lexer import ExtendedRegexLexer, RegexLexer
+        self.lexer: 'Lexer' = lexer
+        self.cache_size: int = cache_size
+        # Only plain regex lexers expose their state stack; others are lexed line by line
+        self.stateful: bool = (isinstance(lexer, RegexLexer) and not isinstance(lexer, ExtendedRegexLexer)
+                               and type(lexer).get_tokens_unprocessed is RegexLexer.get_tokens_unprocessed)
+        self.__stacks: list[tuple[str, ...]] = [('root',)]
+        self.__states: dict[tuple[str, ...], int] = {('root',): ROOT_STATE}
+        self.__cache: OrderedDict[tuple[str, int], tuple[TokenSpans, int]] = OrderedDict()
+
+    def tokenize_line(self, text: str, state: int = ROOT_STATE) -> tuple[TokenSpans, int]:
+        """
+        Splits a line into token spans.
+
+        :param text: The line, without its line terminator.
+        :param state: State at the end of the previous line; negative values
+                      (an unhighlighted previous block) mean ROOT_STATE.
+        :return: The spans and the state at the end of the line.
+        """
+        key: tuple[str, int] = (text, max(state, ROOT_STATE))
+        cached = self.__cache.get(key)
+        if cached is not None:
+            self.__cache.move_to_end(key)
+            return cached
+
+        if self.stateful:
+            result = self.__lex(text, self.__stacks[key[1]])
+        else:
+            result = _to_spans(self.lexer.get_tokens_unprocessed(text + '\n'), len(text)), ROOT_STATE
+
+        if self.cache_size:
+            self.__cache[key] = result
+            if len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+        return result
+
+    def clear_cache(self) -> None:
+        """
+        Drops all cached token spans.
+        """
+        self.__cache.clear()
+
+    def __lex(self, text: str, stack: tuple[str, ...]) -> tuple[TokenSpans, int]:
+        """
+        Runs the regex lexer on a line starting with the given state stack.
+
+        Mirrors ``RegexLexer.get_tokens_unprocessed``, but returns the final stack.
+        """
+        lexer: 'RegexLexer' = self.lexer
+        tokendefs = lexer._tokens
+        statestack: list[str] = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        # The newline lets end-of-line rules match; its token is dropped below
+        line: str = text + '\n'
+        tokens: list[tuple[int, _TokenType, str]] = []
+        pos: int = 0
+        while pos < len(line):
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(line, pos)
+                if m:
+                    if type(action) is _TokenType:
+                        tokens.append((pos, action, m.group()))
+                    elif action is not None:
+                        tokens.extend(action(lexer, m))
+                    pos = m.end()
+                    if new_state is not None:
+                        _transition(statestack, new_state)
+                        statetokens = tokendefs[statestack[-1]]
+                    break
+            else:
+                if line[pos] == '\n':
+                    statestack = ['root']
+                    statetokens = tokendefs['root']
+                    tokens.append((pos, Whitespace, '\n'))
+                else:
+                    tokens.append((pos, Error, line[pos]))
+                pos += 1
+        return _to_spans(tokens, len(text)), self.__intern(tuple(statestack))
+
+    def __intern(self, stack: tuple[str, ...]) -> int:
+        """
+        Returns the integer state of a state stack.
+        """
+        state = self.__states.get(stack)
+        if state is None:
+            state = self.__states[stack] = len(self.__stacks)
+            self.__stacks.append(stack)
+        return state
+
+
+def _transition(statestack: list[str], new_state: Union[tuple[str, ...], int, str]) -> None:
+    """
+    Applies a Pygments state transition to the stack, like ``RegexLexer`` does.
+    """
+    if isinstance(new_state, tuple):
+        for state in new_state:
+            if state == '#pop':
+                if len(statestack) > 1:
+                    statestack.pop()
+            elif state == '#push':
+                statestack.append(statestack[-1])
+            else:
+                statestack.append(state)
+    elif isinstance(new_state, int):
+        # Pop, but keep at least one state on the stack
+        if abs(new_state) >= len(statestack):
+            del statestack[1:]
+        else:
+            del statestack[new_state:]
+    elif new_state == '#push':
+        statestack.append(statestack[-1])
+
+
+def _to_spans(tokens, length: int) -> TokenSpans:
+    """
+    Converts ``(position, token type, value)`` tuples into spans inside a line
+    of the given length, dropping the trailing newline token.
+    """
+    bounds: list[int] = []
+    types: list[_TokenType] = []
+    for position, token_type, value in tokens:
+        if position >= length:
+            break
+        bounds += (position, min(len(value), length - position))
+        types.append(token_type)
+    return TokenSpans(array('I', bounds), tuple(types))
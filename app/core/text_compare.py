@@ -0,0 +1,352 @@
+from bisect import bisect_right
+from typing import Callable, Hashable, Iterable, Iterator, Optional, Sequence, Union
+
+from app.core.diff_cache import DiffCache
+from app.core.diff_engines import DiffEngine, Opcode, get_diff_engine
+from app.core.hunk_table import hunk_tag
+from app.core.intraline import IntralineDiffer, Range
+from app.core.line_interner import InterningEngine
+from app.core.semantic_diff import SemanticEngine
+from app.core.stateful_lexer import ROOT_STATE, StatefulLexer, TokenSpans
+from app.core.tracing import DIFF, traced
+
+# A diff hunk as plain data, ready for json.dumps
+Hunk = dict[str, object]
+
+
+class TextComparison:
+    """
+    Compares two texts line by line without any Qt object: line opcodes,
+    changed ranges inside replaced lines, token spans of the changed lines,
+    and unified diff or JSON output.
+
+    Lines follow ``str.split("\\n")``, as the blocks of a QTextDocument do, so
+    line numbers are the same in a CodeCompareWidget and in batch output.
+    """
+
+    def __init__(self, diff_engine: Union[str, DiffEngine] = "difflib", intraline: Optional[str] = "token",
+                 ignore_whitespace: bool = False, ignore_case: bool = False,
+                 cache: Optional[DiffCache] = None, semantic: bool = False) -> None:
+        """
+        :param diff_engine: Name or instance of the diff engine.
+        :param intraline: Granularity of the changed ranges inside replaced lines; None for whole lines only.
+        :param ignore_whitespace: Lines differing only in whitespace are equal.
+        :param ignore_case: Lines differing only in case are equal.
+        :param cache: Cache of diff results; None for no cache.
+        :param semantic: The texts are Python sources, diffed definition by definition.
+        """
+        # Algorithm used to compute the differences, run on interned lines
+        self.diff_engine: InterningEngine = InterningEngine(get_diff_engine(diff_engine), ignore_whitespace,
+                                                            ignore_case)
+        # Changed words or characters inside replaced lines; None highlights whole lines only
+        self.intraline: Optional[IntralineDiffer] = IntralineDiffer(intraline) if intraline else None
+        self.cache: Optional[DiffCache] = cache
+        # Full diffs match functions and classes by name first; see SemanticEngine
+        self.semantic: bool = semantic
+
+    def get_opcodes(self, left: Sequence[Hashable], right: Sequence[Hashable]) -> list[Opcode]:
+        """
+        Returns the opcodes turning the left lines into the right ones.
+
+        :param left: Lines of the left text, or their IDs from ``diff_engine.interner``.
+        :param right: Lines of the right text, or their IDs.
+        """
+        return self.diff_engine.get_opcodes(left, right)
+
+    def engine_for(self, left: Sequence[str], right: Sequence[str]) -> DiffEngine:
+        """
+        Returns the engine diffing two texts in full: a SemanticEngine on the
+        line engine in semantic mode, else the line engine.
+
+        :param left: Lines of the left text.
+        :param right: Lines of the right text.
+        """
+        return SemanticEngine(self.diff_engine, left, right) if self.semantic else self.diff_engine
+
+    def cache_key(self, left: Sequence[str], right: Sequence[str]) -> bytes:
+        """
+        Returns the key of the comparison of two texts in a DiffCache: their
+        contents, the engine and its settings, and the ignored differences.
+        """
+        interner = self.diff_engine.interner
+        options: str = f"{_engine_signature(self.diff_engine.engine)}|{interner.ignore_whitespace}|{interner.ignore_case}"
+        if self.semantic:
+            options += f"|{SemanticEngine.name}"
+        return DiffCache.key(left, right, options)
+
+    @traced("TextComparison.diff", DIFF)
+    def diff(self, left: Sequence[str], right: Sequence[str], left_keys: Optional[Sequence[Hashable]] = None,
+             right_keys: Optional[Sequence[Hashable]] = None) -> list[Opcode]:
+        """
+        Returns the opcodes turning the left lines into the right ones, from
+        the cache if the same comparison was made before.
+
+        :param left: Lines of the left text.
+        :param right: Lines of the right text.
+        :param left_keys: IDs of the left lines, if already interned.
+        :param right_keys: IDs of the right lines, if already interned.
+        """
+        key: Optional[bytes] = self.cache_key(left, right) if self.cache is not None else None
+        opcodes: Optional[list[Opcode]] = (
+            self.cache.get(key, (len(left), len(right))) if key is not None else None)
+        if opcodes is None:
+            opcodes = self.engine_for(left, right).get_opcodes(left if left_keys is None else left_keys,
+                                                               right if right_keys is None else right_keys)
+            if key is not None:
+                self.cache.put(key, opcodes)
+        return opcodes
+
+    def compare(self, left_text: str, right_text: str) -> tuple[list[str], list[str], list[Opcode]]:
+        """
+        Splits two texts into lines and diffs them.
+
+        :return: The left lines, the right lines and the opcodes.
+        """
+        left: list[str] = left_text.split('\n')
+        right: list[str] = right_text.split('\n')
+        # Lines of earlier comparisons need no ID any more
+        self.diff_engine.interner.clear()
+        return left, right, self.diff(left, right)
+
+    def inline_ranges(self, opcodes: list[Opcode], side: int, line: int,
+                      line_text: Callable[[int, int], str]) -> Optional[list[Range]]:
+        """
+        Returns the changed character ranges of a replaced line, compared with
+        the line it is paired with, or None if the line has no pair.
+
+        :param opcodes: Opcodes of the texts, in order.
+        :param side: 0 for the left side, 1 for the right side.
+        :param line: Line number on that side.
+        :param line_text: Returns the text of a line, given its side and number.
+        """
+        if self.intraline is None:
+            return None
+        index: int = bisect_right(opcodes, line, key=lambda opcode: opcode[1 + 2 * side]) - 1
+        if index < 0 or not line < opcodes[index][2 + 2 * side]:
+            return None
+        other_line: Optional[int] = self.intraline.paired_line(opcodes[index], side, line)
+        if other_line is None:
+            return None
+        texts: list[str] = ["", ""]
+        texts[side] = line_text(side, line)
+        texts[1 - side] = line_text(1 - side, other_line)
+        return self.intraline.diff_lines(*texts)[side]
+
+    def hunks(self, left: Sequence[str], right: Sequence[str], opcodes: Iterable[Opcode],
+              lexer: Optional[StatefulLexer] = None) -> Iterator[Hunk]:
+        """
+        Yields every difference as plain data, one hunk at a time.
+
+        Each hunk has its ``tag``, and per side (``left`` and ``right``) the
+        ``start`` and ``end`` lines, the ``lines`` themselves, the ``changes``
+        inside each line (a list of [start, end] ranges, or None for a line
+        without a pair) and, if a lexer is given, the ``tokens`` of each line
+        as [start, length, token type] triples.
+
+        :param left: Lines of the left text.
+        :param right: Lines of the right text.
+        :param opcodes: Opcodes of the texts, in order.
+        :param lexer: Lexer giving the token spans; no spans if omitted.
+        """
+        lines: tuple[Sequence[str], Sequence[str]] = (left, right)
+        tokenizers: Optional[tuple[_LineTokenizer, _LineTokenizer]] = None
+        if lexer is not None:
+            tokenizers = (_LineTokenizer(lexer, left), _LineTokenizer(lexer, right))
+        ordered: list[Opcode] = list(opcodes)
+        for opcode in ordered:
+            if opcode[0] == 'equal':
+                continue
+            hunk: Hunk = {"tag": opcode[0]}
+            for side, name in enumerate(("left", "right")):
+                start, end = opcode[1 + 2 * side], opcode[2 + 2 * side]
+                part: dict[str, object] = {
+                    "start": start,
+                    "end": end,
+                    "lines": list(lines[side][start:end]),
+                    "changes": [self.inline_ranges(ordered, side, line, lambda s, n: lines[s][n])
+                                for line in range(start, end)],
+                }
+                if tokenizers is not None:
+                    part["tokens"] = [[(position, length, str(token_type)) for position, length, token_type in spans]
+                                      for spans in tokenizers[side].spans(start, end)]
+                hunk[name] = part
+            yield hunk
+
+    def unified_diff(self, left: Sequence[str], right: Sequence[str], opcodes: Iterable[Opcode],
+                     left_name: str = "a", right_name: str = "b", context: int = 3) -> Iterator[str]:
+        """
+        Yields a unified diff of the texts, line by line, each ending with "\\n".
+
+        The empty line after a final newline is not a line of the file; a
+        file without a final newline gets the usual "\\ No newline at end of
+        file" marker. Nothing is yielded if the texts are equal.
+
+        :param left: Lines of the left text.
+        :param right: Lines of the right text.
+        :param opcodes: Opcodes of the texts, in order.
+        :param left_name: Name of the left file in the header.
+        :param right_name: Name of the right file in the header.
+        :param context: Number of unchanged lines around each hunk.
+        """
+        lengths: tuple[int, int] = (_file_length(left), _file_length(right))
+        groups: Iterator[list[Opcode]] = group_opcodes(_file_opcodes(opcodes, left, right, *lengths), context)
+        for index, group in enumerate(groups):
+            if not index:
+                yield f"--- {left_name}\n"
+                yield f"+++ {right_name}\n"
+            first, last = group[0], group[-1]
+            yield f"@@ -{_unified_range(first[1], last[2])} +{_unified_range(first[3], last[4])} @@\n"
+            for tag, i1, i2, j1, j2 in group:
+                if tag == 'equal':
+                    yield from _unified_lines(" ", left, i1, i2, lengths[0])
+                    continue
+                yield from _unified_lines("-", left, i1, i2, lengths[0])
+                yield from _unified_lines("+", right, j1, j2, lengths[1])
+
+
+def group_opcodes(opcodes: Iterable[Opcode], context: int = 3) -> Iterator[list[Opcode]]:
+    """
+    Groups opcodes into hunks with up to ``context`` unchanged lines around
+    each change, as ``difflib.SequenceMatcher.get_grouped_opcodes`` does.
+    Nothing is yielded if there is no change.
+    """
+    codes: list[Opcode] = list(opcodes)
+    if codes and codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if codes and codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # An unchanged run longer than the context on both of its ends splits the hunks
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            if group:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                yield group
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if any(opcode[0] != 'equal' for opcode in group):
+        yield group
+
+
+def _engine_signature(engine: DiffEngine) -> str:
+    """
+    Returns the class and settings of an engine, e.g. "MyersEngine(min_cost=256)",
+    the same in every session; engines it falls back to are included.
+    """
+    settings: str = ", ".join(f"{name}={_engine_signature(value) if isinstance(value, DiffEngine) else repr(value)}"
+                              for name, value in sorted(vars(engine).items()))
+    return f"{type(engine).__qualname__}({settings})"
+
+
+class _LineTokenizer:
+    """
+    Token spans of the lines of a text, lexed from the first line on so that
+    every line starts in the state the previous one ended in. Lines must be
+    asked for in increasing order.
+    """
+
+    def __init__(self, lexer: StatefulLexer, lines: Sequence[str]) -> None:
+        self.lexer: StatefulLexer = lexer
+        self.lines: Sequence[str] = lines
+        self.__line: int = 0
+        self.__state: int = ROOT_STATE
+
+    def spans(self, start: int, end: int) -> list[TokenSpans]:
+        """
+        Returns the token spans of the lines [start, end).
+        """
+        result: list[TokenSpans] = []
+        while self.__line < end:
+            spans, self.__state = self.lexer.tokenize_line(self.lines[self.__line], self.__state)
+            if self.__line >= start:
+                result.append(spans)
+            self.__line += 1
+        return result
+
+
+def _file_length(lines: Sequence[str]) -> int:
+    """
+    Returns the number of lines of a file: a final empty line only follows its final newline.
+    """
+    return len(lines) - 1 if lines and lines[-1] == "" else len(lines)
+
+
+def _file_opcodes(opcodes: Iterable[Opcode], left: Sequence[str], right: Sequence[str],
+                  left_length: int, right_length: int) -> list[Opcode]:
+    """
+    Clips opcodes to the lines of both files. An equal run is clipped by the
+    same number of lines on both sides, and the lines left over on one side
+    are a change. A last line without a newline only equals the other file's
+    last line without a newline, so it is split out of the equal run it is
+    in otherwise.
+    """
+    clipped: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        i1, i2, j1, j2 = min(i1, left_length), min(i2, left_length), min(j1, right_length), min(j2, right_length)
+        if tag == 'equal':
+            kept: int = min(i2 - i1, j2 - j1)
+            if kept:
+                clipped.append(('equal', i1, i1 + kept, j1, j1 + kept))
+            i1, j1 = i1 + kept, j1 + kept
+        if i1 < i2 or j1 < j2:
+            _append_change(clipped, i1, i2, j1, j2)
+    # Line of each side without a newline, if any
+    unterminated: tuple[int, int] = (left_length - 1 if left_length == len(left) else -1,
+                                     right_length - 1 if right_length == len(right) else -1)
+    for side in (0, 1):
+        if unterminated[side] >= 0:
+            _split_unterminated(clipped, side, unterminated)
+    return clipped
+
+
+def _append_change(opcodes: list[Opcode], i1: int, i2: int, j1: int, j2: int) -> None:
+    """
+    Appends a change to opcodes, merged with the change before it if they touch.
+    """
+    if opcodes and opcodes[-1][0] != 'equal':
+        _, i1, _, j1, _ = opcodes.pop()
+    opcodes.append((hunk_tag(i1, i2, j1, j2), i1, i2, j1, j2))
+
+
+def _split_unterminated(opcodes: list[Opcode], side: int, unterminated: tuple[int, int]) -> None:
+    """
+    Turns the last line of one side into a one-line replacement if it is
+    paired in an equal run with a line that does not lack a newline too.
+    """
+    line: int = unterminated[side]
+    for index in range(len(opcodes) - 1, -1, -1):
+        tag, i1, i2, j1, j2 = opcodes[index]
+        bounds: tuple[int, int, int, int] = (i1, i2, j1, j2) if side == 0 else (j1, j2, i1, i2)
+        if bounds[0] <= line < bounds[1]:
+            break
+    else:
+        return
+    other_line: int = bounds[2] + line - bounds[0]
+    if tag != 'equal' or other_line == unterminated[1 - side]:
+        return
+    i, j = (line, other_line) if side == 0 else (other_line, line)
+    opcodes[index:index + 1] = [opcode for opcode in (('equal', i1, i, j1, j), ('replace', i, i + 1, j, j + 1),
+                                                      ('equal', i + 1, i2, j + 1, j2)) if opcode[1] < opcode[2]]
+
+
+def _unified_range(start: int, end: int) -> str:
+    """
+    Returns a line range in the format of a unified diff hunk header.
+    """
+    length: int = end - start
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start + 1 if length else start},{length}"
+
+
+def _unified_lines(prefix: str, lines: Sequence[str], start: int, end: int, length: int) -> Iterator[str]:
+    """
+    Yields lines of a unified diff, marking a last line without a newline.
+    """
+    for line in range(start, end):
+        yield f"{prefix}{lines[line]}\n"
+        if line == length - 1 and length == len(lines):
+            yield "\\ No newline at end of file\n"
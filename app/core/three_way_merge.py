@@ -0,0 +1,245 @@
+from array import array
+from bisect import bisect_right
+from typing import Optional, Sequence, Union
+
+from app.core.diff_engines import DiffEngine, Opcode, get_diff_engine
+from app.core.line_interner import InterningEngine
+from app.core.tracing import DIFF, traced
+
+# Kinds of merge hunks: changed on one side only, the same way on both, or differently on both
+LEFT_CHANGE: str = "left"
+RIGHT_CHANGE: str = "right"
+SAME_CHANGE: str = "same"
+CONFLICT: str = "conflict"
+
+# Resolutions of a hunk: the lines of one side, of the left then the right side, or of the base
+TAKE_LEFT: str = "left"
+TAKE_RIGHT: str = "right"
+TAKE_BOTH: str = "both"
+TAKE_BASE: str = "base"
+RESOLUTIONS: tuple[str, ...] = (TAKE_LEFT, TAKE_RIGHT, TAKE_BOTH, TAKE_BASE)
+
+# Lines around an unresolved conflict in the merged text, as git writes them
+CONFLICT_START: str = "<<<<<<<"
+CONFLICT_SEPARATOR: str = "======="
+CONFLICT_END: str = ">>>>>>>"
+
+# (start, end) of a range of lines
+LineRange = tuple[int, int]
+
+
+class MergeHunk:
+    """
+    A region where the left or the right side, or both, differ from the base.
+    """
+
+    __slots__ = ("kind", "base", "left", "right", "resolution", "result")
+
+    def __init__(self, kind: str, base: LineRange, left: LineRange, right: LineRange) -> None:
+        """
+        :param kind: LEFT_CHANGE, RIGHT_CHANGE, SAME_CHANGE or CONFLICT.
+        :param base: Lines of the base.
+        :param left: Lines of the left side.
+        :param right: Lines of the right side.
+        """
+        self.kind: str = kind
+        self.base: LineRange = base
+        self.left: LineRange = left
+        self.right: LineRange = right
+        # Changes of one side are taken as they are; conflicts wait for a decision
+        self.resolution: Optional[str] = {LEFT_CHANGE: TAKE_LEFT, RIGHT_CHANGE: TAKE_RIGHT,
+                                          SAME_CHANGE: TAKE_LEFT}.get(kind)
+        # Lines of the merged text
+        self.result: LineRange = (0, 0)
+
+    def __repr__(self) -> str:
+        return f"MergeHunk({self.kind!r}, {self.base}, {self.left}, {self.right})"
+
+    def is_resolved(self) -> bool:
+        """
+        Returns whether the merged text has the lines of a side, or of the base, for this hunk.
+        """
+        return self.resolution is not None
+
+
+def merge_hunks(base_to_left: Sequence[Opcode], base_to_right: Sequence[Opcode],
+                left_ids: Sequence[int], right_ids: Sequence[int]) -> list[MergeHunk]:
+    """
+    Classifies the changes of both sides in one pass over the base.
+
+    Changes of both sides whose base ranges overlap or touch are grouped into
+    one hunk, which conflicts unless both sides have the same lines there.
+
+    :param base_to_left: Opcodes turning the base into the left side.
+    :param base_to_right: Opcodes turning the base into the right side.
+    :param left_ids: Interned lines of the left side.
+    :param right_ids: Interned lines of the right side, from the same interner.
+    """
+    changes: tuple[list[Opcode], list[Opcode]] = tuple(
+        [opcode for opcode in opcodes if opcode[0] != 'equal'] for opcodes in (base_to_left, base_to_right))
+    next_change: list[int] = [0, 0]
+    # Line of each side minus line of the base, after the hunks found so far
+    offsets: list[int] = [0, 0]
+    hunks: list[MergeHunk] = []
+    while next_change[0] < len(changes[0]) or next_change[1] < len(changes[1]):
+        starts: list[float] = [changes[side][next_change[side]][1] if next_change[side] < len(changes[side])
+                               else float("inf") for side in (0, 1)]
+        low: int = int(min(starts))
+        high: int = low
+        members: tuple[list[Opcode], list[Opcode]] = ([], [])
+        grown: bool = True
+        while grown:
+            grown = False
+            for side in (0, 1):
+                while next_change[side] < len(changes[side]) and changes[side][next_change[side]][1] <= high:
+                    change: Opcode = changes[side][next_change[side]]
+                    members[side].append(change)
+                    next_change[side] += 1
+                    high = max(high, change[2])
+                    grown = True
+        ranges: list[LineRange] = []
+        for side in (0, 1):
+            if members[side]:
+                first, last = members[side][0], members[side][-1]
+                ranges.append((first[3] - (first[1] - low), last[4] + (high - last[2])))
+                offsets[side] = ranges[side][1] - high
+            else:
+                ranges.append((low + offsets[side], high + offsets[side]))
+        if not members[1]:
+            kind: str = LEFT_CHANGE
+        elif not members[0]:
+            kind = RIGHT_CHANGE
+        elif left_ids[ranges[0][0]:ranges[0][1]] == right_ids[ranges[1][0]:ranges[1][1]]:
+            kind = SAME_CHANGE
+        else:
+            kind = CONFLICT
+        hunks.append(MergeHunk(kind, (low, high), ranges[0], ranges[1]))
+    return hunks
+
+
+class ThreeWayMerge:
+    """
+    Merges two versions of a text that descend from a common base.
+
+    All three texts are interned with one interner, the base is diffed
+    against each side once, and the changes are classified in a single pass.
+    The merged text is kept as a list of lines; resolving a hunk only
+    replaces that hunk's lines and shifts the ranges of the hunks after it,
+    so nothing is diffed again.
+    """
+
+    def __init__(self, base: list[str], left: list[str], right: list[str],
+                 diff_engine: Union[str, DiffEngine] = "myers", ignore_whitespace: bool = False,
+                 ignore_case: bool = False, opcodes: Optional[tuple[list[Opcode], list[Opcode]]] = None,
+                 left_name: str = "left", right_name: str = "right") -> None:
+        """
+        :param base: Lines of the common ancestor.
+        :param left: Lines of the left version.
+        :param right: Lines of the right version.
+        :param diff_engine: Name or instance of the diff engine; an InterningEngine is used as it is.
+        :param ignore_whitespace: Lines differing only in whitespace are equal.
+        :param ignore_case: Lines differing only in case are equal.
+        :param opcodes: Opcodes from the base to the left and to the right side, if already computed
+                        with this engine, e.g. in worker threads.
+        :param left_name: Name of the left side in conflict markers.
+        :param right_name: Name of the right side in conflict markers.
+        """
+        self.base: list[str] = base
+        self.left: list[str] = left
+        self.right: list[str] = right
+        self.left_name: str = left_name
+        self.right_name: str = right_name
+        self.diff_engine: InterningEngine = (
+            diff_engine if isinstance(diff_engine, InterningEngine)
+            else InterningEngine(get_diff_engine(diff_engine), ignore_whitespace, ignore_case))
+        ids: list[array] = [self.diff_engine.interner.intern_lines(lines) for lines in (base, left, right)]
+        if opcodes is None:
+            opcodes = (self.diff_engine.get_opcodes(ids[0], ids[1]), self.diff_engine.get_opcodes(ids[0], ids[2]))
+        self.hunks: list[MergeHunk] = merge_hunks(opcodes[0], opcodes[1], ids[1], ids[2])
+        self.result: list[str] = self.__build_result()
+
+    def __build_result(self) -> list[str]:
+        """
+        Returns the merged lines, and sets the result range of every hunk.
+
+        Lines outside the hunks are the same on every side, and are taken from the left one.
+        """
+        result: list[str] = []
+        base_line: int = 0
+        for hunk in self.hunks:
+            left_start: int = hunk.left[0] - (hunk.base[0] - base_line)
+            result.extend(self.left[left_start:hunk.left[0]])
+            start: int = len(result)
+            result.extend(self.hunk_lines(hunk, hunk.resolution))
+            hunk.result = (start, len(result))
+            base_line = hunk.base[1]
+        left_line: int = self.hunks[-1].left[1] if self.hunks else 0
+        result.extend(self.left[left_line:])
+        return result
+
+    def hunk_lines(self, hunk: MergeHunk, resolution: Optional[str]) -> list[str]:
+        """
+        Returns the lines a resolution puts in the merged text, with conflict markers if it is None.
+
+        :raises ValueError: If the resolution is unknown.
+        """
+        left: list[str] = self.left[hunk.left[0]:hunk.left[1]]
+        right: list[str] = self.right[hunk.right[0]:hunk.right[1]]
+        if resolution is None:
+            return ([f"{CONFLICT_START} {self.left_name}"] + left + [CONFLICT_SEPARATOR] + right
+                    + [f"{CONFLICT_END} {self.right_name}"])
+        if resolution == TAKE_LEFT:
+            return left
+        if resolution == TAKE_RIGHT:
+            return right
+        if resolution == TAKE_BOTH:
+            return left + right
+        if resolution == TAKE_BASE:
+            return self.base[hunk.base[0]:hunk.base[1]]
+        raise ValueError(f"Unknown resolution: {resolution!r}")
+
+    @traced("ThreeWayMerge.resolve", DIFF)
+    def resolve(self, index: int, resolution: Optional[str]) -> tuple[LineRange, list[str]]:
+        """
+        Resolves a hunk, or marks it as a conflict again with None, and updates the merged lines.
+
+        :param index: Index of the hunk.
+        :param resolution: TAKE_LEFT, TAKE_RIGHT, TAKE_BOTH, TAKE_BASE or None.
+        :return: The range of merged lines replaced, before the change, and the lines replacing them.
+        :raises ValueError: If the resolution is unknown.
+        """
+        hunk: MergeHunk = self.hunks[index]
+        lines: list[str] = self.hunk_lines(hunk, resolution)
+        replaced: LineRange = hunk.result
+        self.result[replaced[0]:replaced[1]] = lines
+        hunk.resolution = resolution
+        hunk.result = (replaced[0], replaced[0] + len(lines))
+        shift: int = len(lines) - (replaced[1] - replaced[0])
+        if shift:
+            for later in self.hunks[index + 1:]:
+                later.result = (later.result[0] + shift, later.result[1] + shift)
+        return replaced, lines
+
+    def conflicts(self) -> list[int]:
+        """
+        Returns the indexes of the unresolved hunks.
+        """
+        return [index for index, hunk in enumerate(self.hunks) if not hunk.is_resolved()]
+
+    def hunk_at(self, line: int) -> Optional[int]:
+        """
+        Returns the index of the hunk covering a line of the merged text, or
+        the hunk inserting lines right there, or None.
+        """
+        # Hunks are apart by at least one unchanged line, so their starts are increasing
+        index: int = bisect_right(self.hunks, line, key=lambda hunk: hunk.result[0]) - 1
+        if index < 0:
+            return None
+        start, end = self.hunks[index].result
+        return index if start <= line < end or start == end == line else None
+
+    def merged_text(self) -> str:
+        """
+        Returns the merged text, with conflict markers around the unresolved hunks.
+        """
+        return "\n".join(self.result)
@@ -0,0 +1,177 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from app.app_logger import logger
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Categories of the spans, as shown in the trace viewer
+DIFF: str = "diff"
+HIGHLIGHT: str = "highlight"
+FORMAT: str = "format"
+PAINT: str = "paint"
+
+
+class Tracer:
+    """
+    Timers and counters around the hot paths: diffing, lexing, formatting and painting.
+
+    A disabled tracer records nothing, and the instrumented functions only
+    test ``enabled`` before running as usual. When enabled, the durations of
+    the last ``history`` spans of every name are kept for the performance
+    overlay; with ``record`` every span and counter is also kept as an event
+    in the Chrome trace format (chrome://tracing, Perfetto), written by
+    write(); with ``slow_ms`` the spans taking longer are logged as warnings.
+    """
+
+    def __init__(self, enabled: bool = False, record: bool = False, history: int = 120,
+                 slow_ms: Optional[float] = None) -> None:
+        """
+        :param enabled: Whether spans and counters are recorded.
+        :param record: Whether trace events are kept for write().
+        :param history: Number of recent durations kept per span name.
+        :param slow_ms: Duration above which a span is logged; None logs nothing.
+        """
+        self.enabled: bool = enabled
+        self.record: bool = record
+        self.history: int = history
+        self.slow_ms: Optional[float] = slow_ms
+        self.events: list[dict] = []
+        self.counters: dict[str, int] = {}
+        self.__recent: dict[str, deque[float]] = {}
+        self.__origin: int = time.perf_counter_ns()
+        self.__pid: int = os.getpid()
+
+    @contextmanager
+    def span(self, name: str, category: str = DIFF, **args: Any) -> Iterator[None]:
+        """
+        Times the body of a ``with`` statement; does nothing if the tracer is disabled.
+
+        :param name: Name of the span, e.g. the function timed.
+        :param category: Category of the span.
+        :param args: Details added to the trace event, e.g. line counts.
+        """
+        if not self.enabled:
+            yield
+            return
+        start: int = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start, time.perf_counter_ns(), args)
+
+    def add_span(self, name: str, category: str, start: int, end: int, args: Optional[dict] = None) -> None:
+        """
+        Records a span measured by the caller.
+
+        :param start: Start time from time.perf_counter_ns().
+        :param end: End time from time.perf_counter_ns().
+        """
+        milliseconds: float = (end - start) / 1e6
+        recent: Optional[deque[float]] = self.__recent.get(name)
+        if recent is None:
+            recent = self.__recent[name] = deque(maxlen=self.history)
+        recent.append(milliseconds)
+        if self.record:
+            event: dict = {"name": name, "cat": category, "ph": "X", "pid": self.__pid,
+                           "tid": threading.get_ident(), "ts": (start - self.__origin) / 1e3,
+                           "dur": (end - start) / 1e3}
+            if args:
+                event["args"] = args
+            self.events.append(event)
+        if self.slow_ms is not None and milliseconds > self.slow_ms:
+            logger.warning(f"Slow {name}: {milliseconds:.1f} ms {args or ''}".rstrip())
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Adds to a counter; does nothing if the tracer is disabled.
+        """
+        if not self.enabled:
+            return
+        total: int = self.counters.get(name, 0) + value
+        self.counters[name] = total
+        if self.record:
+            self.events.append({"name": name, "ph": "C", "pid": self.__pid, "tid": threading.get_ident(),
+                                "ts": (time.perf_counter_ns() - self.__origin) / 1e3, "args": {name: total}})
+
+    def recent(self, name: str) -> list[float]:
+        """
+        Returns the durations, in milliseconds, of the last spans of a name, oldest first.
+        """
+        return list(self.__recent.get(name, ()))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Returns, per span name, the number of recent spans and their last, mean and maximum durations in milliseconds.
+        """
+        summary: dict[str, dict[str, float]] = {}
+        for name, recent in list(self.__recent.items()):
+            durations: list[float] = list(recent)
+            if durations:
+                summary[name] = {"count": len(durations), "last": durations[-1],
+                                 "mean": sum(durations) / len(durations), "max": max(durations)}
+        return summary
+
+    def clear(self) -> None:
+        """
+        Drops the recorded events, durations and counters.
+        """
+        self.events = []
+        self.counters = {}
+        self.__recent.clear()
+
+    def write(self, path: str) -> None:
+        """
+        Writes the recorded events as a Chrome trace file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+def traced(name: str, category: str = DIFF) -> Callable[[F], F]:
+    """
+    Decorates a function so that the default tracer times its calls.
+
+    While the tracer is disabled a call only costs the test of ``enabled``.
+
+    :param name: Name of the spans.
+    :param category: Category of the spans.
+    """
+    def decorate(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracer: Tracer = _default_tracer
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            start: int = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                tracer.add_span(name, category, start, time.perf_counter_ns())
+        return wrapper
+    return decorate
+
+
+# Created at import, so that instrumented functions never test for None
+_default_tracer: Tracer = Tracer()
+
+
+def default_tracer() -> Tracer:
+    """
+    Returns the tracer used by the instrumented functions, disabled unless set_default_tracer was called.
+    """
+    return _default_tracer
+
+
+def set_default_tracer(tracer: Tracer) -> None:
+    """
+    Replaces the tracer used by the instrumented functions, e.g. by an enabled one.
+    """
+    global _default_tracer
+    _default_tracer = tracer
@@ -16,7 +16,9 @@ if __name__ == "__main__":
     ai_code: str = """def say_hello(name):
     return f'hello {name}'"""
 
-    # Create and show the comparison widget
-    widget: CodeCompareWidget = CodeCompareWidget(user_code, ai_code)
-    widget.show()
+    # Create and show the comparison widget; the differences are highlighted after the first frame,
+    # function by function
+    widget: CodeCompareWidget = CodeCompareWidget(user_code, ai_code, language="python", defer_diff=True,
+                                                  semantic=True)
+    widget.showMaximized()
     sys.exit(app.exec())
@@ -0,0 +1,27 @@
+import os
+from typing import Optional
+
+from app.app_logger import logger
+
+# Path of the dark theme shared by all widgets
+STYLESHEET_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'styles.qss')
+
+# Contents of the stylesheet, read once per process
+_stylesheet: Optional[str] = None
+
+
+def load_stylesheet() -> str:
+    """
+    Returns the dark theme stylesheet, or an empty one if it is missing.
+
+    The file is read on the first call only, not once per widget.
+    """
+    global _stylesheet
+    if _stylesheet is None:
+        try:
+            with open(STYLESHEET_PATH, "r") as file:
+                _stylesheet = file.read()
+        except FileNotFoundError:
+            logger.error(f"File not found: {STYLESHEET_PATH}")
+            _stylesheet = ""
+    return _stylesheet
@@ -1,13 +1,26 @@
-import os
-import difflib
-from typing import Optional
+from typing import Hashable, Optional, Sequence, Union
 
-from PySide6.QtGui import QTextCursor, QColor, QTextCharFormat
-from PySide6.QtWidgets import QWidget, QHBoxLayout
+from PySide6.QtCore import QEvent, QObject, QThreadPool, QTimer, Qt, Signal
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QVBoxLayout
 
+from app.core.diff_cache import DiffCache, default_diff_cache
+from app.core.diff_engines import DiffEngine, Opcode
+from app.core.hunk_table import hunk_tag
+from app.core.file_loader import CHUNK_SIZE, STDIN, LineReader
+from app.core.incremental_diff import LEFT, RIGHT, IncrementalDiff, mark_differences
+from app.core.intraline import IntralineDiffer, Range
+from app.core.line_interner import InterningEngine, LineInterner
+from app.core.line_map import LineMap
+from app.core.text_compare import TextComparison
+from app.core.tracing import DIFF, traced
+from app.core.lexer_registry import default_registry
+from app.resources import load_stylesheet
+from app.workers.diff_worker import DiffWorker
 from app.widgets.code_editor import CodeEditor
+from app.widgets.diff_connector import DiffConnector
+from app.widgets.document_loader import DocumentLoader
 from app.widgets.pygments_highlighter import PygmentsHighlighter
-from app.app_logger import logger
 
 
 class CodeCompareWidget(QWidget):
@@ -15,90 +28,642 @@ class CodeCompareWidget(QWidget):
     Widget for code comparison.
     """
 
-    def __init__(self, user_code: str, ai_code: str, parent: Optional[QWidget] = None) -> None:
+    # Emitted once all highlights of a diff pass have been applied
+    differences_highlighted = Signal()
+
+    # Comparisons with more lines than this are diffed off the GUI thread
+    ASYNC_DIFF_THRESHOLD: int = 5000
+
+    # Quiet period after the last keystroke before edited hunks are re-diffed
+    REDIFF_DELAY_MS: int = 150
+
+    # Documents with more lines than this are syntax highlighted lazily by default
+    LAZY_HIGHLIGHT_THRESHOLD: int = 20_000
+
+    # Key sequences moving to the next and to the previous hunk
+    NEXT_HUNK_KEYS: tuple[str, ...] = ("F7", "Alt+Down")
+    PREVIOUS_HUNK_KEYS: tuple[str, ...] = ("Shift+F7", "Alt+Up")
+
+    def __init__(self, user_code: str, ai_code: str, parent: Optional[QWidget] = None,
+                 diff_engine: Union[str, DiffEngine] = "difflib", incremental: bool = True,
+                 language: Optional[str] = None, filename: Optional[str] = None,
+                 lazy_highlighting: Optional[bool] = None, intraline: Optional[str] = "token",
+                 ignore_whitespace: bool = False, ignore_case: bool = False,
+                 diff_cache: Optional[DiffCache] = None, defer_diff: bool = False, themed: bool = True,
+                 semantic: bool = False) -> None:
         super().__init__(parent)
 
+        # Language of both panes: explicit, else from the file name, else sniffed from the content
+        self.language: str = default_registry().resolve(language, filename, content=user_code or ai_code)
+
+        # The Qt-free diff logic; the widget only shows its results
+        # Diffs of texts compared before are taken from the cache, shared by all widgets unless one is given
+        self.comparison: TextComparison = TextComparison(diff_engine, intraline, ignore_whitespace, ignore_case,
+                                                         diff_cache if diff_cache is not None else default_diff_cache())
+        # Python sources are diffed definition by definition when asked for; edits are still re-diffed by line
+        self.semantic: bool = semantic
+        self.comparison.semantic = semantic and self.language == "python"
+        # Algorithm used to compute the differences, run on interned lines
+        self.diff_engine: InterningEngine = self.comparison.diff_engine
+        # Changed words or characters inside replaced lines; None highlights whole lines only
+        self.intraline: Optional[IntralineDiffer] = self.comparison.intraline
+        # Opcodes of the last full diff, when no incremental diff keeps them
+        self.__opcodes: list[Opcode] = []
+        # Line map of the current opcodes, rebuilt when they are replaced
+        self.__line_map: LineMap = LineMap([])
+        self.__line_map_opcodes: list[Opcode] = self.__opcodes
+        # Set while one editor is scrolled to follow the other
+        self.__syncing_scroll: bool = False
+        # Side whose cursor hunk navigation starts from, and the hunk last jumped to
+        self.__active_side: int = LEFT
+        self.__current_hunk: Optional[int] = None
+
+        # State of the asynchronous diff: the newest request wins
+        self.__diff_generation: int = 0
+        self.__diff_worker: Optional[DiffWorker] = None
+        self.__async_lines: tuple[list[str], list[str]] = ([], [])
+        self.__async_opcodes: list[Opcode] = []
+        self.__async_key: bytes = b""
+        self.__async_keys: tuple[Sequence[Hashable], Sequence[Hashable]] = ([], [])
+        # Message of the last diff that failed, until the next one starts
+        self.__diff_error: Optional[str] = None
+        # Set until the first frame is painted, when the diff is deferred until then
+        self.__diff_deferred: bool = False
+
+        # Files being loaded into the editors, then their lines and line IDs until diffed
+        self.__loaders: list[DocumentLoader] = []
+        self.__loaded: Optional[tuple[LineReader, LineReader]] = None
+
+        # Incremental mode: edits only re-diff the hunks around them
+        self.incremental: bool = incremental
+        self.__incremental_diff: Optional[IncrementalDiff] = None
+        # Per side, (unchanged blocks before, unchanged blocks after) the edits
+        self.__dirty: list[Optional[tuple[int, int]]] = [None, None]
+        self.__rediff_timer: QTimer = QTimer(self)
+        self.__rediff_timer.setSingleShot(True)
+        self.__rediff_timer.setInterval(self.REDIFF_DELAY_MS)
+        self.__rediff_timer.timeout.connect(self.__apply_incremental_edits)
+
         # Initialize code editors
         self.left_text_edit: CodeEditor = CodeEditor()
         self.right_text_edit: CodeEditor = CodeEditor()
 
+        # Apply syntax highlighting; lazy highlighters must be attached before the text is set
+        if lazy_highlighting is None:
+            lazy_highlighting = max(user_code.count('\n'), ai_code.count('\n')) + 1 >= self.LAZY_HIGHLIGHT_THRESHOLD
+        self.highlighter_old: PygmentsHighlighter = PygmentsHighlighter(
+            self.left_text_edit.document(), language=self.language, lazy=lazy_highlighting)
+        self.highlighter_new: PygmentsHighlighter = PygmentsHighlighter(
+            self.right_text_edit.document(), language=self.language, lazy=lazy_highlighting)
+        self.left_text_edit.attach_highlighter(self.highlighter_old)
+        self.right_text_edit.attach_highlighter(self.highlighter_new)
+        self.left_text_edit.diff_overlay.gaps = lambda first, last: self.__gaps(LEFT, first, last)
+        self.right_text_edit.diff_overlay.gaps = lambda first, last: self.__gaps(RIGHT, first, last)
+        if self.intraline is not None:
+            self.left_text_edit.diff_overlay.inline_ranges = lambda line: self.__inline_ranges(LEFT, line)
+            self.right_text_edit.diff_overlay.inline_ranges = lambda line: self.__inline_ranges(RIGHT, line)
+
+        self.left_text_edit.show_overview_ruler(self.line_map, LEFT)
+        self.right_text_edit.show_overview_ruler(self.line_map, RIGHT)
+
         # Set initial text
         self.left_text_edit.setPlainText(user_code)
         self.right_text_edit.setPlainText(ai_code)
 
         # Create layout and add widgets
         self.layout: QHBoxLayout = QHBoxLayout()
+        self.connector: DiffConnector = DiffConnector(self.left_text_edit, self.right_text_edit, self.line_map)
         self.layout.addWidget(self.left_text_edit)
+        self.layout.addWidget(self.connector)
         self.layout.addWidget(self.right_text_edit)
-        self.setLayout(self.layout)
 
-        # Apply syntax highlighting
-        self.highlighter_old: PygmentsHighlighter = PygmentsHighlighter(self.left_text_edit.document())
-        self.highlighter_new: PygmentsHighlighter = PygmentsHighlighter(self.right_text_edit.document())
+        # Hunk counter under the editors, e.g. "12 of 340"
+        self.hunk_label: QLabel = QLabel()
+        self.hunk_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        outer_layout: QVBoxLayout = QVBoxLayout()
+        outer_layout.addLayout(self.layout)
+        outer_layout.addWidget(self.hunk_label)
+        self.setLayout(outer_layout)
+        for keys, slot in ((self.NEXT_HUNK_KEYS, self.next_hunk), (self.PREVIOUS_HUNK_KEYS, self.previous_hunk)):
+            for key in keys:
+                shortcut: QShortcut = QShortcut(QKeySequence(key), self)
+                shortcut.setContext(Qt.ShortcutContext.WidgetWithChildrenShortcut)
+                shortcut.activated.connect(slot)
 
-        # Set window size
+        # Set window size; the caller decides when and how to show the widget
         self.setMinimumSize(800, 600)
-        self.showMaximized()
 
-        # Set dark theme
-        self.__set_dark_theme()
+        # Set dark theme, unless inherited from a parent that has it, which saves parsing it per widget
+        if themed:
+            self.__set_dark_theme()
+
+        # Track edits to refresh the differences
+        self.left_text_edit.document().contentsChange.connect(
+            lambda position, removed, added: self.__on_contents_change(LEFT, position, added))
+        self.right_text_edit.document().contentsChange.connect(
+            lambda position, removed, added: self.__on_contents_change(RIGHT, position, added))
+
+        # Navigate from the editor whose cursor moved last
+        self.left_text_edit.cursorPositionChanged.connect(lambda: self.__on_cursor_moved(LEFT))
+        self.right_text_edit.cursorPositionChanged.connect(lambda: self.__on_cursor_moved(RIGHT))
+
+        # Keep both editors on matching lines
+        self.left_text_edit.verticalScrollBar().valueChanged.connect(
+            lambda value: self.__sync_scroll(LEFT, value))
+        self.right_text_edit.verticalScrollBar().valueChanged.connect(
+            lambda value: self.__sync_scroll(RIGHT, value))
+
+        # Automatically highlight differences, at once or once the first frame is painted
+        if defer_diff:
+            self.__diff_deferred = True
+            self.left_text_edit.viewport().installEventFilter(self)
+        else:
+            self.__start_diff()
 
-        # Automatically highlight differences
-        self.highlight_differences()
+    @classmethod
+    def from_files(cls, left_path: str, right_path: str, parent: Optional[QWidget] = None,
+                   encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE, **options) -> "CodeCompareWidget":
+        """
+        Creates a widget comparing two files, or a file and standard input.
+
+        The widget is returned at once and fills both editors chunk by chunk;
+        the differences are highlighted when both files are loaded.
+
+        :param left_path: Path of the left file, or "-" for standard input.
+        :param right_path: Path of the right file, or "-" for standard input.
+        :param parent: The parent widget.
+        :param encoding: Text encoding of both files.
+        :param chunk_size: Number of bytes appended to an editor per event loop iteration.
+        :param options: Other arguments of the constructor, e.g. ``diff_engine``.
+        """
+        named: list[str] = [path for path in (left_path, right_path) if path != STDIN]
+        options.setdefault("filename", named[0] if named else None)
+        # Highlighting what is shown first suits text arriving in chunks
+        if options.get("lazy_highlighting") is None:
+            options["lazy_highlighting"] = True
+        widget: CodeCompareWidget = cls("", "", parent, **options)
+        widget.load_files(left_path, right_path, encoding, chunk_size)
+        return widget
+
+    def load_files(self, left_path: str, right_path: str, encoding: str = "utf-8",
+                   chunk_size: int = CHUNK_SIZE) -> None:
+        """
+        Replaces both texts with the contents of two files, loaded chunk by
+        chunk, and highlights the differences once both are loaded.
+
+        :param left_path: Path of the left file, or "-" for standard input.
+        :param right_path: Path of the right file, or "-" for standard input.
+        :param encoding: Text encoding of both files.
+        :param chunk_size: Number of bytes appended to an editor per event loop iteration.
+        """
+        self.__cancel_diff()
+        for loader in self.__loaders:
+            loader.cancel()
+        self.__set_status((bytearray(), bytearray()))
+        self.diff_engine.interner.clear()
+        self.__loaders = [DocumentLoader(editor, path, chunk_size, encoding, self.diff_engine.interner, self)
+                          for editor, path in ((self.left_text_edit, left_path), (self.right_text_edit, right_path))]
+        # Both loaders are started before listening to them: a file that cannot be read fails at once
+        for loader in self.__loaders:
+            loader.start()
+        for loader in self.__loaders:
+            loader.finished.connect(self.__on_file_loaded)
+            loader.failed.connect(self.__on_file_loaded)
+        if not self.is_loading():
+            self.__on_file_loaded()
+
+    def set_texts(self, user_code: str, ai_code: str, language: Optional[str] = None,
+                  filename: Optional[str] = None) -> None:
+        """
+        Replaces both texts and highlights the differences, so that the widget,
+        its editors and highlighters can be reused for another comparison.
+
+        :param user_code: The new left text.
+        :param ai_code: The new right text.
+        :param language: Language of both texts; else guessed from the file name or the content.
+        :param filename: Name of the file compared, to guess the language from.
+        """
+        self.__cancel_diff()
+        for loader in self.__loaders:
+            loader.cancel()
+        self.__loaders = []
+        self.__loaded = None
+        self.__current_hunk = None
+        self.__set_status((bytearray(), bytearray()))
+        self.diff_engine.interner.clear()
+        language = default_registry().resolve(language, filename, content=user_code or ai_code)
+        if language != self.language:
+            # Emptied first, so that the old texts are not highlighted in the new language
+            self.left_text_edit.setPlainText("")
+            self.right_text_edit.setPlainText("")
+            self.language = language
+            self.comparison.semantic = self.semantic and language == "python"
+            self.highlighter_old.set_language(language)
+            self.highlighter_new.set_language(language)
+        self.left_text_edit.setPlainText(user_code)
+        self.right_text_edit.setPlainText(ai_code)
+        self.__start_diff()
+
+    def is_loading(self) -> bool:
+        """
+        Returns whether files are still being loaded into the editors.
+        """
+        return any(loader.is_running() for loader in self.__loaders)
+
+    def __on_file_loaded(self) -> None:
+        """
+        Starts the diff once both files are loaded, on the lines and line IDs
+        read along the way if they still match the documents.
+        """
+        if self.is_loading():
+            return
+        editors: tuple[CodeEditor, CodeEditor] = (self.left_text_edit, self.right_text_edit)
+        readers = tuple(loader.reader for loader in self.__loaders)
+        self.__loaders = []
+        if all(len(reader.lines) == editor.blockCount() for reader, editor in zip(readers, editors)):
+            self.__loaded = readers
+        self.__start_diff()
+
+    def __start_diff(self) -> None:
+        """
+        Highlights the differences; large inputs are diffed asynchronously so they do not block painting.
+        """
+        if self.left_text_edit.blockCount() + self.right_text_edit.blockCount() > self.ASYNC_DIFF_THRESHOLD:
+            self.highlight_differences_async()
+        else:
+            self.highlight_differences()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        """
+        Starts a deferred diff once the left editor has painted its first frame.
+        """
+        if event.type() == QEvent.Type.Paint and watched is self.left_text_edit.viewport():
+            watched.removeEventFilter(self)
+            if self.__diff_deferred:
+                self.__diff_deferred = False
+                # Queued, so that the frame being painted is shown first
+                QTimer.singleShot(0, self, self.__start_diff)
+        return super().eventFilter(watched, event)
 
     def __set_dark_theme(self) -> None:
         """
         Sets the dark theme.
         """
-        stylesheet_path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'styles.qss')
-        try:
-            with open(stylesheet_path, "r") as file:
-                self.setStyleSheet(file.read())
-        except FileNotFoundError:
-            logger.error(f"File not found: {stylesheet_path}")
+        self.setStyleSheet(load_stylesheet())
 
+    @traced("highlight_differences", DIFF)
     def highlight_differences(self) -> None:
         """
         Highlights the differences in the code.
         """
+        self.__cancel_diff()
+
         # Get code lines from both editors
+        (left_text, right_text), (left_keys, right_keys) = self.__diff_input()
+
+        # Process differences and apply highlighting
+        opcodes: list[Opcode] = self.comparison.diff(left_text, right_text, left_keys, right_keys)
+        self.__finish_diff(left_text, right_text, opcodes)
+
+    def highlight_differences_async(self) -> None:
+        """
+        Computes the differences in a worker thread and highlights them progressively.
+
+        Any computation still in flight is cancelled first. Texts compared
+        before are highlighted at once from the diff cache.
+        """
+        self.__cancel_diff()
+        self.__diff_generation += 1
+
+        (left_text, right_text), (left_keys, right_keys) = self.__diff_input()
+        key: bytes = self.comparison.cache_key(left_text, right_text)
+        opcodes: Optional[list[Opcode]] = self.comparison.cache.get(key, (len(left_text), len(right_text)))
+        if opcodes is not None:
+            self.__finish_diff(left_text, right_text, opcodes)
+            return
+        self.__async_key = key
+        self.__async_lines = (left_text, right_text)
+        self.__async_keys = (left_keys, right_keys)
+        self.__async_opcodes = []
+        self.__start_worker(self.comparison.engine_for(left_text, right_text))
+
+        # Old highlights no longer match the text being diffed; new ones are
+        # filled in as the chunks arrive
+        self.__set_status((bytearray(len(left_text)), bytearray(len(right_text))))
+
+    def __start_worker(self, engine: DiffEngine) -> None:
+        """
+        Starts diffing the lines of the current request in a worker thread.
+        """
+        worker: DiffWorker = DiffWorker(self.__diff_generation, engine, *self.__async_keys)
+        worker.signals.opcodes_ready.connect(self.__on_opcodes_ready)
+        worker.signals.finished.connect(self.__on_diff_finished)
+        worker.signals.failed.connect(self.__on_diff_failed)
+        self.__diff_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def __diff_input(self) -> tuple[tuple[list[str], list[str]], tuple[Sequence[Hashable], Sequence[Hashable]]]:
+        """
+        Returns the lines of both documents and the keys to diff them on.
+
+        Right after loading files these are the lines and line IDs read along
+        the way; otherwise the documents are split and interned anew.
+        """
+        if self.__loaded is not None:
+            left, right = self.__loaded
+            self.__loaded = None
+            return (left.lines, right.lines), (left.ids, right.ids)
         left_text: list[str] = self.left_text_edit.toPlainText().split('\n')
         right_text: list[str] = self.right_text_edit.toPlainText().split('\n')
+        # Lines of earlier versions of the documents need no ID any more
+        interner: LineInterner = self.diff_engine.interner
+        interner.clear()
+        return (left_text, right_text), (interner.intern_lines(left_text), interner.intern_lines(right_text))
 
-        # Create a matcher to find differences
-        matcher: difflib.SequenceMatcher = difflib.SequenceMatcher(None, left_text, right_text)
+    def is_diff_running(self) -> bool:
+        """
+        Returns whether differences are still being computed, or waiting for the first frame.
+        """
+        return self.__diff_deferred or self.__diff_worker is not None
 
-        # Format for highlighting differences
-        highlight_format: QTextCharFormat = QTextCharFormat()
-        highlight_format.setBackground(QColor("green"))
+    def __cancel_diff(self) -> None:
+        """
+        Cancels the in-flight computation and forgets pending edits.
+        """
+        if self.__diff_worker is not None:
+            self.__diff_worker.cancel()
+            self.__diff_worker = None
+        self.__diff_deferred = False
+        self.__diff_error = None
+        self.__diff_generation += 1
+        self.__incremental_diff = None
+        self.__opcodes = []
+        self.__dirty = [None, None]
+        self.__rediff_timer.stop()
 
-        # Clear previous highlights
-        self.__clear_highlight(self.left_text_edit)
-        self.__clear_highlight(self.right_text_edit)
+    def __on_contents_change(self, side: int, position: int, added: int) -> None:
+        """
+        Restarts an in-flight computation, or schedules an incremental re-diff,
+        when the user edits either document.
+        """
+        if self.__diff_worker is not None:
+            self.highlight_differences_async()
+            return
+        if self.__incremental_diff is None:
+            return
 
-        # Process differences and apply highlighting
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag in ('replace', 'delete'):
-                self.__highlight_lines(self.left_text_edit, i1, i2, highlight_format)
-            if tag in ('replace', 'insert'):
-                self.__highlight_lines(self.right_text_edit, j1, j2, highlight_format)
+        document = (self.left_text_edit, self.right_text_edit)[side].document()
+        head: int = document.findBlock(position).blockNumber()
+        end: int = min(position + added, document.characterCount() - 1)
+        tail: int = document.blockCount() - 1 - document.findBlock(end).blockNumber()
+        if self.__dirty[side] is not None:
+            head, tail = min(head, self.__dirty[side][0]), min(tail, self.__dirty[side][1])
+        self.__dirty[side] = (head, tail)
+        self.__rediff_timer.start()
+
+    @traced("apply differences", DIFF)
+    def __finish_diff(self, left_text: list[str], right_text: list[str], opcodes: list[Opcode]) -> None:
+        """
+        Shows the result of a full diff and keeps it so that later edits can update it.
+        """
+        if self.incremental:
+            self.__incremental_diff = IncrementalDiff(self.diff_engine, left_text, right_text, opcodes)
+            self.__set_status(self.__incremental_diff.status)
+        else:
+            self.__opcodes = opcodes
+            status: tuple[bytearray, bytearray] = (bytearray(len(left_text)), bytearray(len(right_text)))
+            mark_differences(status, opcodes)
+            self.__set_status(status)
+        self.differences_highlighted.emit()
+
+    def line_map(self) -> LineMap:
+        """
+        Returns the line map of the current differences.
+        """
+        opcodes: list[Opcode] = self.__current_opcodes()
+        if opcodes is not self.__line_map_opcodes:
+            self.__line_map = LineMap(opcodes)
+            self.__line_map_opcodes = opcodes
+        return self.__line_map
+
+    def __current_opcodes(self) -> list[Opcode]:
+        """
+        Returns the opcodes matching the documents, empty while a diff is computed.
+        """
+        return self.__incremental_diff.opcodes if self.__incremental_diff else self.__opcodes
+
+    def next_hunk(self) -> Optional[int]:
+        """
+        Moves the cursor to the next hunk after the cursor of the active editor.
+
+        :return: Index of the hunk moved to, or None if there is no next hunk.
+        """
+        return self.__go_to_hunk(1)
+
+    def previous_hunk(self) -> Optional[int]:
+        """
+        Moves the cursor to the hunk before the cursor of the active editor.
+
+        :return: Index of the hunk moved to, or None if there is no previous hunk.
+        """
+        return self.__go_to_hunk(-1)
+
+    def current_hunk(self) -> Optional[int]:
+        """
+        Returns the index of the hunk under the cursor of the active editor, or None.
+        """
+        line_map: LineMap = self.line_map()
+        line: int = self.__editor(self.__active_side).textCursor().blockNumber()
+        if self.__is_at_current_hunk(line_map, line):
+            return self.__current_hunk
+        return line_map.hunk_at(self.__active_side, line)
+
+    def __go_to_hunk(self, step: int) -> Optional[int]:
+        """
+        Moves the cursor of the active editor to the start of the hunk one step away.
+        """
+        side: int = self.__active_side
+        editor: CodeEditor = self.__editor(side)
+        line_map: LineMap = self.line_map()
+        line: int = editor.textCursor().blockNumber()
+        if self.__is_at_current_hunk(line_map, line):
+            # Hunks may start on the same line of one side; step by index from the last jump
+            index: Optional[int] = self.__current_hunk + step
+            if not 0 <= index < len(line_map.hunks):
+                index = None
+        elif step > 0:
+            index = line_map.next_hunk(side, line)
+        else:
+            index = line_map.previous_hunk(side, line)
+        if index is None:
+            return None
+        self.__current_hunk = index
+        editor.go_to_line(line_map.bounds(side)[0][index])
+        editor.setFocus()
+        return index
+
+    def __is_at_current_hunk(self, line_map: LineMap, line: int) -> bool:
+        """
+        Returns whether a cursor line of the active side is still at the start of the hunk last jumped to.
+        """
+        index: Optional[int] = self.__current_hunk
+        if index is None or index >= len(line_map.hunks):
+            return False
+        # An insertion after the last line is shown on the last line
+        last_line: int = self.__editor(self.__active_side).blockCount() - 1
+        return min(line_map.bounds(self.__active_side)[0][index], last_line) == line
+
+    def __on_cursor_moved(self, side: int) -> None:
+        """
+        Makes an editor the active one and refreshes the hunk counter.
+        """
+        self.__active_side = side
+        self.__update_hunk_label()
+
+    def __update_hunk_label(self) -> None:
+        """
+        Shows the position of the cursor among the hunks, e.g. "12 of 340".
+        """
+        count: int = len(self.line_map().hunks)
+        if self.is_loading():
+            text: str = "Loading..."
+        elif self.is_diff_running():
+            text = "Comparing..."
+        elif self.__diff_error is not None:
+            text = "Comparison failed"
+        elif not count:
+            text = "No differences"
+        else:
+            index: Optional[int] = self.current_hunk()
+            text = f"{index + 1 if index is not None else '-'} of {count}"
+        self.hunk_label.setText(text)
+        self.hunk_label.setToolTip(self.__diff_error or "")
+
+    def __editor(self, side: int) -> CodeEditor:
+        """
+        Returns the editor of one side.
+        """
+        return (self.left_text_edit, self.right_text_edit)[side]
+
+    def __sync_scroll(self, side: int, value: int) -> None:
+        """
+        Scrolls the other editor to the line matching the top line of one editor.
+        """
+        if self.__syncing_scroll:
+            return
+        other: CodeEditor = (self.left_text_edit, self.right_text_edit)[1 - side]
+        self.__syncing_scroll = True
+        try:
+            other.verticalScrollBar().setValue(round(self.line_map().map_line(side, value)))
+        finally:
+            self.__syncing_scroll = False
+
+    def __gaps(self, side: int, first: int, last: int) -> list[int]:
+        """
+        Returns the lines of one side, between two line numbers, before which
+        only the other side has lines.
+        """
+        return [hunk[1 + 2 * side] for hunk in self.line_map().hunks_between(side, first, last)
+                if hunk[1 + 2 * side] == hunk[2 + 2 * side]]
+
+    def __inline_ranges(self, side: int, line: int) -> Optional[list[Range]]:
+        """
+        Returns the changed character ranges of a replaced line, compared with
+        the line it is paired with, or None if the line has no pair.
+        """
+        return self.comparison.inline_ranges(self.__current_opcodes(), side, line, self.__line_text)
+
+    def __line_text(self, side: int, line: int) -> str:
+        """
+        Returns the text of a line of one side.
+        """
+        return self.__editor(side).document().findBlockByNumber(line).text()
+
+    def __set_status(self, status: tuple[bytearray, bytearray]) -> None:
+        """
+        Hands the per-line status arrays to the editor overlays and repaints them.
+        """
+        for text_edit, side_status in zip((self.left_text_edit, self.right_text_edit), status):
+            text_edit.diff_overlay.set_status(side_status)
+            text_edit.viewport().update()
+            text_edit.overview_ruler.update()
+        self.connector.update()
+        self.__update_hunk_label()
+
+    def __apply_incremental_edits(self) -> None:
+        """
+        Re-diffs the edited regions and refreshes the blocks whose status changed.
+        """
+        if self.__incremental_diff is None:
+            return
+        editors: tuple[CodeEditor, CodeEditor] = (self.left_text_edit, self.right_text_edit)
+        for side, dirty in enumerate(self.__dirty):
+            if dirty is None:
+                continue
+            head, tail = dirty
+            document = editors[side].document()
+            old_count: int = len(self.__incremental_diff.lines[side])
+            start: int = min(head, old_count)
+            stop: int = max(start, old_count - tail)
+            new_stop: int = max(start, document.blockCount() - tail)
+
+            new_lines: list[str] = []
+            block = document.findBlockByNumber(start)
+            while block.isValid() and block.blockNumber() < new_stop:
+                new_lines.append(block.text())
+                block = block.next()
+
+            changed: tuple[list[int], list[int]] = self.__incremental_diff.replace_lines(side, start, stop, new_lines)
+            for changed_side, lines in enumerate(changed):
+                editors[changed_side].update_lines(lines)
+            if self.intraline is not None:
+                # Lines paired with the edited ones have new changed ranges
+                editors[1 - side].viewport().update()
+        for editor in editors:
+            editor.overview_ruler.update()
+        self.connector.update()
+        self.__update_hunk_label()
+        self.__dirty = [None, None]
+
+    def __on_opcodes_ready(self, generation: int, opcodes: list[Opcode]) -> None:
+        """
+        Shows a chunk of opcodes streamed by the worker.
+        """
+        if generation == self.__diff_generation:
+            self.__async_opcodes.extend(opcodes)
+            mark_differences((self.left_text_edit.diff_overlay.status, self.right_text_edit.diff_overlay.status),
+                             opcodes)
+            self.left_text_edit.viewport().update()
+            self.right_text_edit.viewport().update()
 
-    def __clear_highlight(self, text_edit: CodeEditor) -> None:
+    def __on_diff_finished(self, generation: int) -> None:
         """
-        Clears the highlight in the specified editor.
+        Marks the computation as done.
         """
-        cursor: QTextCursor = QTextCursor(text_edit.document())
-        cursor.select(QTextCursor.Document)
-        cursor.setCharFormat(QTextCharFormat())
+        if generation == self.__diff_generation:
+            self.__diff_worker = None
+            self.comparison.cache.put(self.__async_key, self.__async_opcodes)
+            self.__finish_diff(*self.__async_lines, self.__async_opcodes)
+            self.__async_lines, self.__async_keys, self.__async_opcodes = ([], []), ([], []), []
 
-    def __highlight_lines(self, text_edit: CodeEditor, start: int, end: int, format: QTextCharFormat) -> None:
+    def __on_diff_failed(self, generation: int, message: str) -> None:
         """
-        Highlights the specified lines in the specified editor.
+        Retries a failed computation with the line engine, in another worker,
+        if a different engine failed. Otherwise every line is marked as
+        changed, rather than showing no differences between texts that may
+        differ, and the label tells the comparison failed; the error has
+        already been logged.
         """
-        cursor: QTextCursor = QTextCursor(text_edit.document())
-        for line in range(start, end):
-            block = cursor.document().findBlockByNumber(line)
-            if block.isValid():
-                cursor.setPosition(block.position())
-                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
-                cursor.mergeCharFormat(format)
+        if generation != self.__diff_generation:
+            return
+        failed_engine: DiffEngine = self.__diff_worker.engine
+        self.__diff_worker = None
+        self.__async_opcodes = []
+        if failed_engine is not self.comparison.diff_engine:
+            self.__start_worker(self.comparison.diff_engine)
+            return
+        left_text, right_text = self.__async_lines
+        self.__async_lines, self.__async_keys = ([], []), ([], [])
+        self.__diff_error = message
+        bounds: tuple[int, int, int, int] = (0, len(left_text), 0, len(right_text))
+        self.__finish_diff(left_text, right_text, [(hunk_tag(*bounds), *bounds)] if left_text or right_text else [])
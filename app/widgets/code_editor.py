@@ -1,9 +1,14 @@
-from typing import Optional, List
-from PySide6.QtGui import QColor, QPainter, Qt, QTextCharFormat, QResizeEvent, QPaintEvent, QTextCursor
-from PySide6.QtCore import QRect
+from typing import Callable, Optional, List
+from PySide6.QtGui import QColor, QPainter, Qt, QTextCharFormat, QResizeEvent, QPaintEvent, QTextCursor, QPixmap
+from PySide6.QtCore import QEvent, QRect, QRectF, Signal
 from PySide6.QtWidgets import QPlainTextEdit, QTextEdit
 
+from app.core.line_map import LineMap
+from app.core.tracing import FORMAT, PAINT, traced
+from app.widgets.diff_overlay import DiffOverlay
 from app.widgets.line_number_area import LineNumberArea
+from app.widgets.overview_ruler import OverviewRuler
+from app.widgets.pygments_highlighter import PygmentsHighlighter
 
 
 class CodeEditor(QPlainTextEdit):
@@ -11,9 +16,28 @@ class CodeEditor(QPlainTextEdit):
     Code editor class with line numbers and current line highlighting.
     """
 
+    # Emitted with the first and last visible block numbers when they change
+    visible_blocks_changed = Signal(int, int)
+
+    # Colors of the line number area
+    LINE_NUMBER_BACKGROUND: QColor = QColor("#2b2b2b")
+    LINE_NUMBER_COLOR: QColor = QColor("#d3d3d3")
+
     def __init__(self, parent: Optional[QPlainTextEdit] = None) -> None:
         super(CodeEditor, self).__init__(parent)
+        # Gutter state: font metrics, digit count and digit glyphs are only
+        # recomputed when the font or the number of digits changes
+        self.__digit_width: int = 0
+        self.__digits: int = 0
+        self.__digit_glyphs: Optional[QPixmap] = None
+        self.__update_font_metrics()
         self.line_number_area: LineNumberArea = LineNumberArea(self)
+        self.overview_ruler: OverviewRuler = OverviewRuler(self)
+        self.overview_ruler.hide()
+        self.verticalScrollBar().valueChanged.connect(self.overview_ruler.update)
+        self.diff_overlay: DiffOverlay = DiffOverlay()
+        self.highlighter: Optional[PygmentsHighlighter] = None
+        self.__visible_blocks: Optional[tuple[int, int]] = None
         self.blockCountChanged.connect(self.update_line_number_area_width)
         self.updateRequest.connect(self.update_line_number_area)
         self.cursorPositionChanged.connect(self.highlight_current_line)
@@ -23,63 +47,304 @@ class CodeEditor(QPlainTextEdit):
         """
         Returns the width of the line number area.
         """
-        digits: int = 1
-        max_block: int = max(1, self.blockCount())
-        while max_block >= 10:
-            max_block //= 10
-            digits += 1
-        space: int = 3 + self.fontMetrics().horizontalAdvance('9') * digits
-        return space
+        return 3 + self.__digit_width * self.__digits
 
     def update_line_number_area_width(self, _: int) -> None:
         """
-        Updates the width of the line number area.
+        Updates the width of the line number area when the number of digits
+        of the line count changes.
+        """
+        digits: int = len(str(max(1, self.blockCount())))
+        if digits != self.__digits:
+            self.__digits = digits
+            self.__update_margins()
+
+    def show_overview_ruler(self, line_map: Callable[[], LineMap], side: int) -> None:
+        """
+        Shows the overview ruler with the hunks of one side of a diff.
+
+        :param line_map: Returns the line map of the current diff.
+        :param side: 0 if the editor shows the left side, 1 for the right side.
+        """
+        self.overview_ruler.line_map = line_map
+        self.overview_ruler.side = side
+        self.overview_ruler.show()
+        self.__update_margins()
+
+    def __update_margins(self) -> None:
+        """
+        Makes room for the line number area and the overview ruler and moves them in place.
+        """
+        width: int = self.line_number_area_width()
+        ruler_width: int = self.overview_ruler.WIDTH if self.overview_ruler.isVisibleTo(self) else 0
+        self.setViewportMargins(width, 0, ruler_width, 0)
+        cr: QRect = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), width, cr.height()))
+        if ruler_width:
+            viewport: QRect = self.viewport().geometry()
+            self.overview_ruler.setGeometry(QRect(viewport.right() + 1, cr.top(), ruler_width, cr.height()))
+
+    def go_to_line(self, line: int) -> None:
+        """
+        Moves the cursor to the start of a line and scrolls it to the middle of the viewport.
+
+        :param line: The line number, starting at 0.
+        """
+        block = self.document().findBlockByNumber(min(max(0, line), self.blockCount() - 1))
+        self.setTextCursor(QTextCursor(block))
+        self.centerCursor()
+
+    def changeEvent(self, event: QEvent) -> None:
+        """
+        Refreshes the cached gutter metrics when the font changes.
+        """
+        super(CodeEditor, self).changeEvent(event)
+        if event.type() == QEvent.Type.FontChange:
+            self.__update_font_metrics()
+            self.__digits = 0
+            self.update_line_number_area_width(0)
+            self.line_number_area.update()
+
+    def __update_font_metrics(self) -> None:
+        """
+        Caches the digit width used by the gutter and drops the digit glyphs.
+        """
+        self.__digit_width = self.fontMetrics().horizontalAdvance('9')
+        self.__digit_glyphs = None
+
+    def attach_highlighter(self, highlighter: PygmentsHighlighter) -> None:
+        """
+        Lets the editor drive a highlighter of its document: a lazy highlighter
+        is told which blocks become visible.
+
+        :param highlighter: A highlighter of this editor's document.
+        """
+        self.highlighter = highlighter
+        if highlighter.lazy:
+            self.visible_blocks_changed.connect(highlighter.set_visible_blocks)
+            self.__visible_blocks = None
+            self.viewport().update()
+
+    def setPlainText(self, text: str) -> None:
+        """
+        Replaces the text.
+
+        With a lazy highlighter attached, the document does not notify its
+        listeners of the bulk insert, so QSyntaxHighlighter does not visit every
+        block; the highlighter starts its idle pass over again instead, and only
+        ``textChanged`` is emitted.
+
+        :param text: The new text.
+        """
+        if self.highlighter is None or not self.highlighter.lazy:
+            super(CodeEditor, self).setPlainText(text)
+            return
+        document = self.document()
+        document.blockSignals(True)
+        # Viewport updates during the insert must not highlight a partly filled document
+        self.__visible_blocks = (-1, -1)
+        try:
+            super(CodeEditor, self).setPlainText(text)
+        finally:
+            document.blockSignals(False)
+            self.__visible_blocks = None
+        self.update_line_number_area_width(0)
+        self.highlighter.restart_idle_pass()
+        self.textChanged.emit()
+
+    def append_text(self, text: str) -> None:
+        """
+        Appends text at the end of the document, leaving the cursor where it is.
+
+        With a lazy highlighter the insert is hidden from it, as in
+        ``setPlainText``: the idle pass resumes at the first appended block
+        instead of QSyntaxHighlighter visiting every new block.
+
+        :param text: The text to append; it continues the last line.
+        """
+        document = self.document()
+        cursor: QTextCursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        # A cursor at the end would be pushed along by the insert
+        at_end: bool = not self.textCursor().hasSelection() and self.textCursor().position() == cursor.position()
+        end: int = cursor.position()
+        last_block = document.lastBlock()
+        lazy: bool = self.highlighter is not None and self.highlighter.lazy
+        document.blockSignals(lazy)
+        try:
+            cursor.insertText(text)
+        finally:
+            document.blockSignals(False)
+        if at_end:
+            cursor.setPosition(end)
+            self.setTextCursor(cursor)
+        if not lazy:
+            return
+        if last_block.userState() != self.highlighter.UNHIGHLIGHTED:
+            # The former last line got longer
+            self.highlighter.rehighlightBlock(last_block)
+        self.update_line_number_area_width(0)
+        self.highlighter.restart_idle_pass(last_block.blockNumber())
+        self.textChanged.emit()
+
+    def replace_lines(self, start: int, end: int, lines: List[str]) -> None:
         """
-        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+        Replaces the lines [start, end) in one undo step; the other blocks are
+        left as they are, so only the new ones are highlighted again.
+
+        :param start: First line replaced, starting at 0.
+        :param end: Line after the last one replaced; equal to start to insert lines.
+        :param lines: The new lines.
+        """
+        document = self.document()
+        cursor: QTextCursor = QTextCursor(document)
+        text: str = "\n".join(lines)
+        if end < document.blockCount():
+            # Whole lines, each with the line break after it
+            cursor.setPosition(document.findBlockByNumber(start).position())
+            cursor.setPosition(document.findBlockByNumber(end).position(), QTextCursor.MoveMode.KeepAnchor)
+            text = text + "\n" if lines else ""
+        elif start > 0:
+            # Up to the end of the document, which has no line break after its last line:
+            # the one before the first line replaced goes instead
+            previous = document.findBlockByNumber(start - 1)
+            cursor.setPosition(previous.position() + previous.length() - 1)
+            cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+            text = "\n" + text if lines else ""
+        else:
+            cursor.select(QTextCursor.SelectionType.Document)
+        cursor.beginEditBlock()
+        cursor.insertText(text)
+        cursor.endEditBlock()
 
     def update_line_number_area(self, rect: QRect, dy: int) -> None:
         """
         Updates the line number area.
         """
+        self.__update_visible_blocks()
         if dy:
             self.line_number_area.scroll(0, dy)
         else:
             self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
 
-        if rect.contains(self.viewport().rect()):
-            self.update_line_number_area_width(0)
+    def visible_blocks(self) -> tuple[int, int]:
+        """
+        Returns the numbers of the first and last blocks shown in the viewport.
+        """
+        first: int = self.firstVisibleBlock().blockNumber()
+        last: int = self.cursorForPosition(self.viewport().rect().bottomLeft()).blockNumber()
+        return first, last
+
+    def __update_visible_blocks(self) -> None:
+        """
+        Emits visible_blocks_changed if other blocks became visible.
+        """
+        if self.__visible_blocks == (-1, -1):
+            return
+        first, last = self.visible_blocks()
+        if self.__visible_blocks != (first, last):
+            self.__visible_blocks = (first, last)
+            self.visible_blocks_changed.emit(first, last)
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         """
         Handles the resize event of the editor.
         """
         super(CodeEditor, self).resizeEvent(event)
-        cr: QRect = self.contentsRect()
-        self.line_number_area.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
+        self.__update_margins()
+
+    @traced("CodeEditor.paintEvent", PAINT)
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """
+        Paints the diff overlay underneath the text.
+        """
+        self.diff_overlay.paint(self, event)
+        super(CodeEditor, self).paintEvent(event)
+
+    def update_lines(self, lines: List[int]) -> None:
+        """
+        Schedules a repaint of the given lines if any of them is visible.
 
+        :param lines: Line (block) numbers in ascending order.
+        """
+        if not lines:
+            return
+        first: int = self.firstVisibleBlock().blockNumber()
+        viewport_rect: QRectF = QRectF(self.viewport().rect())
+        dirty: QRectF = QRectF()
+        for line in lines:
+            if line < first:
+                continue
+            block = self.document().findBlockByNumber(line)
+            if not block.isValid():
+                continue
+            rect: QRectF = self.blockBoundingGeometry(block).translated(self.contentOffset())
+            if rect.top() > viewport_rect.bottom():
+                break
+            dirty = dirty.united(QRectF(0, rect.top(), viewport_rect.width(), rect.height()))
+        if not dirty.isEmpty():
+            self.viewport().update(dirty.toAlignedRect())
+
+    @traced("line_number_area_paint_event", PAINT)
     def line_number_area_paint_event(self, event: QPaintEvent) -> None:
         """
         Paints the line number area.
+
+        Numbers are copied digit by digit from a strip of pre-rendered digit
+        glyphs, so no text is laid out while painting, and only the blocks
+        intersecting the event rectangle are visited.
         """
         painter: QPainter = QPainter(self.line_number_area)
-        painter.fillRect(event.rect(), QColor("#2b2b2b"))
+        rect: QRect = event.rect()
+        painter.fillRect(rect, self.LINE_NUMBER_BACKGROUND)
+
+        glyphs: QPixmap = self.__glyphs()
+        ratio: float = glyphs.devicePixelRatio()
+        digit_width: int = self.__digit_width
+        glyph_width: int = round(digit_width * ratio)
+        glyph_height: int = glyphs.height()
+        right: int = self.line_number_area.width()
 
         block = self.firstVisibleBlock()
         block_number: int = block.blockNumber()
-        top: int = int(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
-        bottom: int = top + int(self.blockBoundingRect(block).height())
-
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number: str = str(block_number + 1)
-                painter.setPen(QColor("#d3d3d3"))
-                painter.drawText(0, top, self.line_number_area.width(),
-                                 self.fontMetrics().height(), Qt.AlignmentFlag.AlignRight, number)
+        top: float = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        while block.isValid() and top <= rect.bottom():
+            height: float = self.blockBoundingRect(block).height()
+            if block.isVisible() and top + height >= rect.top():
+                number, x, y = block_number + 1, right, int(top)
+                while number:
+                    number, digit = divmod(number, 10)
+                    x -= digit_width
+                    painter.drawPixmap(x, y, glyphs, digit * glyph_width, 0, glyph_width, glyph_height)
             block = block.next()
-            top = bottom
-            bottom = top + int(self.blockBoundingRect(block).height())
+            top += height
             block_number += 1
+        painter.end()
+
+    def __glyphs(self) -> QPixmap:
+        """
+        Returns the digits 0 to 9 rendered side by side in the gutter color,
+        rendering them first if the font or the screen changed.
+        """
+        ratio: float = self.devicePixelRatioF()
+        glyphs: Optional[QPixmap] = self.__digit_glyphs
+        if glyphs is not None and glyphs.devicePixelRatio() == ratio:
+            return glyphs
+
+        width, height = self.__digit_width, self.fontMetrics().height()
+        glyphs = QPixmap(round(width * 10 * ratio), round(height * ratio))
+        glyphs.setDevicePixelRatio(ratio)
+        glyphs.fill(Qt.GlobalColor.transparent)
+        painter: QPainter = QPainter(glyphs)
+        painter.setFont(self.font())
+        painter.setPen(self.LINE_NUMBER_COLOR)
+        for digit in range(10):
+            painter.drawText(QRect(digit * width, 0, width, height), Qt.AlignmentFlag.AlignRight, str(digit))
+        painter.end()
+        self.__digit_glyphs = glyphs
+        return glyphs
 
+    @traced("highlight_current_line", FORMAT)
     def highlight_current_line(self) -> None:
         """
         Highlights the current line where the cursor is located.
@@ -0,0 +1,229 @@
+from typing import Optional
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QResizeEvent, QShowEvent, QWheelEvent
+from PySide6.QtWidgets import QApplication, QHBoxLayout, QLabel, QScrollBar, QVBoxLayout, QWidget
+
+from app.resources import load_stylesheet
+from app.widgets.code_compare_widget import CodeCompareWidget
+
+
+class ComparisonEntry:
+    """
+    One comparison of a dashboard, kept as plain text until it is scrolled into view.
+    """
+
+    def __init__(self, title: str, left: str, right: str, language: Optional[str] = None,
+                 filename: Optional[str] = None) -> None:
+        """
+        :param title: Shown above the comparison, e.g. the path of the file.
+        :param left: The left text.
+        :param right: The right text.
+        :param language: Language of both texts; else guessed from the file name or the content.
+        :param filename: Name of the file compared, to guess the language from.
+        """
+        self.title: str = title
+        self.left: str = left
+        self.right: str = right
+        self.language: Optional[str] = language
+        self.filename: Optional[str] = filename
+
+
+class ComparisonPane(QWidget):
+    """
+    A title above a CodeCompareWidget: the unit a dashboard recycles.
+    """
+
+    def __init__(self, entry: ComparisonEntry, parent: QWidget, **options) -> None:
+        """
+        :param entry: The comparison shown first.
+        :param parent: The dashboard viewport.
+        :param options: Other arguments of CodeCompareWidget, e.g. ``diff_engine``.
+        """
+        super().__init__(parent)
+        # Index of the entry shown, in the dashboard
+        self.index: int = -1
+        self.title: QLabel = QLabel(entry.title)
+        self.compare_widget: CodeCompareWidget = CodeCompareWidget(
+            entry.left, entry.right, self, language=entry.language, filename=entry.filename, themed=False,
+            **options)
+        layout: QVBoxLayout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.title)
+        layout.addWidget(self.compare_widget)
+        # The panes are as tall as the dashboard says, however small that is
+        self.compare_widget.setMinimumSize(0, 0)
+
+    def show_entry(self, entry: ComparisonEntry) -> None:
+        """
+        Shows another comparison in this pane, reusing its editors and highlighters.
+        """
+        self.title.setText(entry.title)
+        self.compare_widget.set_texts(entry.left, entry.right, entry.language, entry.filename)
+
+
+class ComparisonDashboard(QWidget):
+    """
+    Scrollable list of many comparisons, one pane of fixed height each.
+
+    Only the panes intersecting the viewport exist. A pane scrolled out of
+    view goes back to a pool, and a comparison scrolled into view is loaded
+    into a pane from the pool, so the number of widgets, and the memory and
+    time spent building them, depend on the height of the window rather than
+    on the number of comparisons. All panes share the lexers, the token
+    palette and the diff cache, and inherit the stylesheet of the dashboard
+    instead of each setting their own.
+    """
+
+    # Emitted with the index of a comparison loaded into a pane
+    comparison_shown = Signal(int)
+
+    # Height of every pane, in pixels
+    PANE_HEIGHT: int = 360
+
+    # Distance scrolled by one step of the mouse wheel or the arrows, in pixels
+    SCROLL_STEP: int = 40
+
+    def __init__(self, parent: Optional[QWidget] = None, pane_height: int = PANE_HEIGHT, **options) -> None:
+        """
+        :param parent: The parent widget.
+        :param pane_height: Height of every pane, in pixels.
+        :param options: Arguments of every CodeCompareWidget, e.g. ``diff_engine``.
+        """
+        super().__init__(parent)
+        self.pane_height: int = pane_height
+        # Highlighting only what is shown suits panes that come and go
+        options.setdefault("lazy_highlighting", True)
+        self.options: dict = options
+        self.entries: list[ComparisonEntry] = []
+        # Panes in view by entry index, and the panes out of view, ready for reuse
+        self.__panes: dict[int, ComparisonPane] = {}
+        self.__pool: list[ComparisonPane] = []
+
+        self.viewport: QWidget = QWidget()
+        self.scroll_bar: QScrollBar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.setSingleStep(self.SCROLL_STEP)
+        self.scroll_bar.valueChanged.connect(self.__layout_panes)
+        layout: QHBoxLayout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.viewport, 1)
+        layout.addWidget(self.scroll_bar)
+        self.setStyleSheet(load_stylesheet())
+
+    def add_comparison(self, title: str, left: str, right: str, language: Optional[str] = None,
+                       filename: Optional[str] = None) -> int:
+        """
+        Appends a comparison; it gets a pane when it is scrolled into view.
+
+        :return: The index of the comparison.
+        """
+        self.entries.append(ComparisonEntry(title, left, right, language, filename))
+        self.__update_scroll_range()
+        return len(self.entries) - 1
+
+    def clear(self) -> None:
+        """
+        Removes all comparisons; their panes are kept for reuse.
+        """
+        self.entries = []
+        self.scroll_bar.setValue(0)
+        self.__update_scroll_range()
+
+    def count(self) -> int:
+        """
+        Returns the number of comparisons.
+        """
+        return len(self.entries)
+
+    def pane_count(self) -> int:
+        """
+        Returns the number of panes built so far, in view or pooled.
+        """
+        return len(self.__panes) + len(self.__pool)
+
+    def visible_range(self) -> tuple[int, int]:
+        """
+        Returns the indexes [first, last) of the comparisons intersecting the viewport.
+        """
+        top: int = self.scroll_bar.value()
+        first: int = top // self.pane_height
+        last: int = -(-(top + self.viewport.height()) // self.pane_height)
+        return min(first, len(self.entries)), min(last, len(self.entries))
+
+    def compare_widget(self, index: int) -> Optional[CodeCompareWidget]:
+        """
+        Returns the widget showing a comparison, or None if it is out of view.
+        """
+        pane: Optional[ComparisonPane] = self.__panes.get(index)
+        return pane.compare_widget if pane is not None else None
+
+    def scroll_to(self, index: int) -> None:
+        """
+        Scrolls a comparison to the top of the viewport, or as far as possible.
+        """
+        self.scroll_bar.setValue(index * self.pane_height)
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        """
+        Fits the scroll range and the panes to the new size.
+        """
+        super().resizeEvent(event)
+        self.__update_scroll_range()
+
+    def showEvent(self, event: QShowEvent) -> None:
+        """
+        Builds the panes in view, which waits until the size of the dashboard is known.
+        """
+        super().showEvent(event)
+        self.__update_scroll_range()
+
+    def wheelEvent(self, event: QWheelEvent) -> None:
+        """
+        Scrolls the list when the wheel turns outside the editors, e.g. over a title.
+        """
+        QApplication.sendEvent(self.scroll_bar, event)
+
+    def __update_scroll_range(self) -> None:
+        """
+        Sets the scroll range from the number of comparisons and lays the panes out.
+        """
+        height: int = self.viewport.height()
+        self.scroll_bar.setRange(0, max(0, len(self.entries) * self.pane_height - height))
+        self.scroll_bar.setPageStep(max(1, height))
+        self.__layout_panes()
+
+    def __layout_panes(self) -> None:
+        """
+        Releases the panes scrolled out of view, fills the ones scrolled into
+        view, and moves them all to their place.
+        """
+        if not self.isVisible():
+            return
+        first, last = self.visible_range()
+        for index in [index for index in self.__panes if not first <= index < last]:
+            pane: ComparisonPane = self.__panes.pop(index)
+            pane.hide()
+            self.__pool.append(pane)
+        top: int = self.scroll_bar.value()
+        width: int = self.viewport.width()
+        for index in range(first, last):
+            pane = self.__panes.get(index)
+            if pane is None:
+                pane = self.__panes[index] = self.__acquire(index)
+            pane.setGeometry(0, index * self.pane_height - top, width, self.pane_height)
+
+    def __acquire(self, index: int) -> ComparisonPane:
+        """
+        Returns a pane showing a comparison, reused from the pool if possible.
+        """
+        entry: ComparisonEntry = self.entries[index]
+        if self.__pool:
+            pane: ComparisonPane = self.__pool.pop()
+            pane.show_entry(entry)
+        else:
+            pane = ComparisonPane(entry, self.viewport, **self.options)
+        pane.index = index
+        pane.show()
+        self.comparison_shown.emit(index)
+        return pane
@@ -0,0 +1,87 @@
+from typing import Callable, Optional
+
+from PySide6.QtCore import QPoint, QPointF
+from PySide6.QtGui import QColor, QPainter, QPaintEvent, QPolygonF
+from PySide6.QtWidgets import QWidget
+
+from app.core.line_map import LineMap
+from app.core.tracing import PAINT, traced
+from app.widgets.code_editor import CodeEditor
+
+
+class DiffConnector(QWidget):
+    """
+    Strip between the two editors joining each hunk on the left to its
+    counterpart on the right.
+
+    Hunks of different lengths stay visually aligned without padding either
+    document with blank lines. Only the hunks visible in one of the editors
+    are looked up and painted.
+    """
+
+    def __init__(self, left: CodeEditor, right: CodeEditor, line_map: Callable[[], LineMap],
+                 color: QColor = QColor("green"), parent: Optional[QWidget] = None) -> None:
+        """
+        :param left: The left editor.
+        :param right: The right editor.
+        :param line_map: Returns the line map of the current diff.
+        :param color: Fill color of the connections.
+        :param parent: The parent widget.
+        """
+        super().__init__(parent)
+        self.left: CodeEditor = left
+        self.right: CodeEditor = right
+        self.line_map: Callable[[], LineMap] = line_map
+        self.color: QColor = color
+        self.setFixedWidth(40)
+        for editor in (left, right):
+            editor.verticalScrollBar().valueChanged.connect(self.update)
+
+    @traced("DiffConnector.paintEvent", PAINT)
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """
+        Paints a quadrilateral per visible hunk, from its lines on the left to its lines on the right.
+        """
+        left_range: tuple[int, int] = self.left.visible_blocks()
+        right_range: tuple[int, int] = self.right.visible_blocks()
+        line_map: LineMap = self.line_map()
+        hunks = {*line_map.hunks_between(0, *left_range), *line_map.hunks_between(1, *right_range)}
+        if not hunks:
+            return
+
+        left_offset: int = self.left.viewport().mapTo(self.parentWidget(), QPoint(0, 0)).y() - self.y()
+        right_offset: int = self.right.viewport().mapTo(self.parentWidget(), QPoint(0, 0)).y() - self.y()
+        painter: QPainter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(self.color)
+        painter.setBrush(self.color)
+        width: float = self.width()
+        for _, i1, i2, j1, j2 in sorted(hunks):
+            polygon = QPolygonF([
+                QPointF(0, left_offset + _line_top(self.left, i1, left_range)),
+                QPointF(width, right_offset + _line_top(self.right, j1, right_range)),
+                QPointF(width, right_offset + _line_top(self.right, j2, right_range)),
+                QPointF(0, left_offset + _line_top(self.left, i2, left_range)),
+            ])
+            painter.drawPolygon(polygon)
+        painter.end()
+
+
+def _line_top(editor: CodeEditor, line: int, visible: tuple[int, int]) -> float:
+    """
+    Returns the top of a line in viewport coordinates, or the top of the line
+    after the last one. Lines off screen are clamped just outside the
+    viewport, so their geometry is never walked to.
+    """
+    first, last = visible
+    if line < first:
+        return -1
+    if line > last + 1:
+        return editor.viewport().height() + 1
+    document = editor.document()
+    if line >= document.blockCount():
+        block = document.lastBlock()
+        rect = editor.blockBoundingGeometry(block).translated(editor.contentOffset())
+        return rect.bottom()
+    block = document.findBlockByNumber(line)
+    return editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
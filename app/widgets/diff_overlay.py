@@ -0,0 +1,130 @@
+from typing import TYPE_CHECKING, Callable, Optional
+
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QColor, QPainter, QPaintEvent, QTextBlock
+
+from app.core.intraline import Range
+from app.core.tracing import PAINT, traced
+
+if TYPE_CHECKING:
+    from app.widgets.code_editor import CodeEditor
+
+
+class DiffOverlay:
+    """
+    Diff highlights painted underneath the text of a code editor.
+
+    The overlay only holds a status byte per line and paints the visible ones,
+    so the document, its formats and its undo stack are never modified, and
+    applying or clearing any number of hunks costs nothing until the next paint.
+
+    Changed character ranges inside a line are asked for at paint time, so
+    they are only computed for the lines that are actually shown.
+    """
+
+    def __init__(self, color: QColor = QColor("green"), inline_color: QColor = QColor("#6abf69")) -> None:
+        """
+        :param color: Background color of changed lines.
+        :param inline_color: Background color of the changed characters inside a line.
+        """
+        self.color: QColor = color
+        self.inline_color: QColor = inline_color
+        self.status: bytearray = bytearray()
+        # Background colors of other status values than 1, e.g. of conflicts in a merge
+        self.colors: dict[int, QColor] = {}
+        # Returns the changed character ranges of a changed line, or None if
+        # they are unknown and the line is highlighted as a whole
+        self.inline_ranges: Optional[Callable[[int], Optional[list[Range]]]] = None
+        # Returns the lines between two line numbers before which the other
+        # document has lines that this one lacks
+        self.gaps: Optional[Callable[[int, int], list[int]]] = None
+
+    def set_status(self, status: bytearray) -> None:
+        """
+        Sets the status of every line; 1 marks a changed line, other non-zero
+        values lines painted in the color given in ``colors``.
+
+        The array is kept by reference, so in-place updates are picked up
+        by the next paint.
+
+        :param status: One byte per line.
+        """
+        self.status = status
+
+    def clear(self) -> None:
+        """
+        Removes all highlights.
+        """
+        self.status = bytearray()
+
+    def is_changed(self, line: int) -> bool:
+        """
+        Returns whether the given line is part of a difference.
+
+        :param line: The line (block) number.
+        """
+        return 0 <= line < len(self.status) and self.status[line] != 0
+
+    @traced("DiffOverlay.paint", PAINT)
+    def paint(self, editor: 'CodeEditor', event: QPaintEvent) -> None:
+        """
+        Paints the background of the changed lines visible in the event rectangle.
+
+        :param editor: The editor whose viewport is painted.
+        :param event: The paint event of the viewport.
+        """
+        if not self.status:
+            return
+        rect = event.rect()
+        width: float = editor.viewport().width()
+        painter: QPainter = QPainter(editor.viewport())
+        block = editor.firstVisibleBlock()
+        first: int = block.blockNumber()
+        top: float = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
+        tops: list[float] = []
+        while block.isValid() and top <= rect.bottom():
+            tops.append(top)
+            height: float = editor.blockBoundingRect(block).height()
+            if block.isVisible() and top + height >= rect.top() and self.is_changed(block.blockNumber()):
+                painter.fillRect(QRectF(0, top, width, height),
+                                 self.colors.get(self.status[block.blockNumber()], self.color))
+                ranges = self.inline_ranges(block.blockNumber()) if self.inline_ranges is not None else None
+                if ranges:
+                    self.__paint_ranges(painter, editor, block, ranges)
+            top += height
+            block = block.next()
+        tops.append(top)
+        if self.gaps is not None:
+            self.__paint_gaps(painter, first, tops, width)
+        painter.end()
+
+    def __paint_gaps(self, painter: QPainter, first: int, tops: list[float], width: float) -> None:
+        """
+        Draws a filler mark where lines exist only in the other document.
+
+        :param first: Number of the first block painted.
+        :param tops: Top of each painted block, followed by the bottom of the last one.
+        """
+        for line in self.gaps(first, first + len(tops) - 1):
+            if 0 <= line - first < len(tops):
+                painter.fillRect(QRectF(0, tops[line - first] - 1, width, 3), self.color)
+
+    def __paint_ranges(self, painter: QPainter, editor: 'CodeEditor', block: QTextBlock, ranges: list[Range]) -> None:
+        """
+        Paints the background of character ranges of a block, across wrapped lines.
+        """
+        layout = block.layout()
+        origin = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).topLeft() + layout.position()
+        length: int = len(block.text())
+        for index in range(layout.lineCount()):
+            line = layout.lineAt(index)
+            line_start: int = line.textStart()
+            line_end: int = line_start + line.textLength()
+            for start, end in ranges:
+                start, end = max(start, line_start), min(end, line_end, length)
+                if start >= end:
+                    continue
+                left: float = line.cursorToX(start)[0]
+                right: float = line.cursorToX(end)[0]
+                painter.fillRect(QRectF(origin.x() + left, origin.y() + line.y(), right - left, line.height()),
+                                 self.inline_color)
@@ -0,0 +1,172 @@
+import os
+from typing import Optional, Union
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QLabel, QSplitter, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget
+
+from app.core.diff_engines import DiffEngine, get_diff_engine
+from app.core.directory_compare import (ADDED, BINARY, CHANGED, ERROR, IDENTICAL, PENDING, REMOVED, FilePair,
+                                        FileResult, pair_trees)
+from app.core.line_interner import InterningEngine
+from app.resources import load_stylesheet
+from app.widgets.code_compare_widget import CodeCompareWidget
+from app.workers.directory_scheduler import DirectoryDiffScheduler
+
+
+class DirectoryCompareWidget(QWidget):
+    """
+    Widget comparing two directory trees.
+
+    The file list is filled from the metadata of both trees at once: files
+    only in one tree, and files of the same size and modification time, need
+    no reading. The other files are hashed and diffed in a pool of processes,
+    and their summaries fill in as the batches complete. A file only gets a
+    CodeCompareWidget, below the list, when it is opened.
+    """
+
+    # Emitted with the relative path of a file opened in the comparison pane
+    file_opened = Signal(str)
+    # Emitted once every file has been compared
+    comparison_finished = Signal()
+
+    # Columns of the file list
+    PATH_COLUMN, STATUS_COLUMN, CHANGES_COLUMN = range(3)
+
+    # Text color of each status in the file list
+    STATUS_COLORS: dict[str, QColor] = {
+        PENDING: QColor("#808080"),
+        IDENTICAL: QColor("#808080"),
+        CHANGED: QColor("#e5c07b"),
+        ADDED: QColor("#98c379"),
+        REMOVED: QColor("#e06c75"),
+        BINARY: QColor("#e5c07b"),
+        ERROR: QColor("#e06c75"),
+    }
+
+    def __init__(self, left_root: str, right_root: str, parent: Optional[QWidget] = None,
+                 diff_engine: Union[str, DiffEngine] = "difflib", encoding: str = "utf-8",
+                 max_workers: Optional[int] = None, **options) -> None:
+        """
+        :param left_root: The left directory.
+        :param right_root: The right directory.
+        :param parent: The parent widget.
+        :param diff_engine: Name or instance of the diff engine, for the summaries and the opened files.
+        :param encoding: Text encoding of the files.
+        :param max_workers: Number of processes comparing files; the number of cores if omitted.
+        :param options: Other arguments of CodeCompareWidget for the opened files, e.g. ``ignore_whitespace``.
+        """
+        super().__init__(parent)
+        self.left_root: str = left_root
+        self.right_root: str = right_root
+        self.encoding: str = encoding
+        self.diff_engine: DiffEngine = get_diff_engine(diff_engine)
+        self.options: dict = options
+        self.pairs: list[FilePair] = []
+        # Widget comparing the file opened last, created on demand
+        self.compare_widget: Optional[CodeCompareWidget] = None
+
+        self.file_list: QTreeWidget = QTreeWidget()
+        self.file_list.setHeaderLabels(["File", "Status", "Changes"])
+        self.file_list.setRootIsDecorated(False)
+        self.file_list.setUniformRowHeights(True)
+        self.file_list.itemActivated.connect(lambda item: self.open_file(self.file_list.indexOfTopLevelItem(item)))
+        self.summary_label: QLabel = QLabel()
+
+        top: QWidget = QWidget()
+        top_layout: QVBoxLayout = QVBoxLayout(top)
+        top_layout.setContentsMargins(0, 0, 0, 0)
+        top_layout.addWidget(self.file_list)
+        top_layout.addWidget(self.summary_label)
+        self.splitter: QSplitter = QSplitter(Qt.Orientation.Vertical)
+        self.splitter.addWidget(top)
+        layout: QVBoxLayout = QVBoxLayout(self)
+        layout.addWidget(self.splitter)
+        self.setStyleSheet(load_stylesheet())
+
+        # Summaries use the same whitespace and case options as the opened files
+        engine: InterningEngine = InterningEngine(self.diff_engine, options.get("ignore_whitespace", False),
+                                                  options.get("ignore_case", False))
+        self.scheduler: DirectoryDiffScheduler = DirectoryDiffScheduler(engine, max_workers, self)
+        self.scheduler.batch_compared.connect(self.__on_batch_compared)
+        self.scheduler.finished.connect(self.__on_finished)
+        self.compare()
+
+    def compare(self) -> None:
+        """
+        Scans both trees again, lists their files and starts comparing the ones that may differ.
+        """
+        self.scheduler.cancel()
+        self.pairs = pair_trees(self.left_root, self.right_root)
+        self.file_list.setUpdatesEnabled(False)
+        self.file_list.clear()
+        items: list[QTreeWidgetItem] = [QTreeWidgetItem([pair.path, "", ""]) for pair in self.pairs]
+        for item, pair in zip(items, self.pairs):
+            self.__show_pair(item, pair)
+        self.file_list.addTopLevelItems(items)
+        self.file_list.resizeColumnToContents(self.PATH_COLUMN)
+        self.file_list.setUpdatesEnabled(True)
+        self.scheduler.start(self.left_root, self.right_root, self.pairs, self.encoding)
+        self.__update_summary()
+
+    def is_comparing(self) -> bool:
+        """
+        Returns whether files are still being compared.
+        """
+        return self.scheduler.is_running()
+
+    def open_file(self, index: int) -> CodeCompareWidget:
+        """
+        Shows the two versions of a file in the comparison pane, replacing the
+        file shown before. A file missing on one side is compared to an empty one.
+
+        :param index: Index of the file in ``pairs``.
+        """
+        pair: FilePair = self.pairs[index]
+        left: str = os.path.join(self.left_root, pair.path) if pair.left is not None else os.devnull
+        right: str = os.path.join(self.right_root, pair.path) if pair.right is not None else os.devnull
+        if self.compare_widget is not None:
+            self.compare_widget.deleteLater()
+        options: dict = dict(self.options, filename=pair.path, diff_engine=self.diff_engine)
+        self.compare_widget = CodeCompareWidget.from_files(left, right, encoding=self.encoding, **options)
+        self.splitter.addWidget(self.compare_widget)
+        self.file_list.setCurrentItem(self.file_list.topLevelItem(index))
+        self.file_opened.emit(pair.path)
+        return self.compare_widget
+
+    def __on_batch_compared(self, results: list[tuple[int, FileResult]]) -> None:
+        """
+        Shows the summaries of a batch of compared files.
+        """
+        for index, result in results:
+            pair: FilePair = self.pairs[index]
+            pair.update(result)
+            self.__show_pair(self.file_list.topLevelItem(index), pair)
+        self.__update_summary()
+
+    def __on_finished(self) -> None:
+        """
+        Updates the summary once every file is compared.
+        """
+        self.__update_summary()
+        self.comparison_finished.emit()
+
+    def __show_pair(self, item: QTreeWidgetItem, pair: FilePair) -> None:
+        """
+        Shows the status and line counts of a file in its row.
+        """
+        item.setText(self.STATUS_COLUMN, pair.error or pair.status)
+        item.setText(self.CHANGES_COLUMN, f"-{pair.deleted} +{pair.inserted}" if pair.status == CHANGED else "")
+        color: QColor = self.STATUS_COLORS[pair.status]
+        for column in (self.STATUS_COLUMN, self.CHANGES_COLUMN):
+            item.setForeground(column, color)
+
+    def __update_summary(self) -> None:
+        """
+        Shows how many files are in each state, e.g. "12 changed, 3 added, 9985 identical".
+        """
+        counts: dict[str, int] = {}
+        for pair in self.pairs:
+            counts[pair.status] = counts.get(pair.status, 0) + 1
+        parts: list[str] = [f"{counts[status]} {status}" for status in self.STATUS_COLORS if counts.get(status)]
+        self.summary_label.setText(", ".join(parts) or "No files")
@@ -0,0 +1,157 @@
+import threading
+from typing import Iterator, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from app.app_logger import logger
+from app.core.file_loader import CHUNK_SIZE, STDIN, LineReader, read_chunks
+from app.core.line_interner import LineInterner
+from app.widgets.code_editor import CodeEditor
+
+
+class DocumentLoader(QObject):
+    """
+    Fills an editor from a file one chunk per event loop iteration.
+
+    The first chunk is shown as soon as loading starts, so the top of a large
+    file appears immediately, and the GUI stays responsive while the rest is
+    appended. Every chunk is also split into lines and interned on the way,
+    for the diff that follows. The editor is read-only while it is being filled.
+
+    Standard input may be a pipe that blocks until its writer has more, so it
+    is read in a thread of its own, which posts every chunk to this object's
+    thread as soon as it arrives.
+    """
+
+    # Number of lines read so far
+    progress = Signal(int)
+    # Emitted once the whole file is in the editor
+    finished = Signal()
+    # Error message; the editor keeps what was loaded until then
+    failed = Signal(str)
+
+    # Internal: the next chunk read by the stream thread, or None at the end of the stream
+    _chunk_read = Signal(object)
+    # Internal: the stream thread could not read, with the error message
+    _read_failed = Signal(str)
+
+    def __init__(self, editor: CodeEditor, path: str, chunk_size: int = CHUNK_SIZE,
+                 encoding: str = "utf-8", interner: Optional[LineInterner] = None,
+                 parent: Optional[QObject] = None) -> None:
+        """
+        :param editor: The editor to fill; its current text is replaced.
+        :param path: Path of the file, or "-" for standard input.
+        :param chunk_size: Number of bytes read and appended per step.
+        :param encoding: Text encoding of the file.
+        :param interner: Gives the line IDs; shared with the other document of the diff.
+        :param parent: The parent object.
+        """
+        super().__init__(parent)
+        self.editor: CodeEditor = editor
+        self.path: str = path
+        self.reader: LineReader = LineReader(interner)
+        self.__chunks: Iterator[str] = read_chunks(path, chunk_size, encoding)
+        self.__timer: QTimer = QTimer(self)
+        self.__timer.setInterval(0)
+        self.__timer.timeout.connect(self.__load_chunk)
+        self.__read_only: bool = editor.isReadOnly()
+        # Set while standard input is read in its own thread; the thread stops once it is cleared
+        self.__streaming: Optional[threading.Event] = None
+        self._chunk_read.connect(self.__on_chunk_read)
+        self._read_failed.connect(self.__fail)
+
+    def start(self) -> None:
+        """
+        Clears the editor, shows the first chunk and schedules the others.
+        """
+        document = self.editor.document()
+        document.setUndoRedoEnabled(False)
+        self.editor.setReadOnly(True)
+        self.editor.setPlainText("")
+        if self.path == STDIN:
+            self.__streaming = threading.Event()
+            self.__streaming.set()
+            threading.Thread(target=self.__read_stream, args=(self.__streaming,), name="stdin reader",
+                             daemon=True).start()
+            return
+        self.__timer.start()
+        self.__load_chunk()
+
+    def is_running(self) -> bool:
+        """
+        Returns whether chunks are still being appended.
+        """
+        return self.__timer.isActive() or self.__streaming is not None
+
+    def cancel(self) -> None:
+        """
+        Stops loading, leaving the text loaded so far in the editor.
+        """
+        if self.is_running():
+            self.__finish()
+
+    def __load_chunk(self) -> None:
+        """
+        Reads, interns and appends the next chunk, or finishes at the end of the file.
+        """
+        try:
+            text: Optional[str] = next(self.__chunks, None)
+        except (OSError, LookupError) as error:
+            self.__fail(str(error))
+            return
+        self.__on_chunk_read(text)
+
+    def __read_stream(self, streaming: threading.Event) -> None:
+        """
+        Reads standard input in the stream thread, posting the chunks until its end or until cancelled.
+        """
+        try:
+            for text in self.__chunks:
+                if not streaming.is_set():
+                    break
+                self._chunk_read.emit(text)
+            else:
+                self._chunk_read.emit(None)
+        except (OSError, LookupError) as error:
+            self._read_failed.emit(str(error))
+        finally:
+            self.__chunks.close()
+
+    def __on_chunk_read(self, text: Optional[str]) -> None:
+        """
+        Interns and appends a chunk, or finishes at the end of the file.
+        """
+        if not self.is_running():
+            return
+        if text is None:
+            self.reader.close()
+            self.__finish()
+            self.finished.emit()
+            return
+        self.reader.feed(text)
+        self.editor.append_text(text)
+        self.progress.emit(len(self.reader.lines))
+
+    def __fail(self, message: str) -> None:
+        """
+        Stops loading after a read error.
+        """
+        if not self.is_running():
+            return
+        logger.error(f"Cannot read {self.path}: {message}")
+        self.__finish()
+        self.failed.emit(message)
+
+    def __finish(self) -> None:
+        """
+        Stops the timer or the stream thread and gives the editor back to the user.
+        """
+        self.__timer.stop()
+        if self.__streaming is not None:
+            # The stream thread closes the chunks itself, once its pending read returns
+            self.__streaming.clear()
+            self.__streaming = None
+        else:
+            self.__chunks.close()
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.setReadOnly(self.__read_only)
@@ -0,0 +1,318 @@
+from typing import Optional, Union
+
+from PySide6.QtCore import QThreadPool, Qt, Signal
+from PySide6.QtGui import QColor, QKeySequence, QShortcut
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QVBoxLayout, QWidget
+
+from app.core.diff_engines import DiffEngine, Opcode, get_diff_engine
+from app.core.lexer_registry import default_registry
+from app.core.line_interner import InterningEngine
+from app.core.three_way_merge import CONFLICT, TAKE_BASE, TAKE_BOTH, TAKE_LEFT, TAKE_RIGHT, MergeHunk, ThreeWayMerge
+from app.resources import load_stylesheet
+from app.workers.diff_worker import DiffWorker
+from app.widgets.code_editor import CodeEditor
+from app.widgets.pygments_highlighter import PygmentsHighlighter
+
+# Generations of the two diff workers, which run at the same time
+_BASE_TO_LEFT: int = 0
+_BASE_TO_RIGHT: int = 1
+
+
+class MergeWidget(QWidget):
+    """
+    Three-pane merge of two versions of a text descending from a common base:
+    the left version, the merged result and the right version.
+
+    Each side is diffed against the base once, off the GUI thread for large
+    texts. Resolving a hunk only replaces its lines in the result editor, so
+    the rest of the document keeps its layout and syntax highlighting.
+    """
+
+    # Emitted once the hunks are known and the result is shown
+    merge_ready = Signal()
+    # Emitted with the index of a hunk whose resolution changed
+    hunk_resolved = Signal(int)
+
+    # Merges with more lines than this (all three texts together) are diffed off the GUI thread
+    ASYNC_MERGE_THRESHOLD: int = 5000
+
+    # Documents with more lines than this are syntax highlighted lazily by default
+    LAZY_HIGHLIGHT_THRESHOLD: int = 20_000
+
+    # Line status of a hunk taken as it is, and of an unresolved conflict
+    CHANGED: int = 1
+    CONFLICTING: int = 2
+    CONFLICT_COLOR: QColor = QColor("#8b2f2f")
+
+    # Key sequences moving between the unresolved conflicts
+    NEXT_CONFLICT_KEYS: tuple[str, ...] = ("F8",)
+    PREVIOUS_CONFLICT_KEYS: tuple[str, ...] = ("Shift+F8",)
+    # Key sequences resolving the hunk under the cursor of the result editor
+    RESOLUTION_KEYS: dict[str, str] = {TAKE_LEFT: "Alt+Left", TAKE_RIGHT: "Alt+Right",
+                                       TAKE_BOTH: "Alt+B", TAKE_BASE: "Alt+O"}
+
+    def __init__(self, base: str, left: str, right: str, parent: Optional[QWidget] = None,
+                 diff_engine: Union[str, DiffEngine] = "myers", language: Optional[str] = None,
+                 filename: Optional[str] = None, lazy_highlighting: Optional[bool] = None,
+                 ignore_whitespace: bool = False, ignore_case: bool = False,
+                 left_name: str = "left", right_name: str = "right") -> None:
+        """
+        :param base: The common ancestor.
+        :param left: The left version.
+        :param right: The right version.
+        :param parent: The parent widget.
+        :param diff_engine: Name or instance of the diff engine.
+        :param language: Language of the texts; else guessed from the file name or the content.
+        :param filename: Name of the file merged, to guess the language from.
+        :param lazy_highlighting: Highlight only what is shown; by default for large texts.
+        :param ignore_whitespace: Lines differing only in whitespace are equal.
+        :param ignore_case: Lines differing only in case are equal.
+        :param left_name: Name of the left side, in the titles and the conflict markers.
+        :param right_name: Name of the right side.
+        """
+        super().__init__(parent)
+        self.language: str = default_registry().resolve(language, filename, content=base or left or right)
+        # One engine, so that the lines of all three texts share their IDs
+        self.diff_engine: InterningEngine = InterningEngine(
+            get_diff_engine(diff_engine) if isinstance(diff_engine, str) else diff_engine,
+            ignore_whitespace, ignore_case)
+        self.left_name: str = left_name
+        self.right_name: str = right_name
+        # The merge, once both diffs are done
+        self.merge: Optional[ThreeWayMerge] = None
+        self.__lines: tuple[list[str], list[str], list[str]] = (base.split("\n"), left.split("\n"),
+                                                                right.split("\n"))
+        # Workers still running, and the opcodes they streamed so far
+        self.__workers: dict[int, DiffWorker] = {}
+        self.__opcodes: tuple[list[Opcode], list[Opcode]] = ([], [])
+        # Status of the lines of each editor, kept by their diff overlays
+        self.__status: tuple[bytearray, bytearray, bytearray] = (bytearray(), bytearray(), bytearray())
+
+        self.left_text_edit: CodeEditor = CodeEditor()
+        self.result_text_edit: CodeEditor = CodeEditor()
+        self.right_text_edit: CodeEditor = CodeEditor()
+        if lazy_highlighting is None:
+            lazy_highlighting = max(len(lines) for lines in self.__lines) >= self.LAZY_HIGHLIGHT_THRESHOLD
+        self.highlighters: list[PygmentsHighlighter] = []
+        for editor, status in zip(self.__editors(), self.__status):
+            editor.setReadOnly(True)
+            highlighter: PygmentsHighlighter = PygmentsHighlighter(
+                editor.document(), language=self.language, lazy=lazy_highlighting)
+            editor.attach_highlighter(highlighter)
+            self.highlighters.append(highlighter)
+            editor.diff_overlay.colors[self.CONFLICTING] = self.CONFLICT_COLOR
+            editor.diff_overlay.set_status(status)
+        self.left_text_edit.setPlainText(left)
+        self.right_text_edit.setPlainText(right)
+        # The base stands in for the result until the merge is done
+        self.result_text_edit.setPlainText(base)
+
+        columns: QHBoxLayout = QHBoxLayout()
+        for title, editor in ((left_name, self.left_text_edit), ("result", self.result_text_edit),
+                              (right_name, self.right_text_edit)):
+            column: QVBoxLayout = QVBoxLayout()
+            column.addWidget(QLabel(title))
+            column.addWidget(editor)
+            columns.addLayout(column)
+        # Conflict counter under the editors, e.g. "3 of 12 conflicts left"
+        self.conflict_label: QLabel = QLabel()
+        self.conflict_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        outer_layout: QVBoxLayout = QVBoxLayout()
+        outer_layout.addLayout(columns)
+        outer_layout.addWidget(self.conflict_label)
+        self.setLayout(outer_layout)
+
+        bindings: list[tuple[str, object]] = (
+            [(key, self.next_conflict) for key in self.NEXT_CONFLICT_KEYS]
+            + [(key, self.previous_conflict) for key in self.PREVIOUS_CONFLICT_KEYS]
+            + [(key, lambda resolution=resolution: self.resolve_current(resolution))
+               for resolution, key in self.RESOLUTION_KEYS.items()])
+        for key, slot in bindings:
+            shortcut: QShortcut = QShortcut(QKeySequence(key), self)
+            shortcut.setContext(Qt.ShortcutContext.WidgetWithChildrenShortcut)
+            shortcut.activated.connect(slot)
+
+        self.setMinimumSize(800, 600)
+        self.setStyleSheet(load_stylesheet())
+        self.__start_merge()
+
+    def __editors(self) -> tuple[CodeEditor, CodeEditor, CodeEditor]:
+        """
+        Returns the editors of the left side, the result and the right side.
+        """
+        return self.left_text_edit, self.result_text_edit, self.right_text_edit
+
+    def __start_merge(self) -> None:
+        """
+        Diffs both sides against the base, in worker threads for large texts.
+        """
+        if sum(len(lines) for lines in self.__lines) <= self.ASYNC_MERGE_THRESHOLD:
+            self.__finish_merge(None)
+            return
+        base_ids, left_ids, right_ids = (self.diff_engine.interner.intern_lines(lines) for lines in self.__lines)
+        for generation, side_ids in ((_BASE_TO_LEFT, left_ids), (_BASE_TO_RIGHT, right_ids)):
+            worker: DiffWorker = DiffWorker(generation, self.diff_engine, base_ids, side_ids)
+            worker.signals.opcodes_ready.connect(self.__on_opcodes_ready)
+            worker.signals.finished.connect(self.__on_diff_finished)
+            worker.signals.failed.connect(self.__on_diff_failed)
+            self.__workers[generation] = worker
+        self.__update_conflict_label()
+        for worker in list(self.__workers.values()):
+            QThreadPool.globalInstance().start(worker)
+
+    def __on_opcodes_ready(self, generation: int, opcodes: list[Opcode]) -> None:
+        """
+        Collects a chunk of opcodes streamed by a worker.
+        """
+        if generation in self.__workers:
+            self.__opcodes[generation].extend(opcodes)
+
+    def __on_diff_finished(self, generation: int) -> None:
+        """
+        Merges once both diffs are done.
+        """
+        if self.__workers.pop(generation, None) is not None and not self.__workers:
+            self.__finish_merge(self.__opcodes)
+            self.__opcodes = ([], [])
+
+    def __on_diff_failed(self, generation: int, message: str) -> None:
+        """
+        Gives up the merge, whose error has already been logged.
+        """
+        if self.__workers.pop(generation, None) is not None:
+            self.cancel()
+            self.conflict_label.setText("Merge failed")
+
+    def cancel(self) -> None:
+        """
+        Cancels the diffs still running.
+        """
+        for worker in self.__workers.values():
+            worker.cancel()
+        self.__workers = {}
+        self.__opcodes = ([], [])
+
+    def is_merging(self) -> bool:
+        """
+        Returns whether the sides are still being diffed against the base.
+        """
+        return bool(self.__workers)
+
+    def __finish_merge(self, opcodes: Optional[tuple[list[Opcode], list[Opcode]]]) -> None:
+        """
+        Classifies the hunks, shows the merged text and marks the hunks in all three editors.
+        """
+        self.merge = ThreeWayMerge(*self.__lines, self.diff_engine, opcodes=opcodes,
+                                   left_name=self.left_name, right_name=self.right_name)
+        self.result_text_edit.setPlainText(self.merge.merged_text())
+        for status, editor in zip(self.__status, self.__editors()):
+            status[:] = bytes(editor.blockCount())
+        for hunk in self.merge.hunks:
+            self.__mark_hunk(hunk)
+        for editor in self.__editors():
+            editor.viewport().update()
+        self.__update_conflict_label()
+        self.merge_ready.emit()
+
+    def __mark_hunk(self, hunk: MergeHunk) -> None:
+        """
+        Sets the status of the lines of a hunk in all three editors.
+        """
+        value: int = self.CONFLICTING if hunk.kind == CONFLICT and not hunk.is_resolved() else self.CHANGED
+        for status, (start, end) in zip(self.__status, (hunk.left, hunk.result, hunk.right)):
+            status[start:end] = bytes([value]) * (end - start)
+
+    def resolve(self, index: int, resolution: Optional[str]) -> None:
+        """
+        Resolves a hunk, or marks it as a conflict again with None.
+
+        Only the lines of the hunk are replaced in the result editor.
+
+        :param index: Index of the hunk.
+        :param resolution: TAKE_LEFT, TAKE_RIGHT, TAKE_BOTH, TAKE_BASE or None.
+        :raises ValueError: If the resolution is unknown.
+        """
+        (start, end), lines = self.merge.resolve(index, resolution)
+        self.result_text_edit.replace_lines(start, end, lines)
+        # The lines after the hunk move with it; their status is spliced, not rebuilt
+        self.__status[1][start:end] = bytes(len(lines))
+        self.__mark_hunk(self.merge.hunks[index])
+        for editor in self.__editors():
+            editor.viewport().update()
+        self.__update_conflict_label()
+        self.hunk_resolved.emit(index)
+
+    def resolve_current(self, resolution: Optional[str]) -> Optional[int]:
+        """
+        Resolves the hunk under the cursor of the result editor.
+
+        :return: Index of the hunk resolved, or None if the cursor is outside the hunks.
+        """
+        index: Optional[int] = self.current_hunk()
+        if index is not None:
+            self.resolve(index, resolution)
+        return index
+
+    def current_hunk(self) -> Optional[int]:
+        """
+        Returns the index of the hunk under the cursor of the result editor, or None.
+        """
+        if self.merge is None:
+            return None
+        return self.merge.hunk_at(self.result_text_edit.textCursor().blockNumber())
+
+    def next_conflict(self) -> Optional[int]:
+        """
+        Moves all three editors to the next unresolved conflict after the cursor of the result editor.
+
+        :return: Index of the hunk moved to, or None if there is no next conflict.
+        """
+        line: int = self.result_text_edit.textCursor().blockNumber()
+        return self.__go_to_conflict([index for index in self.__conflicts() if self.merge.hunks[index].result[0] > line])
+
+    def previous_conflict(self) -> Optional[int]:
+        """
+        Moves all three editors to the unresolved conflict before the cursor of the result editor.
+
+        :return: Index of the hunk moved to, or None if there is no previous conflict.
+        """
+        line: int = self.result_text_edit.textCursor().blockNumber()
+        return self.__go_to_conflict(
+            [index for index in reversed(self.__conflicts()) if self.merge.hunks[index].result[0] < line])
+
+    def __conflicts(self) -> list[int]:
+        """
+        Returns the indexes of the unresolved hunks, none before the merge is done.
+        """
+        return self.merge.conflicts() if self.merge is not None else []
+
+    def __go_to_conflict(self, candidates: list[int]) -> Optional[int]:
+        """
+        Moves the editors to the first of some hunks.
+        """
+        if not candidates:
+            return None
+        hunk: MergeHunk = self.merge.hunks[candidates[0]]
+        for editor, (start, _) in zip(self.__editors(), (hunk.left, hunk.result, hunk.right)):
+            editor.go_to_line(start)
+        self.result_text_edit.setFocus()
+        return candidates[0]
+
+    def merged_text(self) -> str:
+        """
+        Returns the merged text, with conflict markers around the unresolved hunks.
+        """
+        return self.result_text_edit.toPlainText()
+
+    def __update_conflict_label(self) -> None:
+        """
+        Shows how many conflicts are left, e.g. "3 of 12 conflicts left".
+        """
+        if self.is_merging():
+            text: str = "Merging..."
+        elif self.merge is None:
+            text = ""
+        else:
+            total: int = sum(hunk.kind == CONFLICT for hunk in self.merge.hunks)
+            text = f"{len(self.merge.conflicts())} of {total} conflicts left" if total else "No conflicts"
+        self.conflict_label.setText(text)
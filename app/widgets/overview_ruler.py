@@ -0,0 +1,136 @@
+from typing import Callable, Optional, Sequence
+
+from PySide6.QtCore import QRectF, QSize
+from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QPixmap, Qt
+from PySide6.QtWidgets import QWidget
+
+from app.core.line_map import LineMap
+from app.core.tracing import PAINT, traced
+
+
+class OverviewRuler(QWidget):
+    """
+    A strip beside a code editor showing where the hunks of the whole
+    document are, scaled to its height. Clicking it jumps to the nearest hunk.
+
+    The markers are drawn from the hunk bounds of the line map into a cached
+    pixmap, which is only redrawn when the line map, the line count or the
+    size changes; scrolling just blits it and outlines the visible lines.
+    """
+
+    # Width of the ruler in pixels
+    WIDTH: int = 12
+
+    def __init__(self, editor: QWidget, color: QColor = QColor("green")) -> None:
+        """
+        :param editor: The code editor the ruler is attached to.
+        :param color: Color of the hunk markers.
+        """
+        super().__init__(editor)
+        self.text_edit: QWidget = editor
+        self.color: QColor = color
+        # Returns the line map of the current diff; None shows no markers
+        self.line_map: Optional[Callable[[], LineMap]] = None
+        # Side of the diff shown by the editor, 0 for left and 1 for right
+        self.side: int = 0
+        self.__pixmap: Optional[QPixmap] = None
+        self.__pixmap_key: Optional[tuple] = None
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+
+    def sizeHint(self) -> QSize:
+        """
+        Provides the recommended size for the ruler.
+        """
+        return QSize(self.WIDTH, 0)
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached markers and repaints the ruler.
+        """
+        self.__pixmap = None
+        self.update()
+
+    def line_at(self, y: float) -> float:
+        """
+        Returns the line position shown at a height of the ruler.
+        """
+        return max(0.0, y) * self.__line_count() / max(1, self.height())
+
+    @traced("OverviewRuler.paintEvent", PAINT)
+    def paintEvent(self, event: QPaintEvent) -> None:
+        """
+        Paints the cached markers and the outline of the visible lines.
+        """
+        painter: QPainter = QPainter(self)
+        painter.drawPixmap(0, 0, self.__markers())
+        first, last = self.text_edit.visible_blocks()
+        scale: float = self.height() / self.__line_count()
+        painter.setPen(QColor(255, 255, 255, 96))
+        painter.setBrush(QColor(255, 255, 255, 32))
+        painter.drawRect(QRectF(0, first * scale, self.width() - 1, max(2.0, (last + 1 - first) * scale)))
+        painter.end()
+
+    def mousePressEvent(self, event: QMouseEvent) -> None:
+        """
+        Jumps to the hunk nearest to the clicked position, or to the clicked
+        line if there are no hunks.
+        """
+        line: float = self.line_at(event.position().y())
+        line_map: Optional[LineMap] = self.line_map() if self.line_map is not None else None
+        index: Optional[int] = line_map.nearest_hunk(self.side, line) if line_map is not None else None
+        if index is not None:
+            line = line_map.bounds(self.side)[0][index]
+        self.text_edit.go_to_line(int(line))
+
+    def __line_count(self) -> int:
+        """
+        Returns the number of lines of the editor, at least 1.
+        """
+        return max(1, self.text_edit.blockCount())
+
+    def __markers(self) -> QPixmap:
+        """
+        Returns the pixmap of the hunk markers, drawing it first if the diff,
+        the line count or the size changed.
+        """
+        line_map: Optional[LineMap] = self.line_map() if self.line_map is not None else None
+        key: tuple = (line_map, self.__line_count(), self.size(), self.devicePixelRatioF())
+        if self.__pixmap is not None and key == self.__pixmap_key:
+            return self.__pixmap
+
+        ratio: float = self.devicePixelRatioF()
+        pixmap: QPixmap = QPixmap(round(self.width() * ratio), round(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor("#2b2b2b"))
+        if line_map is not None and line_map.hunks:
+            painter: QPainter = QPainter(pixmap)
+            scale: float = self.height() / self.__line_count()
+            for top, bottom in _marker_spans(*line_map.bounds(self.side), scale, self.height()):
+                painter.fillRect(2, top, self.width() - 4, bottom - top, self.color)
+            painter.end()
+        self.__pixmap, self.__pixmap_key = pixmap, key
+        return pixmap
+
+
+def _marker_spans(starts: Sequence[int], ends: Sequence[int], scale: float, height: int,
+                  minimum: int = 2) -> list[tuple[int, int]]:
+    """
+    Returns the pixel rows [top, bottom) covered by hunks, with hunks that
+    touch or overlap once scaled merged into one span, so at most one span per
+    row is painted however many hunks there are.
+
+    :param starts: Start lines of the hunks, in order.
+    :param ends: End lines of the hunks, in order.
+    :param scale: Pixels per line.
+    :param height: Height of the ruler; insertion points after the last line stay inside it.
+    :param minimum: Height of the smallest marker, so that one-line and empty hunks stay visible.
+    """
+    spans: list[tuple[int, int]] = []
+    for start, end in zip(starts, ends):
+        top: int = min(int(start * scale), height - minimum)
+        bottom: int = max(top + minimum, int(end * scale + 0.5))
+        if spans and top <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], bottom))
+        else:
+            spans.append((top, bottom))
+    return spans
@@ -0,0 +1,88 @@
+from typing import Optional
+
+from PySide6.QtCore import QTimer, Qt
+from PySide6.QtWidgets import QLabel, QWidget
+
+from app.core.tracing import Tracer, default_tracer
+
+
+class PerformanceOverlay(QLabel):
+    """
+    Recent frame and diff timings, shown over the top right corner of a widget.
+
+    The timings are those of the tracer, which is enabled when the overlay is
+    shown; the text is refreshed a few times per second, not on every frame,
+    so that the overlay barely shows up in what it measures.
+    """
+
+    # Interval between two refreshes of the text
+    REFRESH_MS: int = 500
+
+    # Distance from the corner of the parent widget
+    MARGIN: int = 8
+
+    # Span names shown, with their labels, in this order
+    ROWS: tuple[tuple[str, str], ...] = (
+        ("CodeEditor.paintEvent", "frame"),
+        ("DiffOverlay.paint", "diff paint"),
+        ("line_number_area_paint_event", "gutter"),
+        ("highlightBlock", "highlight"),
+        ("highlight_current_line", "cursor"),
+        ("TextComparison.diff", "diff"),
+        ("DiffWorker.run", "diff thread"),
+        ("apply differences", "apply"),
+    )
+
+    def __init__(self, parent: QWidget, tracer: Optional[Tracer] = None) -> None:
+        """
+        :param parent: The widget the overlay is shown over.
+        :param tracer: Where the timings are read from; the default tracer if omitted.
+        """
+        super().__init__(parent)
+        self.tracer: Optional[Tracer] = tracer
+        self.setObjectName("performance_overlay")
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+        self.__timer: QTimer = QTimer(self)
+        self.__timer.setInterval(self.REFRESH_MS)
+        self.__timer.timeout.connect(self.refresh)
+
+    def current_tracer(self) -> Tracer:
+        """
+        Returns the tracer whose timings are shown.
+        """
+        return self.tracer if self.tracer is not None else default_tracer()
+
+    def setVisible(self, visible: bool) -> None:
+        """
+        Shows or hides the overlay; showing it enables the tracer and starts the refreshes.
+        """
+        super().setVisible(visible)
+        if visible:
+            self.current_tracer().enabled = True
+            self.refresh()
+            self.__timer.start()
+        else:
+            self.__timer.stop()
+
+    def text_lines(self) -> list[str]:
+        """
+        Returns one line per span name seen: last, mean and maximum durations of the recent spans.
+        """
+        summary: dict[str, dict[str, float]] = self.current_tracer().summary()
+        lines: list[str] = []
+        for name, label in self.ROWS:
+            timings: Optional[dict[str, float]] = summary.get(name)
+            if timings is not None:
+                lines.append(f"{label:<12}{timings['last']:8.2f} ms  mean {timings['mean']:7.2f}"
+                             f"  max {timings['max']:7.2f}  ({timings['count']:.0f})")
+        return lines or ["no timings yet"]
+
+    def refresh(self) -> None:
+        """
+        Updates the text and keeps the overlay in the top right corner, above its siblings.
+        """
+        self.setText("\n".join(self.text_lines()))
+        self.adjustSize()
+        self.move(max(0, self.parentWidget().width() - self.width() - self.MARGIN), self.MARGIN)
+        self.raise_()
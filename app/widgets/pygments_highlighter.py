@@ -1,43 +1,205 @@
-from pygments.lexers import PythonLexer
-from pygments.token import Token
-from PySide6.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat, QFont, QTextDocument
+from typing import TYPE_CHECKING, Optional
+
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat, QTextDocument
+
+from app.core.lexer_registry import DEFAULT_LANGUAGE, LexerRegistry, default_registry
+from app.core.stateful_lexer import StatefulLexer
+from app.core.tracing import HIGHLIGHT, default_tracer, traced
+from app.widgets.token_palette import TokenPalette, default_palette, make_format
+
+if TYPE_CHECKING:
+    from pygments.lexer import Lexer
 
 
 class PygmentsHighlighter(QSyntaxHighlighter):
     """
-    A syntax highlighter using Pygments for Python code.
+    A syntax highlighter using Pygments.
+
+    The lexer comes from a LexerRegistry, so highlighters of the same language
+    share one lexer and its token cache.
+
+    The lexer state at the end of each block is stored as the block state, so
+    constructs spanning several lines (such as triple-quoted strings) are
+    highlighted correctly, and Qt stops re-highlighting after an edit as soon
+    as a block ends in the same state as before.
+
+    In lazy mode only the blocks around the visible ones are highlighted right
+    away; the others are highlighted in small batches whenever the event loop
+    is idle. A block that has never been highlighted keeps the state
+    UNHIGHLIGHTED.
     """
 
-    def __init__(self, document: QTextDocument) -> None:
+    # Block state of a block that has not been highlighted yet
+    UNHIGHLIGHTED: int = -1
+
+    # Blocks highlighted above and below the visible ones in lazy mode
+    VISIBLE_MARGIN: int = 50
+
+    # Blocks highlighted per idle step in lazy mode
+    IDLE_BATCH_SIZE: int = 100
+
+    def __init__(self, document: QTextDocument, palette: Optional[TokenPalette] = None,
+                 language: str = DEFAULT_LANGUAGE, registry: Optional[LexerRegistry] = None,
+                 lazy: bool = False) -> None:
         """
         Initializes the syntax highlighter for the given document.
 
         :param document: The document to apply syntax highlighting to.
+        :param palette: Formats of the token types; the shared default palette if omitted.
+        :param language: Language name or Pygments alias of the document.
+        :param registry: Where lexers are looked up; the shared default registry if omitted.
+        :param lazy: Whether to highlight only the visible blocks up front.
         """
         super().__init__(document)
-        self.lexer: PythonLexer = PythonLexer()
+        self.registry: LexerRegistry = registry if registry is not None else default_registry()
+        self.language: str = self.registry.canonical_name(language)
+        self.stateful_lexer: StatefulLexer = self.registry.get_lexer(self.language)
+        self.palette: TokenPalette = palette if palette is not None else default_palette()
+        self.palette.theme_changed.connect(self.rehighlight)
+
+        self.lazy: bool = lazy
+        # Blocks [first, last) that may be highlighted for the first time
+        self.__visible: tuple[int, int] = (0, 0)
+        self.__batch: tuple[int, int] = (0, 0)
+        self.__in_batch: bool = False
+        # Next block checked by the idle pass
+        self.__idle_block: int = 0
+        self.__idle_timer: QTimer = QTimer(self)
+        self.__idle_timer.setInterval(0)
+        self.__idle_timer.timeout.connect(self.__highlight_idle_batch)
+        self.__margin_timer: QTimer = QTimer(self)
+        self.__margin_timer.setSingleShot(True)
+        self.__margin_timer.setInterval(0)
+        self.__margin_timer.timeout.connect(lambda: self.highlight_blocks(*self.__visible))
+        if lazy:
+            # Replaces the full pass scheduled by QSyntaxHighlighter; nothing is visible yet
+            self.rehighlight()
+            document.contentsChange.connect(self.__on_contents_change)
+            self.restart_idle_pass()
+
+    @property
+    def lexer(self) -> 'Lexer':
+        """
+        The Pygments lexer of the current language.
+        """
+        return self.stateful_lexer.lexer
+
+    def set_language(self, language: str) -> None:
+        """
+        Switches to another language and highlights the document again.
+
+        :param language: Language name or Pygments alias.
+        """
+        language = self.registry.canonical_name(language)
+        if language != self.language:
+            self.language = language
+            self.stateful_lexer = self.registry.get_lexer(language)
+            self.rehighlight()
 
+    def set_visible_blocks(self, first: int, last: int) -> None:
+        """
+        Highlights the visible blocks now and a margin around them once the
+        current frame is painted (lazy mode).
+
+        :param first: Number of the first visible block.
+        :param last: Number of the last visible block.
+        """
+        self.__visible = (max(0, first - self.VISIBLE_MARGIN), last + 1 + self.VISIBLE_MARGIN)
+        self.highlight_blocks(first, last + 1)
+        self.__margin_timer.start()
+
+    def highlight_blocks(self, first: int, last: int) -> None:
+        """
+        Highlights the blocks [first, last) that have not been highlighted yet.
+
+        :param first: Number of the first block.
+        :param last: Number of the block after the last one.
+        """
+        # Repaints caused by the new formats may highlight the visible blocks meanwhile
+        outer_batch, outer_in_batch = self.__batch, self.__in_batch
+        self.__batch = (first, last)
+        self.__in_batch = True
+        try:
+            block = self.document().findBlockByNumber(first)
+            while block.isValid() and block.blockNumber() < last:
+                if block.userState() == self.UNHIGHLIGHTED:
+                    # Carries on through the following unhighlighted blocks of the range
+                    self.rehighlightBlock(block)
+                block = block.next()
+        finally:
+            self.__batch, self.__in_batch = outer_batch, outer_in_batch
+
+    def restart_idle_pass(self, block_number: int = 0) -> None:
+        """
+        Makes the idle pass (lazy mode) check the document again from a block on.
+
+        :param block_number: First block to check.
+        """
+        self.__idle_block = min(self.__idle_block, block_number) if self.__idle_timer.isActive() else block_number
+        self.__idle_timer.start()
+
+    def is_idle_pass_running(self) -> bool:
+        """
+        Returns whether off-screen blocks are still being highlighted (lazy mode).
+        """
+        return self.__idle_timer.isActive()
+
+    def __highlight_idle_batch(self) -> None:
+        """
+        Highlights the next batch of blocks of the idle pass.
+        """
+        document: Optional[QTextDocument] = self.document()
+        if document is None or self.__idle_block >= document.blockCount():
+            self.__idle_timer.stop()
+            return
+        first: int = self.__idle_block
+        self.__idle_block = first + self.IDLE_BATCH_SIZE
+        self.highlight_blocks(first, self.__idle_block)
+
+    def __on_contents_change(self, position: int, removed: int, added: int) -> None:
+        """
+        Resumes the idle pass at an edit, whose blocks may have been left unhighlighted.
+        """
+        if self.__in_batch:
+            # Formats being applied by the batch, not an edit
+            return
+        self.restart_idle_pass(self.document().findBlock(position).blockNumber())
+
+    def __is_wanted(self, block_number: int) -> bool:
+        """
+        Returns whether a block may be highlighted for the first time now.
+        """
+        return (self.__visible[0] <= block_number < self.__visible[1]
+                or self.__batch[0] <= block_number < self.__batch[1])
+
+    @traced("highlightBlock", HIGHLIGHT)
     def highlightBlock(self, text: str) -> None:
         """
         Highlights the given text block by applying syntax highlighting rules.
 
+        In lazy mode, a block never highlighted before is left alone unless it
+        is near the visible area or in the batch being highlighted. This also
+        stops the highlighting of the following blocks, as its state does not change.
+
         :param text: The text block to highlight.
         """
-        tokens: list[tuple[Token, str]] = list(self.lexer.get_tokens(text))
+        if (self.lazy and self.currentBlockState() == self.UNHIGHLIGHTED
+                and not self.__is_wanted(self.currentBlock().blockNumber())):
+            return
+
+        spans, state = self.stateful_lexer.tokenize_line(text, self.previousBlockState())
 
-        index: int = 0
+        format_for = self.palette.format_for
+        for index, length, token_type in spans:
+            char_format: Optional[QTextCharFormat] = format_for(token_type)
+            if char_format is not None:
+                self.setFormat(index, length, char_format)
 
-        for token_type, value in tokens:
-            length: int = len(value)
-            if token_type in Token.Keyword:
-                self.setFormat(index, length, self.get_format(QColor("#ff79c6"), bold=True))
-            elif token_type in Token.Name.Function:
-                self.setFormat(index, length, self.get_format(QColor("#61afef")))
-            elif token_type in Token.String:
-                self.setFormat(index, length, self.get_format(QColor("#f1fa8c")))
-            elif token_type in Token.Comment:
-                self.setFormat(index, length, self.get_format(QColor("#6272a4"), italic=True))
-            index += length
+        self.setCurrentBlockState(state)
+        tracer = default_tracer()
+        if tracer.enabled:
+            tracer.count("token spans", len(spans))
 
     def get_format(self, color: QColor, bold: bool = False, italic: bool = False) -> QTextCharFormat:
         """
@@ -48,10 +210,4 @@ class PygmentsHighlighter(QSyntaxHighlighter):
         :param italic: Whether the text should be italic.
         :return: QTextCharFormat object with the desired formatting.
         """
-        char_format: QTextCharFormat = QTextCharFormat()
-        char_format.setForeground(color)
-        if bold:
-            char_format.setFontWeight(QFont.Weight.Bold)
-        if italic:
-            char_format.setFontItalic(True)
-        return char_format
+        return make_format(color, bold=bold, italic=italic)
@@ -0,0 +1,108 @@
+from typing import Optional
+
+from pygments.token import Token, _TokenType
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QColor, QFont, QTextCharFormat
+
+# Token type -> (foreground color, bold, italic)
+Theme = dict[_TokenType, tuple[str, bool, bool]]
+
+DEFAULT_THEME: Theme = {
+    Token.Keyword: ("#ff79c6", True, False),
+    Token.Name.Function: ("#61afef", False, False),
+    Token.String: ("#f1fa8c", False, False),
+    Token.Comment: ("#6272a4", False, True),
+}
+
+_UNRESOLVED: object = object()
+
+
+def make_format(color: QColor, bold: bool = False, italic: bool = False) -> QTextCharFormat:
+    """
+    Returns a text format with the specified color, boldness, and italicization.
+
+    :param color: The color to use for the text.
+    :param bold: Whether the text should be bold.
+    :param italic: Whether the text should be italic.
+    :return: QTextCharFormat object with the desired formatting.
+    """
+    char_format: QTextCharFormat = QTextCharFormat()
+    char_format.setForeground(color)
+    if bold:
+        char_format.setFontWeight(QFont.Weight.Bold)
+    if italic:
+        char_format.setFontItalic(True)
+    return char_format
+
+
+class TokenPalette(QObject):
+    """
+    Prebuilt text formats for Pygments token types.
+
+    Formats are created once per theme entry. A token type without an entry
+    of its own inherits the format of its nearest styled parent; the result
+    is memoized, so looking up a format is a single dict access.
+    """
+
+    # Emitted after the theme has been replaced
+    theme_changed = Signal()
+
+    def __init__(self, theme: Optional[Theme] = None) -> None:
+        """
+        :param theme: Token styles; DEFAULT_THEME if omitted.
+        """
+        super().__init__()
+        self.theme: Theme = {}
+        self.__formats: dict[_TokenType, Optional[QTextCharFormat]] = {}
+        self.reload(theme if theme is not None else DEFAULT_THEME)
+
+    def reload(self, theme: Theme) -> None:
+        """
+        Replaces the theme and notifies the highlighters using this palette.
+
+        :param theme: The new token styles.
+        """
+        self.theme = dict(theme)
+        self.__formats = {
+            token_type: make_format(QColor(color), bold=bold, italic=italic)
+            for token_type, (color, bold, italic) in self.theme.items()
+        }
+        self.theme_changed.emit()
+
+    def format_for(self, token_type: _TokenType) -> Optional[QTextCharFormat]:
+        """
+        Returns the format of a token type, or None if it is not styled.
+
+        :param token_type: The Pygments token type.
+        """
+        char_format = self.__formats.get(token_type, _UNRESOLVED)
+        if char_format is _UNRESOLVED:
+            char_format = self.__resolve(token_type)
+        return char_format
+
+    def __resolve(self, token_type: _TokenType) -> Optional[QTextCharFormat]:
+        """
+        Finds the format of the nearest styled parent and memoizes it.
+        """
+        parent: Optional[_TokenType] = token_type.parent
+        char_format: Optional[QTextCharFormat] = None
+        while parent is not None:
+            if parent in self.theme:
+                char_format = self.__formats[parent]
+                break
+            parent = parent.parent
+        self.__formats[token_type] = char_format
+        return char_format
+
+
+_default_palette: Optional[TokenPalette] = None
+
+
+def default_palette() -> TokenPalette:
+    """
+    Returns the palette shared by every highlighter that does not get its own.
+    """
+    global _default_palette
+    if _default_palette is None:
+        _default_palette = TokenPalette()
+    return _default_palette
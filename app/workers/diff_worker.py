@@ -0,0 +1,153 @@
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Hashable, Optional, Sequence
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from app.app_logger import logger
+from app.core.diff_engines import DiffEngine, Opcode
+from app.core.tracing import DIFF, traced
+
+# Inputs with more lines than this (both sides together) are diffed in a
+# separate process, so the interpreter running the GUI keeps its GIL.
+PROCESS_POOL_THRESHOLD: int = 200_000
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock: threading.Lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool shared by all workers, creating it on first use.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=1)
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Shuts a pool down without waiting, dropping its queued jobs and killing
+    its child process, so that the next job starts in a new pool at once.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    # The executor has no public way to stop a running job before Python 3.14
+    processes: list = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _compute_opcodes(engine: DiffEngine, left_lines: Sequence[Hashable],
+                     right_lines: Sequence[Hashable]) -> list[Opcode]:
+    """
+    Computes the opcodes; module level so that it can run in a child process.
+    """
+    return engine.get_opcodes(left_lines, right_lines)
+
+
+class DiffWorkerSignals(QObject):
+    """
+    Signals emitted by DiffWorker. QRunnable is not a QObject, so they live here.
+    """
+
+    # (generation, list of opcodes)
+    opcodes_ready = Signal(int, object)
+    # generation
+    finished = Signal(int)
+    # (generation, error message)
+    failed = Signal(int, str)
+
+
+class DiffWorker(QRunnable):
+    """
+    Computes a line diff off the GUI thread and streams the opcodes back in chunks.
+
+    Every worker carries the generation number of the request that started it,
+    so receivers can drop results of a computation that has been superseded.
+    """
+
+    def __init__(self, generation: int, engine: DiffEngine, left_lines: Sequence[Hashable],
+                 right_lines: Sequence[Hashable], chunk_size: int = 500) -> None:
+        """
+        :param generation: Identifier of the request, echoed in every signal.
+        :param engine: The diff engine to use.
+        :param left_lines: Lines of the left document, or keys standing for them such as line hashes.
+        :param right_lines: Lines of the right document, or keys standing for them.
+        :param chunk_size: Number of opcodes emitted per signal.
+        """
+        super().__init__()
+        self.signals: DiffWorkerSignals = DiffWorkerSignals()
+        self.generation: int = generation
+        self.engine: DiffEngine = engine
+        self.left_lines: Sequence[Hashable] = left_lines
+        self.right_lines: Sequence[Hashable] = right_lines
+        self.chunk_size: int = chunk_size
+        self.__cancelled: threading.Event = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Requests cancellation. No further signals are emitted once it is noticed.
+        """
+        self.__cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Returns whether cancellation was requested.
+        """
+        return self.__cancelled.is_set()
+
+    @traced("DiffWorker.run", DIFF)
+    def run(self) -> None:
+        """
+        Computes the opcodes and emits them chunk by chunk.
+        """
+        try:
+            opcodes = self.__compute()
+        except Exception as error:
+            logger.error(f"Diff computation failed: {error}")
+            self.signals.failed.emit(self.generation, str(error))
+            return
+
+        if opcodes is None:
+            return
+        for start in range(0, len(opcodes), self.chunk_size):
+            if self.is_cancelled():
+                return
+            self.signals.opcodes_ready.emit(self.generation, opcodes[start:start + self.chunk_size])
+        if not self.is_cancelled():
+            self.signals.finished.emit(self.generation)
+
+    def __compute(self) -> Optional[list[Opcode]]:
+        """
+        Runs the engine in this thread, or in a child process for very large inputs.
+
+        :return: The opcodes, or None if the worker was cancelled meanwhile.
+        """
+        if self.is_cancelled():
+            return None
+        if len(self.left_lines) + len(self.right_lines) < PROCESS_POOL_THRESHOLD:
+            opcodes = self.engine.get_opcodes(self.left_lines, self.right_lines)
+            return None if self.is_cancelled() else opcodes
+
+        # A child that died breaks the pool for good, and a job cannot be
+        # stopped once running, so in both cases the pool is replaced
+        pool: ProcessPoolExecutor = _get_process_pool()
+        try:
+            future: Future = pool.submit(_compute_opcodes, self.engine, self.left_lines, self.right_lines)
+            while not self.__cancelled.wait(0.05):
+                if future.done():
+                    return future.result()
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+            raise
+        if not future.cancel() and not future.done():
+            _discard_process_pool(pool)
+        return None
@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Union
+
+from PySide6.QtCore import QObject, Signal
+
+from app.app_logger import logger
+from app.core.diff_engines import DiffEngine
+from app.core.directory_compare import ERROR, PENDING, FilePair, compare_batch
+
+
+class DirectoryDiffScheduler(QObject):
+    """
+    Compares the pending files of a directory comparison in a pool of
+    processes, one per core, and reports the results batch by batch as they
+    complete.
+
+    Files are sent in batches, so that a tree of many small files does not
+    cost one round trip between processes per file, yet small enough that
+    the first results arrive quickly and the cores stay evenly loaded.
+
+    The files of a batch that fails are reported as ERROR with the message
+    of the exception. A process dying breaks the pool for every batch in it,
+    so the pool is then replaced and each of those batches is retried once.
+    """
+
+    # List of (index, result) pairs of a finished batch
+    batch_compared = Signal(object)
+    # Emitted once every batch has been compared, or failed
+    finished = Signal()
+
+    # Largest number of files per batch
+    MAX_BATCH_SIZE: int = 64
+
+    # Internal: a batch completed in a pool thread, with its generation and
+    # (batch, whether it is a retry, pool it ran in, results, exception or None)
+    _batch_done = Signal(int, object)
+
+    def __init__(self, engine: DiffEngine, max_workers: Optional[int] = None, parent: Optional[QObject] = None) -> None:
+        """
+        :param engine: Diff engine counting the changed lines of each file.
+        :param max_workers: Number of processes; the number of cores if omitted.
+        :param parent: The parent object.
+        """
+        super().__init__(parent)
+        self.engine: DiffEngine = engine
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__generation: int = 0
+        self.__remaining: int = 0
+        # Roots and encoding of the comparison in flight, and the number of processes it uses
+        self.__arguments: tuple[str, str, str] = ("", "", "")
+        self.__pool_size: int = 1
+        # Completion callbacks run in a thread of the pool; the signal queues them to this object's thread
+        self._batch_done.connect(self.__on_batch_done)
+
+    def start(self, left_root: str, right_root: str, pairs: list[FilePair], encoding: str = "utf-8") -> int:
+        """
+        Starts comparing the pending files, cancelling any comparison in flight.
+
+        :param left_root: The left directory.
+        :param right_root: The right directory.
+        :param pairs: Files of both trees; only PENDING ones are compared.
+        :param encoding: Text encoding of the files.
+        :return: The number of batches submitted; ``finished`` is emitted at once if none.
+        """
+        self.cancel()
+        pending: list[tuple[int, str, bool]] = [(index, pair.path, pair.left[0] == pair.right[0])
+                                                for index, pair in enumerate(pairs) if pair.status == PENDING]
+        if not pending:
+            self.finished.emit()
+            return 0
+
+        # About four batches per process, so a slow batch does not leave the other processes idle
+        size: int = max(1, min(self.MAX_BATCH_SIZE, len(pending) // (self.max_workers * 4)))
+        batches: list[list[tuple[int, str, bool]]] = [pending[start:start + size]
+                                                      for start in range(0, len(pending), size)]
+        self.__pool_size = min(self.max_workers, len(batches))
+        self.__executor = ProcessPoolExecutor(max_workers=self.__pool_size)
+        self.__remaining = len(batches)
+        self.__arguments = (left_root, right_root, encoding)
+        for batch in batches:
+            self.__submit(batch, False)
+        return len(batches)
+
+    def __submit(self, batch: list[tuple[int, str, bool]], retry: bool) -> None:
+        """
+        Sends a batch to the pool of the current comparison.
+        """
+        left_root, right_root, encoding = self.__arguments
+        generation: int = self.__generation
+        executor: ProcessPoolExecutor = self.__executor
+        future: Future = executor.submit(compare_batch, left_root, right_root, batch, self.engine, encoding)
+        future.add_done_callback(
+            lambda done: self._batch_done.emit(generation, (batch, retry, executor, _batch_result(done))))
+
+    def is_running(self) -> bool:
+        """
+        Returns whether files are still being compared.
+        """
+        return self.__executor is not None
+
+    def cancel(self) -> None:
+        """
+        Drops the batches not started yet and ignores the results of the others.
+        """
+        self.__generation += 1
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    def __on_batch_done(self, generation: int, done: tuple) -> None:
+        """
+        Forwards the results of a batch, or its files as errors if it failed, and finishes after the last one.
+        """
+        if generation != self.__generation:
+            return
+        batch, retry, executor, results = done
+        if isinstance(results, BrokenProcessPool) and not retry:
+            if executor is self.__executor:
+                executor.shutdown(wait=False)
+                self.__executor = ProcessPoolExecutor(max_workers=self.__pool_size)
+            self.__submit(batch, True)
+            return
+        if isinstance(results, Exception):
+            message: str = str(results) or type(results).__name__
+            results = [(index, (ERROR, 0, 0, message)) for index, _, _ in batch]
+        if results is not None:
+            self.batch_compared.emit(results)
+        self.__remaining -= 1
+        if not self.__remaining:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+            self.finished.emit()
+
+
+def _batch_result(future: Future) -> Union[list, Exception, None]:
+    """
+    Returns the results of a completed batch, the exception it failed with, or None if it was cancelled.
+    """
+    try:
+        return future.result()
+    except CancelledError:
+        return None
+    except Exception as error:
+        logger.error(f"Directory comparison failed: {error}")
+        return error
@@ -0,0 +1,102 @@
+"""
+Measures showing many comparisons at once: a ComparisonDashboard, which only
+builds the panes in view, against one CodeCompareWidget per comparison in a
+scroll area.
+
+Usage: python -m benchmarks.bench_dashboard [--comparisons N] [--lines N] [--height PIXELS]
+"""
+import argparse
+import os
+import time
+
+from PySide6.QtWidgets import QApplication, QScrollArea, QVBoxLayout, QWidget
+
+from app.widgets.code_compare_widget import CodeCompareWidget
+from app.widgets.comparison_dashboard import ComparisonDashboard
+
+
+def make_texts(index: int, lines: int) -> tuple[str, str]:
+    """
+    Returns the two versions of a changed file.
+    """
+    left = "\n".join(f"value_{line} = compute({index}, {line})" for line in range(lines))
+    return left, left.replace(f"compute({index}, {lines // 2})", f"compare({index}, {lines // 2})")
+
+
+def resident_mb() -> float:
+    """
+    Returns the resident memory of the process in MB (Linux).
+    """
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def settle(application: QApplication) -> None:
+    """
+    Runs the event loop until the pending paints and diffs are done.
+    """
+    for _ in range(5):
+        application.processEvents()
+
+
+def run_dashboard(application: QApplication, comparisons: int, lines: int, height: int) -> None:
+    """
+    Prints the time and memory of the dashboard, and of scrolling through it.
+    """
+    memory = resident_mb()
+    start = time.perf_counter()
+    dashboard = ComparisonDashboard()
+    for index in range(comparisons):
+        dashboard.add_comparison(f"file_{index}.py", *make_texts(index, lines))
+    dashboard.resize(1200, height)
+    dashboard.show()
+    settle(application)
+    shown = time.perf_counter() - start
+    print(f"{'ComparisonDashboard':<24}{comparisons:>5} comparisons  shown {shown:7.3f}s"
+          f"  +{resident_mb() - memory:7.1f} MB  {dashboard.pane_count()} panes")
+    start = time.perf_counter()
+    for index in range(comparisons):
+        dashboard.scroll_to(index)
+        application.processEvents()
+    scrolled = time.perf_counter() - start
+    print(f"{'  scrolled through':<24}{comparisons:>5} comparisons        {scrolled:7.3f}s"
+          f"  +{resident_mb() - memory:7.1f} MB  {dashboard.pane_count()} panes")
+    dashboard.close()
+    dashboard.deleteLater()
+    settle(application)
+
+
+def run_widgets(application: QApplication, comparisons: int, lines: int, height: int) -> None:
+    """
+    Prints the time and memory of one CodeCompareWidget per comparison.
+    """
+    memory = resident_mb()
+    start = time.perf_counter()
+    scroll_area = QScrollArea()
+    content = QWidget()
+    layout = QVBoxLayout(content)
+    for index in range(comparisons):
+        widget = CodeCompareWidget(*make_texts(index, lines), lazy_highlighting=True)
+        widget.setFixedHeight(ComparisonDashboard.PANE_HEIGHT)
+        layout.addWidget(widget)
+    scroll_area.setWidget(content)
+    scroll_area.setWidgetResizable(True)
+    scroll_area.resize(1200, height)
+    scroll_area.show()
+    settle(application)
+    shown = time.perf_counter() - start
+    print(f"{'CodeCompareWidget each':<24}{comparisons:>5} comparisons  shown {shown:7.3f}s"
+          f"  +{resident_mb() - memory:7.1f} MB  {comparisons} widgets")
+    scroll_area.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comparisons", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--height", type=int, default=1080)
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication.instance() or QApplication([])
+    run_dashboard(application, arguments.comparisons, arguments.lines, arguments.height)
+    run_widgets(application, arguments.comparisons, arguments.lines, arguments.height)
@@ -0,0 +1,120 @@
+"""
+Compares the diff engines on large and adversarial inputs.
+
+Usage: python -m benchmarks.bench_diff_engines [--lines N] [--repeat N]
+"""
+import argparse
+import random
+import time
+from typing import Callable, Sequence
+
+from app.core.diff_engines import DIFF_ENGINES, DiffEngine, DifflibEngine, get_diff_engine
+from app.core.line_interner import InterningEngine
+
+Case = tuple[list[str], list[str]]
+
+
+def scattered_edits(lines: int, rng: random.Random) -> Case:
+    """Generated code with a few hundred scattered replacements and deletions."""
+    a = [f"    value_{rng.randrange(10 ** 9)} = compute({i})" for i in range(lines)]
+    b = list(a)
+    for _ in range(max(1, lines // 250)):
+        index = rng.randrange(len(b))
+        b[index] = b[index].replace("compute", "recompute")
+    for _ in range(max(1, lines // 1000)):
+        del b[rng.randrange(len(b))]
+    return a, b
+
+
+def moved_block(lines: int, rng: random.Random) -> Case:
+    """A large block moved from the top of the file to the bottom."""
+    a = [f"line {rng.randrange(10 ** 9)}" for _ in range(lines)]
+    cut = lines // 3
+    return a, a[cut:] + a[:cut]
+
+
+def disjoint(lines: int, rng: random.Random) -> Case:
+    """Two files without a single common line."""
+    a = [f"left {rng.randrange(10 ** 9)}" for _ in range(lines)]
+    b = [f"right {rng.randrange(10 ** 9)}" for _ in range(lines)]
+    return a, b
+
+
+def lockfile(lines: int, rng: random.Random) -> Case:
+    """A lockfile: long, mostly repeated lines with a few version bumps and a shared header and footer."""
+    names = [f"package-{index}" for index in range(lines // 4)]
+    a = []
+    for name in names:
+        a += ['[[package]]', f'name = "{name}"', f'version = "1.{rng.randrange(20)}.0"',
+              'source = "registry+https://github.com/rust-lang/crates.io-index"']
+    b = list(a)
+    for _ in range(max(1, lines // 500)):
+        index = rng.randrange(len(names)) * 4 + 2
+        b[index] = b[index].replace('"1.', '"2.')
+    return a, b
+
+
+def repetitive(lines: int, rng: random.Random) -> Case:
+    """Adversarial input: few distinct, very frequent lines in random order."""
+    alphabet = ["{", "}", "", "pass", ")", "]"]
+    a = [rng.choice(alphabet) for _ in range(lines)]
+    b = [rng.choice(alphabet) for _ in range(lines)]
+    return a, b
+
+
+CASES: dict[str, Callable[[int, random.Random], Case]] = {
+    "scattered_edits": scattered_edits,
+    "moved_block": moved_block,
+    "disjoint": disjoint,
+    "lockfile": lockfile,
+    "repetitive": repetitive,
+}
+
+
+def run(lines: int, repeat: int) -> None:
+    """
+    Prints a timing table of every engine on every case.
+    """
+    engines = [get_diff_engine(name) for name in DIFF_ENGINES]
+    engines.append(DifflibEngine(autojunk=False))
+    # The same engines on interned lines with the common prefix and suffix stripped
+    engines += [InterningEngine(get_diff_engine(name)) for name in DIFF_ENGINES]
+    print(f"{'case':<18}{'engine':<20}{'lines':>8}{'best s':>10}{'opcodes':>9}")
+    for case_name, make_case in CASES.items():
+        a, b = make_case(lines, random.Random(case_name))
+        # Two files read separately share no string objects
+        b = [line.encode().decode() for line in b]
+        for engine in engines:
+            label, left, right = engine.name, a, b
+            if isinstance(engine, InterningEngine):
+                label += "+interned"
+            if isinstance(engine, DifflibEngine) and not engine.autojunk:
+                # Without autojunk difflib is quadratic; keep it on a smaller input
+                label = "difflib-nojunk"
+                left, right = make_case(lines // 10, random.Random(case_name))
+            print_timing(case_name, label, engine, left, right, repeat)
+            if isinstance(engine, InterningEngine):
+                # As after loading files, whose lines are interned while they are read
+                left, right = engine.interner.intern_lines(a), engine.interner.intern_lines(b)
+                print_timing(case_name, engine.name + "+ids", engine, left, right, repeat)
+
+
+def print_timing(case_name: str, label: str, engine: DiffEngine, left: Sequence, right: Sequence,
+                 repeat: int) -> None:
+    """
+    Prints the best time of an engine on a case.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        opcodes = engine.get_opcodes(left, right)
+        timings.append(time.perf_counter() - start)
+    print(f"{case_name:<18}{label:<20}{len(left):>8}{min(timings):>10.3f}{len(opcodes):>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+    run(arguments.lines, arguments.repeat)
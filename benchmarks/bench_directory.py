@@ -0,0 +1,65 @@
+"""
+Measures triaging two directory trees: time until every file is listed, and
+until every file that may differ is hashed or diffed.
+
+Usage: python -m benchmarks.bench_directory [--files N] [--lines N] [--workers N] [--diff-engine NAME]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from app.widgets.directory_compare_widget import DirectoryCompareWidget
+
+
+def write_trees(directory: str, files: int, lines: int) -> tuple[str, str]:
+    """
+    Writes two trees of the same files, as two checkouts would: every file of
+    the right tree has another modification time, and one in twenty is edited.
+    """
+    rng = random.Random(files)
+    roots = (os.path.join(directory, "left"), os.path.join(directory, "right"))
+    for index in range(files):
+        relative = os.path.join(f"package_{index // 100}", f"module_{index}.py")
+        text = "".join(f"value_{line} = compute({rng.randrange(10 ** 6)})\n" for line in range(lines))
+        for side, root in enumerate(roots):
+            path = os.path.join(root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(text + ("edited = True\n" if side and index % 20 == 0 else ""))
+            if side:
+                os.utime(path, ns=(0, index))
+    return roots
+
+
+def run(files: int, lines: int, workers: int, diff_engine: str) -> None:
+    """
+    Prints the listing and triage times of the directory comparison.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        left_root, right_root = write_trees(directory, files, lines)
+
+        start = time.perf_counter()
+        widget = DirectoryCompareWidget(left_root, right_root, diff_engine=diff_engine, max_workers=workers)
+        listed = time.perf_counter() - start
+        while widget.is_comparing():
+            QApplication.processEvents()
+        print(f"{files:>7} files x {lines} lines, {widget.scheduler.max_workers} workers"
+              f"  listed {listed:7.3f}s  triaged {time.perf_counter() - start:7.3f}s"
+              f"  ({widget.summary_label.text()})")
+        widget.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--diff-engine", default="myers")
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication([])
+    run(arguments.files, arguments.lines, arguments.workers, arguments.diff_engine)
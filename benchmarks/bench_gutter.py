@@ -0,0 +1,77 @@
+"""
+Measures line number gutter repaints while scrolling quickly through a tall editor.
+
+Usage: python -m benchmarks.bench_gutter [--lines N] [--height PIXELS] [--frames N]
+"""
+import argparse
+import os
+import time
+
+from PySide6.QtGui import QColor, QPainter, QPaintEvent, Qt
+from PySide6.QtWidgets import QApplication
+
+from app.widgets.code_editor import CodeEditor
+
+
+class LegacyGutterEditor(CodeEditor):
+    """
+    The previous gutter: metrics, pen and number text are redone for every block.
+    """
+
+    def line_number_area_paint_event(self, event: QPaintEvent) -> None:
+        painter: QPainter = QPainter(self.line_number_area)
+        painter.fillRect(event.rect(), QColor("#2b2b2b"))
+
+        block = self.firstVisibleBlock()
+        block_number: int = block.blockNumber()
+        top: int = int(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        bottom: int = top + int(self.blockBoundingRect(block).height())
+
+        while block.isValid() and top <= event.rect().bottom():
+            if block.isVisible() and bottom >= event.rect().top():
+                number: str = str(block_number + 1)
+                painter.setPen(QColor("#d3d3d3"))
+                painter.drawText(0, top, self.line_number_area.width(),
+                                 self.fontMetrics().height(), Qt.AlignmentFlag.AlignRight, number)
+            block = block.next()
+            top = bottom
+            bottom = top + int(self.blockBoundingRect(block).height())
+            block_number += 1
+
+
+def run(lines: int, height: int, frames: int) -> None:
+    """
+    Prints the gutter repaint time per frame for both implementations.
+    """
+    text = "\n".join(f"value_{index} = {index}" for index in range(lines))
+    for editor_class in (LegacyGutterEditor, CodeEditor):
+        editor = editor_class()
+        editor.resize(800, height)
+        editor.setPlainText(text)
+        editor.show()
+        QApplication.processEvents()
+        scroll_bar = editor.verticalScrollBar()
+        step = max(1, scroll_bar.maximum() // frames)
+        times = []
+        for frame in range(frames):
+            scroll_bar.setValue(frame * step)
+            # Lays out the newly exposed blocks, as the text area does before the gutter
+            editor.viewport().repaint()
+            start = time.perf_counter()
+            editor.line_number_area.repaint()
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"{editor_class.__name__:<20}{lines:>8} lines  {height}px  gutter median"
+              f" {times[len(times) // 2] * 1000:6.3f}ms  max {times[-1] * 1000:6.3f}ms")
+        editor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--frames", type=int, default=300)
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication([])
+    run(arguments.lines, arguments.height, arguments.frames)
@@ -0,0 +1,62 @@
+"""
+Measures diffing two texts in a batch job: through a CodeCompareWidget, and
+through the Qt-free TextComparison writing a unified diff and JSON hunks.
+
+Usage: python -m benchmarks.bench_headless [--lines N] [--diff-engine NAME]
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+from app.core.text_compare import TextComparison
+
+
+def make_texts(lines: int) -> tuple[str, str]:
+    """
+    Returns two Python sources differing on every hundredth line.
+    """
+    left = "".join(f"value_{index} = compute({index}, 'some text')\n" for index in range(lines))
+    right = "".join(f"value_{index} = compute({index + (index % 100 == 0)}, 'some text')\n" for index in range(lines))
+    return left, right
+
+
+def run(lines: int, diff_engine: str) -> None:
+    """
+    Prints the time of each way of getting the differences.
+    """
+    left, right = make_texts(lines)
+
+    from PySide6.QtWidgets import QApplication
+    from app.widgets.code_compare_widget import CodeCompareWidget
+    application = QApplication.instance() or QApplication([])
+    start = time.perf_counter()
+    widget = CodeCompareWidget(left, right, diff_engine=diff_engine, incremental=False)
+    while widget.is_diff_running():
+        application.processEvents()
+    hunks = len(widget.line_map().hunks)
+    print(f"{'CodeCompareWidget':<30}{lines:>8} lines{hunks:>6} hunks {time.perf_counter() - start:8.3f}s")
+    widget.close()
+
+    start = time.perf_counter()
+    comparison = TextComparison(diff_engine)
+    left_lines, right_lines, opcodes = comparison.compare(left, right)
+    output = io.StringIO()
+    output.writelines(comparison.unified_diff(left_lines, right_lines, opcodes))
+    print(f"{'TextComparison unified':<30}{lines:>8} lines{hunks:>6} hunks {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    left_lines, right_lines, opcodes = comparison.compare(left, right)
+    for hunk in comparison.hunks(left_lines, right_lines, opcodes):
+        output.write(json.dumps(hunk) + "\n")
+    print(f"{'TextComparison json':<30}{lines:>8} lines{hunks:>6} hunks {time.perf_counter() - start:8.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--diff-engine", default="myers")
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    run(arguments.lines, arguments.diff_engine)
@@ -0,0 +1,137 @@
+"""
+Measures PygmentsHighlighter on a full document highlight and on single-line edits,
+and the time to open a document with lazy highlighting.
+
+Usage: python -m benchmarks.bench_highlighter [--lines N] [--repeat N]
+"""
+import argparse
+import os
+import time
+from typing import Callable
+
+from pygments.token import Token
+from PySide6.QtGui import QColor, QTextCursor
+from PySide6.QtWidgets import QApplication, QPlainTextEdit
+
+from app.widgets.code_editor import CodeEditor
+from app.widgets.pygments_highlighter import PygmentsHighlighter
+
+SAMPLE: str = '''class Widget{index}(Base):
+    """Docstring of widget {index}."""
+
+    def render(self, value: int) -> str:
+        # Render the value
+        return f"<div>{{value}}</div>" + str(value * {index})
+'''
+
+
+class StatelessHighlighter(PygmentsHighlighter):
+    """
+    The previous implementation: every block is lexed on its own, with no cache.
+    """
+
+    def highlightBlock(self, text: str) -> None:
+        index = 0
+        for token_type, value in self.lexer.get_tokens(text):
+            length = len(value)
+            if token_type in Token.Keyword:
+                self.setFormat(index, length, self.get_format(QColor("#ff79c6"), bold=True))
+            elif token_type in Token.Name.Function:
+                self.setFormat(index, length, self.get_format(QColor("#61afef")))
+            elif token_type in Token.String:
+                self.setFormat(index, length, self.get_format(QColor("#f1fa8c")))
+            elif token_type in Token.Comment:
+                self.setFormat(index, length, self.get_format(QColor("#6272a4"), italic=True))
+            index += length
+
+
+def make_source(lines: int) -> str:
+    """Builds a Python file of roughly the given number of lines."""
+    chunks = []
+    total = 0
+    index = 0
+    while total < lines:
+        chunk = SAMPLE.format(index=index)
+        chunks.append(chunk)
+        total += chunk.count('\n')
+        index += 1
+    return ''.join(chunks)
+
+
+def timed(action: Callable[[], None], repeat: int) -> float:
+    """Returns the best wall time of an action."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(lines: int, repeat: int) -> None:
+    """
+    Prints the timings of both highlighters.
+    """
+    source = make_source(lines)
+    for highlighter_class in (StatelessHighlighter, PygmentsHighlighter):
+        # Highlighting follows edits only for documents with a plain text layout
+        editor = QPlainTextEdit()
+        document = editor.document()
+        highlighter = highlighter_class(document)
+        # Let the highlighter run its initial (empty) pass so edits are highlighted
+        QApplication.processEvents()
+
+        full = timed(lambda: editor.setPlainText(source), 1)
+        rehighlight = timed(highlighter.rehighlight, repeat)
+        middle = document.findBlockByNumber(document.blockCount() // 2)
+
+        def edit_line() -> None:
+            cursor = QTextCursor(middle)
+            cursor.insertText("x")
+            cursor.deletePreviousChar()
+
+        def open_string() -> None:
+            cursor = QTextCursor(middle)
+            cursor.insertText('"""')
+            cursor.deletePreviousChar()
+            cursor.deletePreviousChar()
+            cursor.deletePreviousChar()
+
+        edit = timed(edit_line, repeat)
+        propagate = timed(open_string, 1)
+        print(f"{highlighter_class.__name__:<22}{document.blockCount():>8} lines  full {full:7.3f}s"
+              f"  rehighlight {rehighlight:7.3f}s  line edit {edit * 1000:7.2f}ms  open string {propagate:7.3f}s")
+
+
+def run_lazy(lines: int) -> None:
+    """
+    Prints the time to open a document in an editor with a lazy highlighter
+    until its first screen is highlighted, and the duration of the idle pass.
+    """
+    source = make_source(lines)
+    editor = CodeEditor()
+    editor.resize(800, 600)
+    editor.show()
+    highlighter = PygmentsHighlighter(editor.document(), lazy=True)
+    editor.attach_highlighter(highlighter)
+    QApplication.processEvents()
+
+    start = time.perf_counter()
+    editor.setPlainText(source)
+    QApplication.processEvents()
+    opened = time.perf_counter() - start
+    while highlighter.is_idle_pass_running():
+        QApplication.processEvents()
+    idle = time.perf_counter() - start - opened
+    print(f"{'lazy':<22}{editor.blockCount():>8} lines  open {opened:7.3f}s  idle pass {idle:7.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication([])
+    run(arguments.lines, arguments.repeat)
+    run_lazy(arguments.lines)
@@ -0,0 +1,86 @@
+"""
+Measures opening two large files: time until the top of the file is shown, and
+until the differences are highlighted, for in-memory strings and chunked loading,
+and for reopening them with the diff in the cache.
+
+Usage: python -m benchmarks.bench_load [--lines N] [--chunk-size BYTES] [--diff-engine NAME]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from app.core.diff_cache import DiffCache
+from app.core.file_loader import CHUNK_SIZE
+from app.widgets.code_compare_widget import CodeCompareWidget
+
+
+def write_files(directory: str, lines: int) -> tuple[str, str]:
+    """
+    Writes two Python files differing on every hundredth line.
+    """
+    paths = (os.path.join(directory, "left.py"), os.path.join(directory, "right.py"))
+    for side, path in enumerate(paths):
+        with open(path, "w") as file:
+            for index in range(lines):
+                value = index + 1 if side and index % 100 == 0 else index
+                file.write(f"value_{index} = compute({value}, 'some text')\n")
+    return paths
+
+
+def wait_for_diff(widget: CodeCompareWidget) -> float:
+    """
+    Runs the event loop until both files are loaded and diffed.
+
+    :return: The time spent diffing once both files were loaded.
+    """
+    while widget.is_loading():
+        QApplication.processEvents()
+    start = time.perf_counter()
+    while widget.is_diff_running():
+        QApplication.processEvents()
+    return time.perf_counter() - start
+
+
+def run(lines: int, chunk_size: int, diff_engine: str) -> None:
+    """
+    Prints the open times of both ways of loading the same files.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        left_path, right_path = write_files(directory, lines)
+
+        # Nothing is cached, except for the last row
+        no_cache = DiffCache(max_bytes=0)
+        start = time.perf_counter()
+        with open(left_path) as left, open(right_path) as right:
+            widget = CodeCompareWidget(left.read(), right.read(), diff_engine=diff_engine, diff_cache=no_cache)
+        shown = time.perf_counter() - start
+        wait_for_diff(widget)
+        print(f"{'read + setPlainText':<22}{lines:>8} lines  first text {shown:7.3f}s"
+              f"  diffed {time.perf_counter() - start:7.3f}s")
+        widget.close()
+
+        cache = DiffCache()
+        for label, diff_cache in (("from_files", no_cache), (None, cache), ("from_files, cached", cache)):
+            start = time.perf_counter()
+            widget = CodeCompareWidget.from_files(left_path, right_path, chunk_size=chunk_size,
+                                                  diff_engine=diff_engine, diff_cache=diff_cache)
+            shown = time.perf_counter() - start
+            diffing = wait_for_diff(widget)
+            if label is not None:
+                print(f"{label:<22}{lines:>8} lines  first text {shown:7.3f}s"
+                      f"  diffed {time.perf_counter() - start:7.3f}s  (diff after loading {diffing:6.3f}s)")
+            widget.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--diff-engine", default="myers")
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication([])
+    run(arguments.lines, arguments.chunk_size, arguments.diff_engine)
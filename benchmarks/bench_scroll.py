@@ -0,0 +1,68 @@
+"""
+Measures the frame time of synchronized scrolling through a large comparison.
+
+Usage: python -m benchmarks.bench_scroll [--lines N] [--edits N] [--frames N] [--step N]
+"""
+import argparse
+import os
+import random
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from app.widgets.code_compare_widget import CodeCompareWidget
+
+
+def make_documents(lines: int, edits: int) -> tuple[str, str]:
+    """Builds two documents differing by random replacements, insertions and deletions."""
+    rng = random.Random(0)
+    left = [f"line_{index} = compute({index})" for index in range(lines)]
+    right = list(left)
+    for edit in range(edits):
+        index = rng.randrange(len(right))
+        kind = rng.random()
+        if kind < 0.4:
+            right[index] = right[index].replace("compute", "evaluate")
+        elif kind < 0.7:
+            right.insert(index, f"inserted_{edit} = None")
+        else:
+            del right[index]
+    return "\n".join(left), "\n".join(right)
+
+
+def run(lines: int, edits: int, frames: int, step: int) -> None:
+    """
+    Scrolls the left editor down and prints the frame times, each frame being
+    the scroll, the synchronization, the highlighting of newly shown lines and
+    a full repaint. Idle-time work is left out.
+    """
+    widget = CodeCompareWidget(*make_documents(lines, edits), diff_engine="myers")
+    widget.resize(1200, 800)
+    widget.show()
+    while widget.is_diff_running():
+        QApplication.processEvents()
+    QApplication.processEvents()
+
+    scroll_bar = widget.left_text_edit.verticalScrollBar()
+    origin = scroll_bar.maximum() // 2
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        scroll_bar.setValue(origin + frame * step)
+        widget.repaint()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"{lines:>8} lines  {len(widget.line_map().hunks):>6} hunks  frame median {times[len(times) // 2] * 1000:6.2f}ms"
+          f"  p95 {times[int(len(times) * 0.95)] * 1000:6.2f}ms  max {times[-1] * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=2_000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--step", type=int, default=5, help="lines scrolled per frame")
+    arguments = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication([])
+    run(arguments.lines, arguments.edits, arguments.frames, arguments.step)
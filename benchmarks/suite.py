@@ -0,0 +1,237 @@
+"""
+Runs the hot paths on synthetic inputs of increasing size and change density,
+records the timings as JSON, and compares them with a stored baseline.
+
+Usage: python -m benchmarks.suite [--sizes N ...] [--densities D ...] [--cases NAME ...] [--repeat N]
+                                  [--output FILE] [--baseline FILE] [--tolerance RATIO]
+
+The exit status is 1 if a case got slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Optional
+
+import PySide6
+from PySide6.QtWidgets import QApplication
+
+from app.core.diff_cache import DiffCache
+from app.widgets.code_compare_widget import CodeCompareWidget
+from app.widgets.code_editor import CodeEditor
+from app.widgets.pygments_highlighter import PygmentsHighlighter
+
+# Prepares a case on an input and returns the action to time
+Case = Callable[[list[str], list[str]], Callable[[], None]]
+
+
+def make_lines(lines: int, density: float, seed: int = 0) -> tuple[list[str], list[str]]:
+    """
+    Returns two Python sources of about ``lines`` lines, the right one with
+    a fraction ``density`` of its lines replaced, inserted or deleted.
+    """
+    rng = random.Random(seed)
+    left = []
+    for index in range(lines):
+        kind = index % 6
+        if kind == 0:
+            left.append(f"class Widget{index}(Base):")
+        elif kind == 1:
+            left.append(f'    """Docstring of widget {index}."""')
+        elif kind == 2:
+            left.append(f"    def render(self, value: int) -> str:  # render {index}")
+        else:
+            left.append(f"        return f'<div>{{value}}</div>' + str(value * {index})")
+    right = []
+    for line in left:
+        if rng.random() >= density:
+            right.append(line)
+            continue
+        change = rng.randrange(3)
+        if change == 0:
+            right.append(line.replace("value", "item"))
+        elif change == 1:
+            right += [line, "        pass  # inserted"]
+    return left, right
+
+
+def no_cache() -> DiffCache:
+    """
+    Returns a cache that stores nothing, so every run computes its diff.
+    """
+    return DiffCache(max_bytes=0)
+
+
+def highlight_differences(left: list[str], right: list[str]) -> Callable[[], None]:
+    """
+    CodeCompareWidget.highlight_differences: diff, incremental diff state and overlay status.
+    """
+    widget = CodeCompareWidget("\n".join(left), "\n".join(right), diff_engine="myers", diff_cache=no_cache())
+    while widget.is_diff_running():
+        QApplication.processEvents()
+    return widget.highlight_differences
+
+
+def highlight_block(left: list[str], right: list[str]) -> Callable[[], None]:
+    """
+    PygmentsHighlighter.highlightBlock on every block of the left document, as rehighlight() runs it.
+    """
+    editor = CodeEditor()
+    editor.setPlainText("\n".join(left))
+    highlighter = PygmentsHighlighter(editor.document())
+    QApplication.processEvents()
+
+    def rehighlight() -> None:
+        # Drops the token cache, so every block is lexed again
+        highlighter.stateful_lexer.clear_cache()
+        highlighter.rehighlight()
+    # The editor owns the document, and must live as long as the action
+    rehighlight.editor = editor
+    return rehighlight
+
+
+def gutter_paint(left: list[str], right: list[str]) -> Callable[[], None]:
+    """
+    CodeEditor.line_number_area_paint_event at 50 scroll positions through a 1080px editor.
+    """
+    editor = CodeEditor()
+    editor.resize(800, 1080)
+    editor.setPlainText("\n".join(left))
+    editor.show()
+    QApplication.processEvents()
+    scroll_bar = editor.verticalScrollBar()
+    positions = [scroll_bar.maximum() * frame // 49 for frame in range(50)]
+    for position in positions:
+        # Lays out every block shown, so that only the gutter is timed
+        scroll_bar.setValue(position)
+        editor.viewport().repaint()
+
+    def paint() -> None:
+        for position in positions:
+            scroll_bar.setValue(position)
+            editor.line_number_area.repaint()
+    return paint
+
+
+def construction(left: list[str], right: list[str]) -> Callable[[], None]:
+    """
+    CodeCompareWidget construction until the differences are highlighted.
+    """
+    left_text, right_text = "\n".join(left), "\n".join(right)
+
+    def construct() -> None:
+        widget = CodeCompareWidget(left_text, right_text, diff_engine="myers", diff_cache=no_cache())
+        while widget.is_diff_running():
+            QApplication.processEvents()
+        widget.close()
+        widget.deleteLater()
+    return construct
+
+
+CASES: dict[str, Case] = {
+    "highlight_differences": highlight_differences,
+    "highlight_block": highlight_block,
+    "gutter_paint": gutter_paint,
+    "construction": construction,
+}
+
+# Cases whose cost does not depend on the changes, run at the first density only
+DENSITY_FREE: frozenset[str] = frozenset({"highlight_block", "gutter_paint"})
+
+
+def run(cases: list[str], sizes: list[int], densities: list[float], repeat: int) -> dict:
+    """
+    Times every case on every input and returns the results as JSON-ready data.
+    """
+    results = []
+    for name in cases:
+        for lines in sizes:
+            for density in densities[:1] if name in DENSITY_FREE else densities:
+                action = CASES[name](*make_lines(lines, density))
+                runs = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    action()
+                    runs.append(time.perf_counter() - start)
+                QApplication.processEvents()
+                result = {"case": name, "lines": lines, "density": density, "seconds": min(runs), "runs": runs}
+                results.append(result)
+                print(f"{name:<24}{lines:>9} lines  density {density:<6}  best {min(runs):9.4f}s", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pyside": PySide6.__version__,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM", ""),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Prints how every case compares with the baseline.
+
+    :param current: Results of this run.
+    :param baseline: Stored results, in the same format.
+    :param tolerance: Slowdown ratio above which a case is a regression, e.g. 0.25 for 25%.
+    :return: The descriptions of the regressions.
+    """
+    stored = {(result["case"], result["lines"], result["density"]): result["seconds"]
+              for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = (result["case"], result["lines"], result["density"])
+        before: Optional[float] = stored.get(key)
+        if before is None:
+            continue
+        ratio = result["seconds"] / before if before else float("inf")
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        description = f"{key[0]:<24}{key[1]:>9} lines  density {key[2]:<6}  {before:9.4f}s -> " \
+                      f"{result['seconds']:9.4f}s  x{ratio:5.2f}  {flag}"
+        print(description.rstrip())
+        if flag:
+            regressions.append(description.rstrip())
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Runs the suite from the command line.
+
+    :return: The exit status.
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="numbers of lines; up to 1000000")
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.001, 0.01, 0.1],
+                        help="fractions of changed lines")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file the results are written to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown ratio reported as a regression")
+    arguments = parser.parse_args(argv)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    application = QApplication.instance() or QApplication([])
+    current = run(arguments.cases, arguments.sizes, arguments.densities, arguments.repeat)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(current, file, indent=2)
+    if not arguments.baseline:
+        return 0
+    with open(arguments.baseline) as file:
+        baseline = json.load(file)
+    print(f"\nCompared with {arguments.baseline} ({baseline['meta'].get('time', '?')}):")
+    regressions = compare(current, baseline, arguments.tolerance)
+    application.processEvents()
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import logging
+
+from app.app_logger import LazyFileHandler
+
+
+def make_logger(handler):
+    """Returns a logger writing only to a handler."""
+    logger = logging.getLogger(f"test_app_logger.{id(handler)}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_log_file_opened_on_first_record(tmp_path):
+    """Test if the log file is only created when the first record is written."""
+    path = tmp_path / "app.log"
+    handler = LazyFileHandler(str(path))
+    logger = make_logger(handler)
+    assert not path.exists()
+    logger.error("first record")
+    handler.close()
+    assert "first record" in path.read_text()
+
+
+def test_unwritable_log_file(tmp_path, monkeypatch):
+    """Test if a log file that cannot be created is reported to handleError instead of raising to the caller."""
+    handler = LazyFileHandler(str(tmp_path / "missing" / "app.log"))
+    failures = []
+    monkeypatch.setattr(handler, "handleError", failures.append)
+    logger = make_logger(handler)
+    logger.error("first record")
+    logger.error("second record")
+    assert [record.getMessage() for record in failures] == ["first record", "second record"]
@@ -1,7 +1,16 @@
+import io
+import os
+import sys
+import threading
+
 import pytest
+from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QTextDocument, QColor, QTextCursor
 
+from app.core.diff_cache import DiffCache
+from app.core.diff_engines import DiffEngine
+from app.core.text_compare import TextComparison
 from app.widgets.code_compare_widget import CodeCompareWidget
 
 
@@ -63,35 +72,23 @@ def test_highlight_differences(code_compare_widget):
     assert left_document.toPlainText() != ""
     assert right_document.toPlainText() != ""
 
-    # Improved way to check for highlighted text
+    # Differences are painted by the overlay of each editor
     left_highlighted = False
     right_highlighted = False
 
     # Iterate through all text blocks in the left editor
     block = left_document.firstBlock()
     while block.isValid():
-        cursor = QTextCursor(block)
-        while not cursor.atBlockEnd():
-            if cursor.charFormat().background().color() == QColor("green"):
-                left_highlighted = True
-                break
-            cursor.movePosition(QTextCursor.NextCharacter)
-
-        if left_highlighted:
+        if code_compare_widget.left_text_edit.diff_overlay.is_changed(block.blockNumber()):
+            left_highlighted = True
             break
         block = block.next()
 
     # Iterate through all text blocks in the right editor
     block = right_document.firstBlock()
     while block.isValid():
-        cursor = QTextCursor(block)
-        while not cursor.atBlockEnd():
-            if cursor.charFormat().background().color() == QColor("green"):
-                right_highlighted = True
-                break
-            cursor.movePosition(QTextCursor.NextCharacter)
-
-        if right_highlighted:
+        if code_compare_widget.right_text_edit.diff_overlay.is_changed(block.blockNumber()):
+            right_highlighted = True
             break
         block = block.next()
 
@@ -99,6 +96,18 @@ def test_highlight_differences(code_compare_widget):
     assert right_highlighted, "Expected highlighted differences in the right editor."
 
 
+def test_highlight_differences_leaves_document_untouched(code_compare_widget):
+    """Test if highlighting neither changes character formats nor fills the undo stack."""
+    code_compare_widget.highlight_differences()
+
+    for text_edit in (code_compare_widget.left_text_edit, code_compare_widget.right_text_edit):
+        document: QTextDocument = text_edit.document()
+        assert not document.isUndoAvailable()
+        cursor = QTextCursor(document.firstBlock())
+        cursor.movePosition(QTextCursor.NextCharacter)
+        assert cursor.charFormat().background().color() != QColor("green")
+
+
 def test_dark_theme_applied(code_compare_widget):
     """Test if the dark theme is applied properly."""
     # Update the expected stylesheet to match the actual one
@@ -154,5 +163,363 @@ QPushButton {
 QPushButton:hover {
     background-color: #3c3c3c;
 }
+
+QLabel, QTreeView, QHeaderView::section {
+    color: #c5c8c6;
+}
+
+QTreeView {
+    background-color: #1e1e1e;
+    selection-background-color: #4e5b70;
+}
+
+QHeaderView::section {
+    background-color: #2b2b2b;
+    border: 1px solid #4e4e4e;
+    padding: 2px 6px;
+}
+
+QLabel#performance_overlay {
+    background-color: rgba(43, 43, 43, 220);
+    border: 1px solid #4e4e4e;
+    font-family: 'Fira Code', Consolas, 'Courier New', monospace;
+    padding: 4px 8px;
+}
 """
     assert code_compare_widget.styleSheet() == expected_stylesheet, "Dark theme stylesheet is not applied correctly."
+
+
+@pytest.mark.parametrize("engine", ["difflib", "myers", "histogram"])
+def test_diff_engine_selection(qtbot, app, engine):
+    """Test if the diff engine can be chosen per widget."""
+    widget = CodeCompareWidget("a\nb\nc", "a\nx\nc", diff_engine=engine)
+    qtbot.addWidget(widget)
+    assert widget.diff_engine.name == engine
+
+
+def test_semantic_diff(qtbot, app):
+    """Test if Python sources are diffed definition by definition in semantic mode, on both diff paths."""
+    left = ["def f():", "    x = 1", "    y = 2", "def g():", "    pass"]
+    right = ["def f():", "    pass", "def g():", "    x = 1", "    y = 2"]
+    size = CodeCompareWidget.ASYNC_DIFF_THRESHOLD // 2
+    for count in (1, size):
+        widget = CodeCompareWidget("\n".join(left * count), "\n".join(right * count), diff_engine="myers",
+                                   language="python", semantic=True, diff_cache=DiffCache(max_bytes=0))
+        qtbot.addWidget(widget)
+        qtbot.waitUntil(lambda: not widget.is_diff_running(), timeout=10000)
+        assert widget.comparison.semantic
+        assert list(widget.line_map().hunks)[:2] == [('replace', 1, 3, 1, 2), ('replace', 4, 5, 3, 5)]
+    widget.set_texts("a: 1", "a: 2", language="yaml")
+    assert not widget.comparison.semantic
+
+
+def test_highlight_differences_async(qtbot, app):
+    """Test if large comparisons are diffed in the background and highlighted progressively."""
+    user_code = "\n".join(f"line {i}" for i in range(CodeCompareWidget.ASYNC_DIFF_THRESHOLD))
+    ai_code = user_code.replace("line 42\n", "changed 42\n")
+    widget = CodeCompareWidget(user_code, ai_code)
+    qtbot.addWidget(widget)
+    assert widget.is_diff_running()
+
+    qtbot.waitUntil(lambda: not widget.is_diff_running(), timeout=10000)
+    assert not widget.right_text_edit.diff_overlay.is_changed(41)
+    assert widget.right_text_edit.diff_overlay.is_changed(42)
+
+
+class FailingEngine(DiffEngine):
+    """Engine that always raises, recording whether it ran on the GUI thread."""
+
+    def __init__(self):
+        self.on_gui_thread = False
+
+    def get_opcodes(self, a, b):
+        self.on_gui_thread |= threading.current_thread() is threading.main_thread()
+        raise RuntimeError("engine failure")
+
+
+@pytest.mark.parametrize("line_engine_fails", [False, True])
+def test_failed_async_diff(qtbot, app, monkeypatch, line_engine_fails):
+    """Test if a failed background diff is retried with the line engine off the GUI thread,
+    and if that fails too, every line is marked and the label tells so."""
+    failing = FailingEngine()
+    monkeypatch.setattr(TextComparison, "engine_for", lambda comparison, left, right: failing)
+    user_code = "\n".join(f"line {i}" for i in range(CodeCompareWidget.ASYNC_DIFF_THRESHOLD))
+    ai_code = user_code.replace("line 42\n", "changed 42\n")
+    widget = CodeCompareWidget(user_code, ai_code, diff_engine=failing if line_engine_fails else "difflib",
+                               diff_cache=DiffCache(max_bytes=0))
+    qtbot.addWidget(widget)
+
+    qtbot.waitUntil(lambda: not widget.is_diff_running(), timeout=10000)
+    assert not failing.on_gui_thread
+    assert widget.right_text_edit.diff_overlay.is_changed(42)
+    assert widget.right_text_edit.diff_overlay.is_changed(41) == line_engine_fails
+    assert len(widget.line_map().hunks) == 1
+    assert widget.hunk_label.text() == ("Comparison failed" if line_engine_fails else "- of 1")
+
+
+def test_edit_restarts_running_diff(qtbot, app):
+    """Test if editing while a diff is in flight restarts the computation."""
+    user_code = "\n".join(f"line {i}" for i in range(CodeCompareWidget.ASYNC_DIFF_THRESHOLD))
+    widget = CodeCompareWidget(user_code, user_code)
+    qtbot.addWidget(widget)
+    with qtbot.waitSignal(widget.differences_highlighted, timeout=10000):
+        widget.right_text_edit.appendPlainText("added")
+    assert not widget.is_diff_running()
+
+
+def is_line_highlighted(text_edit, line):
+    """Returns whether the overlay of an editor marks a line as changed."""
+    return text_edit.diff_overlay.is_changed(line)
+
+
+def test_incremental_rediff_on_edit(qtbot, app):
+    """Test if editing a document re-diffs the edited lines after the debounce delay."""
+    code = "\n".join(f"line {i}" for i in range(50))
+    widget = CodeCompareWidget(code, code)
+    qtbot.addWidget(widget)
+
+    cursor = QTextCursor(widget.right_text_edit.document().findBlockByNumber(20))
+    cursor.insertText("edited ")
+    qtbot.waitUntil(lambda: is_line_highlighted(widget.left_text_edit, 20), timeout=2000)
+    assert is_line_highlighted(widget.right_text_edit, 20)
+    assert not is_line_highlighted(widget.right_text_edit, 19)
+
+    cursor.movePosition(QTextCursor.StartOfBlock)
+    cursor.movePosition(QTextCursor.NextWord, QTextCursor.KeepAnchor)
+    cursor.removeSelectedText()
+    qtbot.waitUntil(lambda: not is_line_highlighted(widget.left_text_edit, 20), timeout=2000)
+    assert not is_line_highlighted(widget.right_text_edit, 20)
+
+
+def test_language_from_filename(app, qtbot):
+    """Test if both panes are highlighted with the lexer picked from the file name."""
+    widget = CodeCompareWidget("key: value", "key: other", filename="config.yaml")
+    qtbot.addWidget(widget)
+    assert widget.language == "yaml"
+    assert widget.highlighter_old.stateful_lexer is widget.highlighter_new.stateful_lexer
+    assert widget.highlighter_old.lexer.name == "YAML"
+
+
+def test_lazy_highlighting_threshold(app, qtbot):
+    """Test if large comparisons get lazy highlighters attached to the editors."""
+    small = CodeCompareWidget("a = 1", "a = 2")
+    qtbot.addWidget(small)
+    assert not small.highlighter_old.lazy
+    code = "\n".join(f"line_{i} = {i}" for i in range(CodeCompareWidget.LAZY_HIGHLIGHT_THRESHOLD))
+    large = CodeCompareWidget(code, code)
+    qtbot.addWidget(large)
+    assert large.highlighter_old.lazy and large.highlighter_new.lazy
+    assert large.left_text_edit.highlighter is large.highlighter_old
+    assert large.right_text_edit.blockCount() == CodeCompareWidget.LAZY_HIGHLIGHT_THRESHOLD
+
+
+def test_intraline_highlights(app, qtbot):
+    """Test if replaced lines get the changed words painted over the line highlight."""
+    widget = CodeCompareWidget("a = 1\nname = compute(x)\nb = 2", "a = 1\nname = compare(x)\nb = 2")
+    qtbot.addWidget(widget)
+    overlay = widget.right_text_edit.diff_overlay
+    assert overlay.inline_ranges(1) == [(7, 14)]
+    assert overlay.inline_ranges(0) is None
+
+    widget.right_text_edit.show()
+    qtbot.waitExposed(widget.right_text_edit)
+    block = widget.right_text_edit.document().findBlockByNumber(1)
+    cursor = QTextCursor(block)
+    cursor.setPosition(block.position() + 10)
+    rect = widget.right_text_edit.cursorRect(cursor)
+    image = widget.right_text_edit.viewport().grab().toImage()
+    # Sample around the glyphs of the changed word
+    colors = {image.pixelColor(rect.x() + 2, y).name() for y in range(rect.top(), rect.bottom())}
+    assert overlay.inline_color.name() in colors
+    assert image.pixelColor(widget.right_text_edit.viewport().width() - 2, rect.center().y()) == overlay.color
+
+
+def test_intraline_disabled(app, qtbot):
+    """Test if intra-line highlighting can be turned off."""
+    widget = CodeCompareWidget("x = 1", "x = 2", intraline=None)
+    qtbot.addWidget(widget)
+    assert widget.intraline is None
+    assert widget.left_text_edit.diff_overlay.inline_ranges is None
+
+
+def test_synchronized_scrolling(app, qtbot):
+    """Test if scrolling one editor brings the matching lines into view in the other."""
+    left = [f"line {i}" for i in range(300)]
+    right = left[:10] + [f"inserted {i}" for i in range(50)] + left[10:]
+    widget = CodeCompareWidget("\n".join(left), "\n".join(right))
+    qtbot.addWidget(widget)
+    widget.resize(800, 600)
+    widget.show()
+    qtbot.waitExposed(widget)
+
+    widget.left_text_edit.verticalScrollBar().setValue(100)
+    assert widget.right_text_edit.verticalScrollBar().value() == 150
+    widget.right_text_edit.verticalScrollBar().setValue(30)
+    assert widget.left_text_edit.verticalScrollBar().value() == 10
+
+
+def test_line_map_follows_edits(app, qtbot):
+    """Test if the line map is rebuilt when the differences change, and only then."""
+    widget = CodeCompareWidget("a\nb\nc", "a\nb\nc")
+    qtbot.addWidget(widget)
+    line_map = widget.line_map()
+    assert line_map.hunks == []
+    assert widget.line_map() is line_map
+
+    QTextCursor(widget.right_text_edit.document().findBlockByNumber(1)).insertText("new line\n")
+    qtbot.waitUntil(lambda: widget.line_map().hunks == [('insert', 1, 1, 1, 2)], timeout=2000)
+    assert widget.left_text_edit.diff_overlay.gaps(0, 2) == [1]
+    assert widget.right_text_edit.diff_overlay.gaps(0, 2) == []
+
+
+def test_connector_paints_visible_hunks(app, qtbot):
+    """Test if the connector between the editors joins the visible hunks."""
+    widget = CodeCompareWidget("a\nb\nc\nd", "a\nX\nY\nZ\nc\nd")
+    qtbot.addWidget(widget)
+    widget.resize(800, 600)
+    widget.show()
+    qtbot.waitExposed(widget)
+    image = widget.connector.grab().toImage()
+    colors = {image.pixelColor(widget.connector.width() // 2, y).name() for y in range(image.height())}
+    assert widget.connector.color.name() in colors
+
+
+def test_overview_rulers(app, qtbot):
+    """Test if both editors show an overview ruler of their own side of the diff."""
+    widget = CodeCompareWidget("a\nb\nc\nd", "a\nX\nY\nZ\nc\nd")
+    qtbot.addWidget(widget)
+    assert widget.left_text_edit.overview_ruler.isVisibleTo(widget.left_text_edit)
+    assert widget.right_text_edit.overview_ruler.side == 1
+    assert widget.right_text_edit.overview_ruler.line_map() is widget.line_map()
+
+
+def test_hunk_navigation(app, qtbot):
+    """Test if next and previous step through the hunks and update the counter."""
+    left = "\n".join(["same"] * 10 + ["old"] + ["same"] * 10 + ["gone"] + ["same"] * 10)
+    right = "\n".join(["same"] * 10 + ["new"] + ["same"] * 21 + ["added"])
+    widget = CodeCompareWidget(left, right)
+    qtbot.addWidget(widget)
+    assert widget.hunk_label.text() == "- of 3"
+
+    assert widget.next_hunk() == 0
+    assert widget.left_text_edit.textCursor().blockNumber() == 10
+    assert widget.hunk_label.text() == "1 of 3"
+    assert widget.next_hunk() == 1
+    assert widget.left_text_edit.textCursor().blockNumber() == 21
+    assert widget.next_hunk() == 2
+    # The insertion after the last line is shown on the last line
+    assert widget.left_text_edit.textCursor().blockNumber() == 31
+    assert widget.hunk_label.text() == "3 of 3"
+    assert widget.next_hunk() is None
+    assert widget.previous_hunk() == 1
+    assert widget.current_hunk() == 1
+
+
+def test_hunk_navigation_from_cursor(app, qtbot):
+    """Test if navigation starts from the cursor of the editor used last."""
+    left = "\n".join(f"line {index}" for index in range(100))
+    right = left.replace("line 20\n", "changed 20\n").replace("line 80\n", "changed 80\n")
+    widget = CodeCompareWidget(left, right)
+    qtbot.addWidget(widget)
+    widget.right_text_edit.go_to_line(50)
+    assert widget.hunk_label.text() == "- of 2"
+    assert widget.previous_hunk() == 0
+    assert widget.right_text_edit.textCursor().blockNumber() == 20
+
+
+def test_hunk_navigation_shortcuts(app, qtbot):
+    """Test if the keyboard shortcuts move between hunks."""
+    widget = CodeCompareWidget("a\nb\nc\nd", "a\nX\nc\nY")
+    qtbot.addWidget(widget)
+    widget.show()
+    widget.activateWindow()
+    qtbot.waitUntil(lambda: QApplication.activeWindow() is widget)
+    widget.left_text_edit.setFocus()
+    qtbot.keyClick(widget.left_text_edit, Qt.Key.Key_F7)
+    assert widget.current_hunk() == 0
+    qtbot.keyClick(widget.left_text_edit, Qt.Key.Key_Down, Qt.KeyboardModifier.AltModifier)
+    assert widget.current_hunk() == 1
+    qtbot.keyClick(widget.left_text_edit, Qt.Key.Key_F7, Qt.KeyboardModifier.ShiftModifier)
+    assert widget.current_hunk() == 0
+
+
+def test_from_files(app, qtbot, tmp_path):
+    """Test if files are loaded chunk by chunk and diffed once both are in."""
+    left_path, right_path = tmp_path / "left.py", tmp_path / "right.py"
+    left_path.write_text("".join(f"value_{index} = {index}\n" for index in range(2000)))
+    right_path.write_text("".join(f"value_{index} = {index * (index != 1500)}\n" for index in range(2000)))
+    widget = CodeCompareWidget.from_files(str(left_path), str(right_path), chunk_size=4096)
+    qtbot.addWidget(widget)
+    assert widget.is_loading()
+    assert widget.language == "python"
+    # The top of the file is shown before the rest is read
+    assert 1 < widget.left_text_edit.blockCount() < 2000
+    assert widget.left_text_edit.isReadOnly()
+    with qtbot.waitSignal(widget.differences_highlighted, timeout=10000):
+        pass
+    qtbot.waitUntil(lambda: not widget.is_diff_running())
+    assert not widget.is_loading()
+    assert not widget.left_text_edit.isReadOnly()
+    assert widget.left_text_edit.toPlainText() == left_path.read_text()
+    assert widget.line_map().hunks == [('replace', 1500, 1501, 1500, 1501)]
+    assert widget.hunk_label.text() == "- of 1"
+
+
+def test_load_missing_file(app, qtbot, tmp_path):
+    """Test if a file that cannot be read still leaves a usable widget."""
+    right_path = tmp_path / "right.py"
+    right_path.write_text("a\nb\n")
+    widget = CodeCompareWidget("", "")
+    qtbot.addWidget(widget)
+    with qtbot.waitSignal(widget.differences_highlighted, timeout=10000):
+        widget.load_files(str(tmp_path / "missing.py"), str(right_path))
+    assert widget.left_text_edit.toPlainText() == ""
+    assert widget.right_text_edit.toPlainText() == "a\nb\n"
+
+
+def test_load_stdin_without_blocking(app, qtbot, monkeypatch, tmp_path):
+    """Test if standard input is shown as it arrives from a pipe, without waiting for its writer."""
+    read_end, write_end = os.pipe()
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(os.fdopen(read_end, "rb")))
+    right_path = tmp_path / "right.py"
+    right_path.write_text("a\nc\n")
+    widget = CodeCompareWidget("", "")
+    qtbot.addWidget(widget)
+    widget.load_files("-", str(right_path))
+    os.write(write_end, b"a\n")
+    qtbot.waitUntil(lambda: widget.left_text_edit.toPlainText() == "a\n", timeout=10000)
+    assert widget.is_loading()
+
+    with qtbot.waitSignal(widget.differences_highlighted, timeout=10000):
+        os.write(write_end, b"b\n")
+        os.close(write_end)
+    assert widget.left_text_edit.toPlainText() == "a\nb\n"
+    assert widget.line_map().hunks == [('replace', 1, 2, 1, 2)]
+
+
+def test_ignore_whitespace_and_case(app, qtbot):
+    """Test if lines differing only in ignored ways are not highlighted."""
+    left, right = "def f():\n    return X\nend", "def  f():\n\treturn x\nEND!"
+    widget = CodeCompareWidget(left, right, ignore_whitespace=True, ignore_case=True)
+    qtbot.addWidget(widget)
+    assert widget.line_map().hunks == [('replace', 2, 3, 2, 3)]
+    plain = CodeCompareWidget(left, right)
+    qtbot.addWidget(plain)
+    assert plain.line_map().hunks == [('replace', 0, 3, 0, 3)]
+
+
+def test_diff_cache_shared_by_widgets(app, qtbot):
+    """Test if a second widget comparing the same texts skips the diff, even a large one."""
+    cache = DiffCache()
+    left = "\n".join(f"cached line {i}" for i in range(CodeCompareWidget.ASYNC_DIFF_THRESHOLD))
+    right = left.replace("cached line 7\n", "")
+    first = CodeCompareWidget(left, right, diff_cache=cache)
+    qtbot.addWidget(first)
+    qtbot.waitUntil(lambda: not first.is_diff_running(), timeout=10000)
+    assert cache.stats()["misses"] == 1 and cache.stats()["entries"] == 1
+
+    second = CodeCompareWidget(left, right, diff_cache=cache)
+    qtbot.addWidget(second)
+    assert not second.is_diff_running()
+    assert cache.hits == 1
+    assert second.line_map().hunks == first.line_map().hunks == [('delete', 7, 8, 7, 7)]
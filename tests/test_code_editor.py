@@ -4,6 +4,7 @@ from PySide6.QtCore import QRect
 from PySide6.QtWidgets import QApplication
 
 from app.widgets.code_editor import CodeEditor
+from app.widgets.pygments_highlighter import PygmentsHighlighter
 
 
 @pytest.fixture(scope='module')
@@ -44,6 +45,26 @@ def test_update_line_number_area_width(code_editor, qtbot):
     assert updated_width > initial_width
 
 
+def test_line_number_area_width_follows_digit_count(code_editor):
+    """Test if the line number area only grows when the line count gains a digit."""
+    code_editor.setPlainText("\n" * 9)
+    two_digits = code_editor.line_number_area_width()
+    code_editor.setPlainText("\n" * 98)
+    assert code_editor.line_number_area_width() == two_digits
+    code_editor.setPlainText("\n" * 99)
+    assert code_editor.line_number_area_width() > two_digits
+    assert code_editor.line_number_area.width() == code_editor.line_number_area_width()
+
+
+def test_line_number_area_width_follows_font(code_editor):
+    """Test if a font change updates the cached gutter metrics."""
+    code_editor.setPlainText("\n" * 99)
+    font = code_editor.font()
+    font.setPointSize(font.pointSize() * 3)
+    code_editor.setFont(font)
+    assert code_editor.line_number_area_width() == 3 + 3 * code_editor.fontMetrics().horizontalAdvance('9')
+
+
 def test_highlight_current_line(code_editor, qtbot):
     """Test if the current line is highlighted correctly."""
     code_editor.setPlainText("Line 1\nLine 2\nLine 3")
@@ -58,3 +79,75 @@ def test_line_number_area_paint_event(code_editor):
     """Test the painting of the line number area."""
     event = QPaintEvent(QRect(0, 0, 100, 100))
     code_editor.line_number_area_paint_event(event)
+
+
+def test_line_number_area_paints_numbers(code_editor, qtbot):
+    """Test if the line numbers are drawn right-aligned in the gutter."""
+    code_editor.setPlainText("a\n" * 20)
+    code_editor.show()
+    qtbot.waitExposed(code_editor)
+    image = code_editor.line_number_area.grab().toImage()
+    background = QColor("#2b2b2b").rgb()
+    width = code_editor.line_number_area.width()
+    inked = [x for x in range(width) for y in range(image.height()) if image.pixel(x, y) != background]
+    assert inked
+    assert max(inked) >= width - code_editor.fontMetrics().horizontalAdvance('9')
+
+
+def test_diff_overlay_paint(code_editor, qtbot):
+    """Test if the diff overlay paints changed lines without touching the document."""
+    code_editor.setPlainText("Line 1\nLine 2\nLine 3")
+    code_editor.diff_overlay.set_status(bytearray(b"\x00\x01\x00"))
+    code_editor.show()
+    qtbot.waitExposed(code_editor)
+
+    image = code_editor.viewport().grab().toImage()
+    block = code_editor.document().findBlockByNumber(1)
+    top = code_editor.blockBoundingGeometry(block).translated(code_editor.contentOffset()).top()
+    assert image.pixelColor(code_editor.viewport().width() - 2, int(top) + 2) == QColor("green")
+    assert not code_editor.document().isUndoAvailable()
+
+
+def test_diff_overlay_clear(code_editor):
+    """Test if clearing the overlay removes all highlights."""
+    code_editor.diff_overlay.set_status(bytearray(b"\x01"))
+    assert code_editor.diff_overlay.is_changed(0)
+    code_editor.diff_overlay.clear()
+    assert not code_editor.diff_overlay.is_changed(0)
+
+
+def test_lazy_highlighting(code_editor, qtbot):
+    """Test if a lazy highlighter colors the visible blocks first and the rest when idle."""
+    highlighter = PygmentsHighlighter(code_editor.document(), lazy=True)
+    code_editor.attach_highlighter(highlighter)
+    code_editor.setPlainText('text = """\n' + "\n".join(f"line {i}" for i in range(3000)) + '\n"""')
+    document = code_editor.document()
+    last = document.lastBlock()
+    assert last.userState() == PygmentsHighlighter.UNHIGHLIGHTED
+
+    code_editor.show()
+    qtbot.waitUntil(lambda: code_editor.firstVisibleBlock().userState() != PygmentsHighlighter.UNHIGHLIGHTED)
+    qtbot.waitUntil(lambda: not highlighter.is_idle_pass_running(), timeout=20000)
+    assert last.userState() != PygmentsHighlighter.UNHIGHLIGHTED
+    # The string opened on the first line is carried to the middle of the document
+    middle = document.findBlockByNumber(1500)
+    assert middle.userState() == document.findBlockByNumber(1).userState() != 0
+    assert middle.layout().formats()
+
+
+def test_append_text_lazy(code_editor, qtbot):
+    """Test if appended chunks keep the cursor and are highlighted by the idle pass."""
+    highlighter = PygmentsHighlighter(code_editor.document(), lazy=True)
+    code_editor.attach_highlighter(highlighter)
+    code_editor.setPlainText("")
+    code_editor.show()
+    code_editor.append_text("x = 1\ny = 'abc")
+    code_editor.append_text("def'\n" + "z = 2\n" * 500)
+    assert code_editor.toPlainText() == "x = 1\ny = 'abcdef'\n" + "z = 2\n" * 500
+    assert code_editor.textCursor().position() == 0
+    assert code_editor.line_number_area_width() == 3 + 3 * code_editor.fontMetrics().horizontalAdvance('9')
+    qtbot.waitUntil(lambda: not highlighter.is_idle_pass_running(), timeout=20000)
+    document = code_editor.document()
+    # The line continued by the second chunk is highlighted as a whole
+    assert document.findBlockByNumber(1).userState() == document.findBlockByNumber(0).userState()
+    assert document.lastBlock().userState() != PygmentsHighlighter.UNHIGHLIGHTED
@@ -0,0 +1,84 @@
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from app.widgets.comparison_dashboard import ComparisonDashboard
+
+
+@pytest.fixture(scope="module")
+def app():
+    """Fixture for creating the application."""
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def dashboard(qtbot, app):
+    """A dashboard of 500 comparisons, three panes tall."""
+    dashboard = ComparisonDashboard(pane_height=200)
+    qtbot.addWidget(dashboard)
+    for index in range(500):
+        dashboard.add_comparison(f"file_{index}.py", f"a = {index}\nb = 0", f"a = {index}\nb = 1")
+    dashboard.resize(800, 600)
+    dashboard.show()
+    qtbot.waitExposed(dashboard)
+    return dashboard
+
+
+def test_only_visible_panes_are_built(dashboard):
+    """Test if only the comparisons in view get a pane."""
+    assert dashboard.count() == 500
+    first, last = dashboard.visible_range()
+    assert first == 0 and last - first <= 4
+    assert dashboard.pane_count() == last - first
+    widget = dashboard.compare_widget(0)
+    assert widget is not None and len(widget.line_map().hunks) == 1
+    assert dashboard.compare_widget(last) is None
+
+
+def test_panes_are_recycled(dashboard):
+    """Test if scrolling through every comparison reuses the same panes."""
+    built = dashboard.pane_count()
+    shown = []
+    dashboard.comparison_shown.connect(shown.append)
+    for index in range(0, 500, 7):
+        dashboard.scroll_to(index)
+    dashboard.scroll_to(499)
+    assert dashboard.pane_count() <= built + 1
+    assert len(shown) > 100
+    first, last = dashboard.visible_range()
+    assert last == 500
+    widget = dashboard.compare_widget(499)
+    assert widget.left_text_edit.toPlainText() == "a = 499\nb = 0"
+    assert len(widget.line_map().hunks) == 1
+
+
+def test_panes_share_the_stylesheet(dashboard):
+    """Test if the panes inherit the stylesheet instead of each setting it."""
+    assert dashboard.styleSheet()
+    assert dashboard.compare_widget(0).styleSheet() == ""
+
+
+def test_language_of_recycled_pane(qtbot, app):
+    """Test if a reused pane switches to the language of its new comparison."""
+    dashboard = ComparisonDashboard(pane_height=300)
+    qtbot.addWidget(dashboard)
+    dashboard.add_comparison("a.py", "x = 1", "x = 2", filename="a.py")
+    dashboard.add_comparison("b.yaml", "key: 1", "key: 2", filename="b.yaml")
+    dashboard.resize(600, 300)
+    dashboard.show()
+    qtbot.waitExposed(dashboard)
+    assert dashboard.compare_widget(0).language == "python"
+    dashboard.scroll_to(1)
+    assert dashboard.pane_count() == 1
+    assert dashboard.compare_widget(1).language == "yaml"
+
+
+def test_clear(dashboard):
+    """Test if clearing the dashboard hides every pane but keeps them for reuse."""
+    built = dashboard.pane_count()
+    dashboard.clear()
+    assert dashboard.count() == 0
+    assert dashboard.visible_range() == (0, 0)
+    assert dashboard.pane_count() == built
+    dashboard.add_comparison("new.py", "a", "b")
+    assert dashboard.pane_count() == built
+    assert dashboard.compare_widget(0).left_text_edit.toPlainText() == "a"
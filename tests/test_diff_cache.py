@@ -0,0 +1,114 @@
+import difflib
+import os
+
+import pytest
+
+from app.core.diff_cache import DiffCache, decode_hunks, decode_opcodes, encode_opcodes
+from app.core.hunk_table import HunkTable
+
+
+def opcodes_of(a, b):
+    """Returns the difflib opcodes of two lists of lines."""
+    return difflib.SequenceMatcher(None, a, b).get_opcodes()
+
+
+@pytest.mark.parametrize("a, b", [
+    ([], []),
+    (["a"], []),
+    ([], ["a", "b"]),
+    (["a", "b", "c"], ["a", "b", "c"]),
+    (["a", "b", "c", "d"], ["x", "b", "d", "e"]),
+    (list("abcdefgh"), list("abXdeYYh")),
+])
+def test_encode_decode(a, b):
+    """Test if opcodes survive the binary format, with equal runs restored."""
+    opcodes = opcodes_of(a, b)
+    data = encode_opcodes(opcodes)
+    assert decode_opcodes(data) == opcodes
+    assert decode_hunks(data) == HunkTable.from_opcodes(opcodes)
+    assert encode_opcodes(HunkTable.from_opcodes(opcodes)) == data
+    assert len(data) == 12 + 16 * sum(tag != 'equal' for tag, *_ in opcodes)
+
+
+def test_decode_rejects_other_data():
+    """Test if data in another format is refused."""
+    with pytest.raises(ValueError):
+        decode_opcodes(b"DWC1")
+    with pytest.raises(ValueError):
+        decode_opcodes(b"XXXX" + bytes(8))
+
+
+def test_key():
+    """Test if keys depend on both texts, their sides and the options."""
+    key = DiffCache.key(["a", "b"], ["c"])
+    assert key == DiffCache.key(["a", "b"], ["c"])
+    assert key != DiffCache.key(["c"], ["a", "b"])
+    assert key != DiffCache.key(["a"], ["b", "c"])
+    assert key != DiffCache.key(["a", "b"], ["c"], "ignore_case")
+
+
+def test_hits_and_misses():
+    """Test if lookups are counted and stored opcodes are returned."""
+    cache = DiffCache()
+    opcodes = opcodes_of(["a", "b"], ["a", "c"])
+    assert cache.get(b"key") is None
+    cache.put(b"key", opcodes)
+    assert cache.get(b"key") == opcodes
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1, "entries": 1, "bytes": 28}
+    cache.clear()
+    assert cache.stats()["entries"] == cache.stats()["hits"] == 0
+
+
+def test_byte_budget():
+    """Test if the least recently used entries are evicted over the byte budget."""
+    opcodes = opcodes_of(["a", "b"], ["a", "c"])
+    cache = DiffCache(max_bytes=3 * len(encode_opcodes(opcodes)))
+    for key in (b"1", b"2", b"3"):
+        cache.put(key, opcodes)
+    cache.get(b"1")
+    cache.put(b"4", opcodes)
+    assert [cache.get(key) is not None for key in (b"1", b"2", b"3", b"4")] == [True, False, True, True]
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_disk_store(tmp_path):
+    """Test if results are found by another cache on the same directory, and damaged files are ignored."""
+    opcodes = opcodes_of(list("abc"), list("aXc"))
+    DiffCache(directory=str(tmp_path / "cache")).put(b"\x01\x02", opcodes)
+    cache = DiffCache(directory=str(tmp_path / "cache"))
+    assert cache.get(b"\x01\x02") == opcodes
+    assert cache.get(b"\x01\x02") == opcodes
+    assert (cache.disk_hits, cache.hits) == (1, 1)
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["0102.opcodes"]
+
+    (tmp_path / "cache" / "0102.opcodes").write_bytes(b"garbage")
+    cache = DiffCache(directory=str(tmp_path / "cache"))
+    assert cache.get(b"\x01\x02") is None
+    assert cache.misses == 1
+
+
+def test_stale_disk_entry_is_a_miss(tmp_path):
+    """Test if a file for other line counts, or with hunks past the last line, is ignored."""
+    opcodes = opcodes_of(list("abc"), list("aXc"))
+    DiffCache(directory=str(tmp_path)).put(b"\x01", opcodes)
+    assert DiffCache(directory=str(tmp_path)).get(b"\x01", (4, 3)) is None
+    assert DiffCache(directory=str(tmp_path)).get(b"\x01", (3, 3)) == opcodes
+
+    data = bytearray(encode_opcodes(opcodes))
+    data[-4:] = (7).to_bytes(4, "little")
+    (tmp_path / "01.opcodes").write_bytes(bytes(data))
+    assert DiffCache(directory=str(tmp_path)).get(b"\x01", (3, 3)) is None
+
+
+def test_disk_budget(tmp_path):
+    """Test if the least recently used files are deleted when the store grows over its budget."""
+    opcodes = opcodes_of(["a", "b"], ["a", "c"])
+    size = len(encode_opcodes(opcodes))
+    cache = DiffCache(max_bytes=0, directory=str(tmp_path), max_disk_bytes=4 * size)
+    for index, key in enumerate((b"\x01", b"\x02", b"\x03", b"\x04")):
+        cache.put(key, opcodes)
+        os.utime(tmp_path / f"{key.hex()}.opcodes", (index, index))
+    assert cache.get(b"\x01") == opcodes
+    cache.put(b"\x05", opcodes)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["01.opcodes", "04.opcodes", "05.opcodes"]
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= cache.max_disk_bytes
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from app.core.diff_engines import (
+    DIFF_ENGINES, DifflibEngine, HistogramEngine, MyersEngine, get_diff_engine, opcodes_from_matches
+)
+
+
+def lcs_length(a, b):
+    """Reference longest common subsequence length."""
+    previous = [0] * (len(b) + 1)
+    for item in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if item == other else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def check_opcodes(opcodes, a, b):
+    """Asserts that the opcodes cover both sequences and return the number of equal items."""
+    i = j = 0
+    equal = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            equal += i2 - i1
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return equal
+
+
+@pytest.mark.parametrize("name", sorted(DIFF_ENGINES))
+def test_engines_produce_valid_opcodes(name):
+    """Test if every engine produces opcodes that transform one sequence into the other."""
+    engine = get_diff_engine(name)
+    rng = random.Random(name)
+    for _ in range(300):
+        a = [rng.choice("abcde") for _ in range(rng.randint(0, 20))]
+        b = [rng.choice("abcde") for _ in range(rng.randint(0, 20))]
+        check_opcodes(engine.get_opcodes(a, b), a, b)
+
+
+def test_myers_is_minimal():
+    """Test if the Myers engine finds a longest common subsequence."""
+    engine = MyersEngine()
+    rng = random.Random(1)
+    for _ in range(300):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 20))]
+        b = [rng.choice("abcd") for _ in range(rng.randint(0, 20))]
+        assert check_opcodes(engine.get_opcodes(a, b), a, b) == lcs_length(a, b)
+
+
+def test_myers_cost_bound_stays_valid():
+    """Test if the approximate Myers search still produces valid opcodes."""
+    engine = MyersEngine(min_cost=1)
+    rng = random.Random(2)
+    a = [rng.choice("xyz") for _ in range(500)]
+    b = [rng.choice("xyz") for _ in range(500)]
+    check_opcodes(engine.get_opcodes(a, b), a, b)
+
+
+def test_engines_match_difflib_on_simple_change():
+    """Test if all engines agree with difflib on a single replaced line."""
+    a = ["def f():", "    x = 1", "    return x"]
+    b = ["def f():", "    x = 2", "    return x"]
+    expected = DifflibEngine().get_opcodes(a, b)
+    assert MyersEngine().get_opcodes(a, b) == expected
+    assert HistogramEngine().get_opcodes(a, b) == expected
+
+
+def test_histogram_prefers_unique_anchor():
+    """Test if the histogram engine anchors on the rare line instead of braces."""
+    a = ["}", "}", "unique", "}", "}"]
+    b = ["}", "unique", "}"]
+    opcodes = HistogramEngine().get_opcodes(a, b)
+    assert ('equal', 2, 3, 1, 2) in opcodes
+
+
+def test_opcodes_from_matches_merges_adjacent_runs():
+    """Test if adjacent matching runs collapse into one equal opcode."""
+    opcodes = opcodes_from_matches([(2, 2, 1), (0, 0, 2)], 4, 3)
+    assert opcodes == [('equal', 0, 3, 0, 3), ('delete', 3, 4, 3, 3)]
+
+
+def test_get_diff_engine():
+    """Test engine lookup by name and by instance."""
+    engine = HistogramEngine()
+    assert get_diff_engine(engine) is engine
+    assert isinstance(get_diff_engine("myers"), MyersEngine)
+    with pytest.raises(ValueError):
+        get_diff_engine("unknown")
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from app.core.diff_engines import DiffEngine, MyersEngine
+from app.workers import diff_worker
+from app.workers.diff_worker import DiffWorker
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Fixture to create a QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+@pytest.fixture
+def worker(app):
+    """Fixture to create a DiffWorker over two small documents."""
+    left = [f"line {i}" for i in range(10)]
+    right = [f"line {i}" if i % 3 else f"changed {i}" for i in range(10)]
+    return DiffWorker(7, MyersEngine(), left, right, chunk_size=2)
+
+
+def test_opcodes_streamed_in_chunks(worker):
+    """Test if the worker emits all opcodes in chunks followed by finished."""
+    chunks = []
+    finished = []
+    worker.signals.opcodes_ready.connect(lambda generation, opcodes: chunks.append((generation, opcodes)))
+    worker.signals.finished.connect(finished.append)
+    worker.run()
+
+    expected = MyersEngine().get_opcodes(worker.left_lines, worker.right_lines)
+    assert all(generation == 7 and len(opcodes) <= 2 for generation, opcodes in chunks)
+    assert [opcode for _, opcodes in chunks for opcode in opcodes] == expected
+    assert finished == [7]
+
+
+def test_cancelled_worker_emits_nothing(worker):
+    """Test if a cancelled worker does not emit any result."""
+    emitted = []
+    worker.signals.opcodes_ready.connect(lambda *args: emitted.append(args))
+    worker.signals.finished.connect(emitted.append)
+    worker.cancel()
+    worker.run()
+    assert worker.is_cancelled()
+    assert emitted == []
+
+
+def test_failure_reported(worker):
+    """Test if errors in the engine are reported through the failed signal."""
+    failures = []
+    worker.signals.failed.connect(lambda generation, message: failures.append(generation))
+    worker.left_lines = None
+    worker.run()
+    assert failures == [7]
+
+
+class CrashingEngine(DiffEngine):
+    """Engine killing the process it runs in."""
+
+    def get_opcodes(self, a, b):
+        os._exit(1)
+
+
+class SlowEngine(DiffEngine):
+    """Engine taking far longer than a test may."""
+
+    def get_opcodes(self, a, b):
+        time.sleep(60)
+        return []
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    """Sends every diff to the process pool, and shuts the pool down afterwards."""
+    monkeypatch.setattr(diff_worker, "PROCESS_POOL_THRESHOLD", 0)
+    yield
+    if diff_worker._process_pool is not None:
+        diff_worker._discard_process_pool(diff_worker._process_pool)
+
+
+def run_worker(engine):
+    """Runs a worker over two small documents and returns its opcodes, or None if it failed."""
+    worker = DiffWorker(1, engine, ["a", "b"], ["a", "c"])
+    chunks = []
+    worker.signals.opcodes_ready.connect(lambda generation, opcodes: chunks.extend(opcodes))
+    worker.signals.failed.connect(lambda generation, message: chunks.append(None))
+    worker.run()
+    return None if None in chunks else chunks
+
+
+def test_broken_process_pool_replaced(app, process_pool):
+    """Test if a child process dying fails its diff only, the next one getting a new pool."""
+    assert run_worker(CrashingEngine()) is None
+    assert run_worker(MyersEngine()) == MyersEngine().get_opcodes(["a", "b"], ["a", "c"])
+
+
+def test_cancelled_running_job_frees_process_pool(app, process_pool):
+    """Test if cancelling a diff running in a child process does not hold up the next one."""
+    worker = DiffWorker(1, SlowEngine(), ["a"], ["b"])
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    time.sleep(0.5)
+    worker.cancel()
+    thread.join(5)
+    assert not thread.is_alive()
+    start = time.perf_counter()
+    assert run_worker(MyersEngine()) is not None
+    assert time.perf_counter() - start < 10
@@ -0,0 +1,72 @@
+import os
+
+from app.core.diff_engines import MyersEngine
+from app.core.directory_compare import (ADDED, BINARY, CHANGED, ERROR, IDENTICAL, PENDING, REMOVED, compare_batch,
+                                        compare_files, file_digest, pair_trees, scan_tree)
+from app.core.line_interner import InterningEngine
+
+
+def make_tree(root, files):
+    """Writes files given as {relative path: bytes} under root."""
+    for path, content in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+
+def test_scan_tree(tmp_path):
+    """Test if every file is found, with paths relative to the root."""
+    make_tree(tmp_path, {"a.py": b"a", "sub/b.py": b"bb", "sub/deeper/c.py": b""})
+    files = scan_tree(str(tmp_path))
+    assert sorted(files) == ["a.py", "sub/b.py", "sub/deeper/c.py"]
+    assert files["sub/b.py"][0] == 2
+
+
+def test_pair_trees(tmp_path):
+    """Test if the metadata alone settles added, removed and untouched files."""
+    make_tree(tmp_path / "left", {"same.py": b"x\n", "touched.py": b"x\n", "old.py": b"o\n", "edited.py": b"a\n"})
+    make_tree(tmp_path / "right", {"same.py": b"x\n", "touched.py": b"x\n", "new.py": b"n\n", "edited.py": b"ab\n"})
+    for name in ("same.py", "edited.py"):
+        stat = os.stat(tmp_path / "left" / name)
+        os.utime(tmp_path / "right" / name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.utime(tmp_path / "right" / "touched.py", ns=(0, 0))
+
+    pairs = pair_trees(str(tmp_path / "left"), str(tmp_path / "right"))
+    statuses = {pair.path: pair.status for pair in pairs}
+    assert [pair.path for pair in pairs] == sorted(statuses)
+    assert statuses == {"same.py": IDENTICAL, "touched.py": PENDING, "old.py": REMOVED, "new.py": ADDED,
+                        "edited.py": PENDING}
+
+
+def test_compare_files(tmp_path):
+    """Test if identical contents are found by hash and changed ones are diffed."""
+    make_tree(tmp_path, {"a.txt": b"one\ntwo\nthree\n", "b.txt": b"one\ntwo\nthree\n",
+                         "c.txt": b"one\n2\nthree\nfour\n"})
+    a, b, c = (str(tmp_path / name) for name in ("a.txt", "b.txt", "c.txt"))
+    assert file_digest(a) == file_digest(b) != file_digest(c)
+    assert compare_files(a, b, MyersEngine()) == (IDENTICAL, 0, 0, "")
+    assert compare_files(a, c, MyersEngine(), same_size=False) == (CHANGED, 1, 2, "")
+
+
+def test_compare_files_ignore_whitespace(tmp_path):
+    """Test if files differing only in ignored whitespace compare as identical."""
+    make_tree(tmp_path, {"a.py": b"x = 1\n", "b.py": b"x=1 \n"})
+    engine = InterningEngine(MyersEngine(), ignore_whitespace=True)
+    assert compare_files(str(tmp_path / "a.py"), str(tmp_path / "b.py"), engine, False)[0] == IDENTICAL
+
+
+def test_compare_files_binary_and_missing(tmp_path):
+    """Test if binary files are not diffed and unreadable ones are reported."""
+    make_tree(tmp_path, {"a.bin": b"\0\1\2", "b.bin": b"\0\1\3"})
+    assert compare_files(str(tmp_path / "a.bin"), str(tmp_path / "b.bin"), MyersEngine())[0] == BINARY
+    status, _, _, error = compare_files(str(tmp_path / "a.bin"), str(tmp_path / "missing"), MyersEngine())
+    assert status == ERROR and error
+
+
+def test_compare_batch(tmp_path):
+    """Test if a batch reports every file under its index."""
+    make_tree(tmp_path / "left", {"a.txt": b"a\n", "b.txt": b"b\n"})
+    make_tree(tmp_path / "right", {"a.txt": b"a\n", "b.txt": b"c\nd\n"})
+    results = compare_batch(str(tmp_path / "left"), str(tmp_path / "right"),
+                            [(3, "a.txt", True), (5, "b.txt", False)], MyersEngine())
+    assert results == [(3, (IDENTICAL, 0, 0, "")), (5, (CHANGED, 1, 2, ""))]
@@ -0,0 +1,59 @@
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from app.core.directory_compare import ADDED, CHANGED, IDENTICAL, REMOVED
+from app.widgets.directory_compare_widget import DirectoryCompareWidget
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Fixture to create a QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+@pytest.fixture
+def widget(app, qtbot, tmp_path):
+    """Fixture to compare two small trees and wait for the summaries."""
+    (tmp_path / "left" / "pkg").mkdir(parents=True)
+    (tmp_path / "right" / "pkg").mkdir(parents=True)
+    (tmp_path / "left" / "pkg" / "same.py").write_text("a = 1\n")
+    (tmp_path / "right" / "pkg" / "same.py").write_text("a = 1\n")
+    (tmp_path / "left" / "edited.py").write_text("a = 1\nb = 2\n")
+    (tmp_path / "right" / "edited.py").write_text("a = 1\nb = 3\nc = 4\n")
+    (tmp_path / "left" / "old.py").write_text("old\n")
+    (tmp_path / "right" / "new.py").write_text("new\n")
+    widget = DirectoryCompareWidget(str(tmp_path / "left"), str(tmp_path / "right"), diff_engine="myers")
+    qtbot.addWidget(widget)
+    qtbot.waitUntil(lambda: not widget.is_comparing(), timeout=30000)
+    return widget
+
+
+def test_file_list(widget):
+    """Test if every file is listed with its status and line counts."""
+    rows = {}
+    for index in range(widget.file_list.topLevelItemCount()):
+        item = widget.file_list.topLevelItem(index)
+        rows[item.text(0)] = (item.text(1), item.text(2))
+    assert rows == {"edited.py": (CHANGED, "-1 +2"), "new.py": (ADDED, ""), "old.py": (REMOVED, ""),
+                    "pkg/same.py": (IDENTICAL, "")}
+    assert widget.summary_label.text() == "1 identical, 1 changed, 1 added, 1 removed"
+
+
+def test_open_file(widget, qtbot):
+    """Test if only an opened file gets a comparison, replacing the previous one."""
+    assert widget.compare_widget is None
+    paths = [pair.path for pair in widget.pairs]
+    with qtbot.waitSignal(widget.file_opened):
+        compare_widget = widget.open_file(paths.index("edited.py"))
+    qtbot.waitUntil(lambda: not compare_widget.is_loading() and not compare_widget.is_diff_running())
+    assert compare_widget.right_text_edit.toPlainText() == "a = 1\nb = 3\nc = 4\n"
+    assert len(compare_widget.line_map().hunks) == 1
+
+    added = widget.open_file(paths.index("new.py"))
+    qtbot.waitUntil(lambda: not added.is_loading())
+    assert widget.compare_widget is added
+    assert added.left_text_edit.toPlainText() == ""
+    assert added.right_text_edit.toPlainText() == "new\n"
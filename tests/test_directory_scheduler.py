@@ -0,0 +1,94 @@
+import os
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from app.core.diff_engines import DiffEngine, MyersEngine
+from app.core.directory_compare import CHANGED, ERROR, IDENTICAL, PENDING, pair_trees
+from app.workers.directory_scheduler import DirectoryDiffScheduler
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Fixture to create a QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+@pytest.fixture
+def trees(tmp_path):
+    """Fixture to create two trees of 20 files, every third one edited."""
+    for side in ("left", "right"):
+        (tmp_path / side).mkdir()
+    for index in range(20):
+        (tmp_path / "left" / f"{index}.txt").write_text(f"line\n{index}\n")
+        (tmp_path / "right" / f"{index}.txt").write_text(f"line\n{index}\n" + ("edit\n" if index % 3 == 0 else ""))
+    return str(tmp_path / "left"), str(tmp_path / "right")
+
+
+def test_scheduler_compares_pending_files(app, qtbot, trees):
+    """Test if every pending file is compared, about four batches per process, before finished is emitted."""
+    pairs = pair_trees(*trees)
+    assert all(pair.status == PENDING for pair in pairs)
+    scheduler = DirectoryDiffScheduler(MyersEngine(), max_workers=2)
+    results = []
+    scheduler.batch_compared.connect(results.extend)
+    with qtbot.waitSignal(scheduler.finished, timeout=30000):
+        assert scheduler.start(*trees, pairs) == 10
+    assert not scheduler.is_running()
+    statuses = {pairs[index].path: result[0] for index, result in results}
+    assert len(statuses) == 20
+    assert all(status == (CHANGED if int(path[:-4]) % 3 == 0 else IDENTICAL) for path, status in statuses.items())
+
+
+def test_scheduler_without_pending_files(app, qtbot, tmp_path):
+    """Test if finished is emitted at once when nothing needs comparing."""
+    scheduler = DirectoryDiffScheduler(MyersEngine())
+    with qtbot.waitSignal(scheduler.finished, timeout=1000):
+        assert scheduler.start(str(tmp_path), str(tmp_path), []) == 0
+    assert not scheduler.is_running()
+
+
+def test_scheduler_cancel(app, qtbot, trees):
+    """Test if no results of a cancelled comparison are reported."""
+    scheduler = DirectoryDiffScheduler(MyersEngine(), max_workers=1)
+    results = []
+    scheduler.batch_compared.connect(results.extend)
+    scheduler.start(*trees, pair_trees(*trees))
+    scheduler.cancel()
+    assert not scheduler.is_running()
+    qtbot.wait(200)
+    assert results == []
+
+
+class RaisingEngine(DiffEngine):
+    """Engine raising on every diff."""
+
+    def get_opcodes(self, a, b):
+        raise RuntimeError("engine failure")
+
+
+class CrashingEngine(DiffEngine):
+    """Engine killing the process it runs in."""
+
+    def get_opcodes(self, a, b):
+        os._exit(1)
+
+
+@pytest.mark.parametrize("engine, message", [(RaisingEngine(), "engine failure"), (CrashingEngine(), None)])
+def test_scheduler_failed_batches(app, qtbot, trees, engine, message):
+    """Test if the files of failed batches, even ones breaking the pool, are reported as errors."""
+    pairs = pair_trees(*trees)
+    scheduler = DirectoryDiffScheduler(engine, max_workers=2)
+    results = []
+    scheduler.batch_compared.connect(results.extend)
+    with qtbot.waitSignal(scheduler.finished, timeout=30000):
+        scheduler.start(*trees, pairs)
+    assert sorted(index for index, _ in results) == list(range(20))
+    # Unedited files are found identical by their hashes, without a diff, unless their batch failed
+    errors = {pairs[index].path: result for index, result in results if result[0] == ERROR}
+    assert {f"{index}.txt" for index in range(0, 20, 3)} <= set(errors)
+    assert all(result[3] and (message is None or result[3] == message) for result in errors.values())
+    assert not scheduler.is_running()
@@ -0,0 +1,60 @@
+import io
+import sys
+
+import pytest
+
+from app.core.file_loader import STDIN, LineReader, read_chunks, read_lines
+
+
+def test_read_chunks(tmp_path):
+    """Test if a file is decoded whole, whatever the chunk size."""
+    path = tmp_path / "text.txt"
+    text = "première ligne\r\ndeuxième ligne\rtroisième\n" * 50
+    path.write_bytes(text.encode("utf-8"))
+    expected = text.replace("\r\n", "\n").replace("\r", "\n")
+    for chunk_size in (1, 2, 3, 7, 1 << 20):
+        assert "".join(read_chunks(str(path), chunk_size)) == expected
+
+
+def test_read_chunks_empty_file(tmp_path):
+    """Test if an empty file, which cannot be memory mapped, reads as no text."""
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(read_chunks(str(path))) == []
+    assert read_lines(str(path)).lines == [""]
+
+
+def test_read_chunks_encoding(tmp_path):
+    """Test if the encoding is honoured and undecodable bytes are replaced."""
+    path = tmp_path / "latin.txt"
+    path.write_bytes("café\n".encode("latin-1"))
+    assert "".join(read_chunks(str(path), encoding="latin-1")) == "café\n"
+    assert "".join(read_chunks(str(path))) == "caf�\n"
+
+
+def test_read_stdin(monkeypatch):
+    """Test if "-" reads standard input."""
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"a\nb\n")))
+    assert read_lines(STDIN, chunk_size=1).lines == ["a", "b", ""]
+
+
+@pytest.mark.parametrize("text", ["", "a", "a\n", "a\nb", "\n\n", "one\ntwo\nthree\n"])
+def test_line_reader_matches_split(text):
+    """Test if lines and line IDs match a split of the whole text, for any chunking."""
+    for size in (1, 2, 5):
+        reader = LineReader()
+        for start in range(0, len(text), size):
+            reader.feed(text[start:start + size])
+        reader.close()
+        assert reader.lines == text.split("\n")
+        assert list(reader.ids) == list(reader.interner.intern_lines(reader.lines))
+
+
+def test_line_reader_closed():
+    """Test if a closed reader refuses more text."""
+    reader = LineReader()
+    reader.close()
+    reader.close()
+    assert reader.lines == [""]
+    with pytest.raises(ValueError):
+        reader.feed("a")
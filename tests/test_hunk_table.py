@@ -0,0 +1,47 @@
+from app.core.hunk_table import HunkTable
+
+OPCODES = [
+    ('equal', 0, 2, 0, 2),
+    ('replace', 2, 3, 2, 5),
+    ('equal', 3, 4, 5, 6),
+    ('delete', 4, 5, 6, 6),
+    ('equal', 5, 7, 6, 8),
+    ('insert', 7, 7, 8, 9),
+    ('equal', 7, 8, 9, 10),
+]
+HUNKS = [opcode for opcode in OPCODES if opcode[0] != 'equal']
+
+
+def test_hunks_are_read_as_opcodes():
+    """Test if the hunks are read back with their tags, by index, slice or iteration."""
+    table = HunkTable.from_opcodes(OPCODES)
+    assert len(table) == 3
+    assert table[0] == ('replace', 2, 3, 2, 5)
+    assert table[-1] == ('insert', 7, 7, 8, 9)
+    assert table[1:] == HUNKS[1:]
+    assert list(table) == HUNKS
+    assert table == HUNKS and table != HUNKS[:2]
+
+
+def test_columns():
+    """Test if each bound is kept in its own sorted column, four bytes per hunk."""
+    table = HunkTable.from_opcodes(OPCODES)
+    assert list(table.starts(0)) == [2, 4, 7]
+    assert list(table.ends(1)) == [5, 6, 9]
+    assert table.lengths == (8, 10)
+    assert table.nbytes() == 3 * 16
+
+
+def test_opcodes_round_trip():
+    """Test if the equal runs are restored from the bounds and the lengths."""
+    table = HunkTable.from_opcodes(OPCODES)
+    assert table.opcodes() == OPCODES
+    assert HunkTable.from_opcodes([]).opcodes() == []
+    assert HunkTable.from_opcodes([('equal', 0, 4, 0, 4)]).opcodes() == [('equal', 0, 4, 0, 4)]
+
+
+def test_interleaved_round_trip():
+    """Test if the bounds stored hunk after hunk give back the same table."""
+    table = HunkTable.from_opcodes(OPCODES)
+    assert list(table.interleaved()) == [2, 3, 2, 5, 4, 5, 6, 6, 7, 7, 8, 9]
+    assert HunkTable.from_interleaved(table.interleaved(), table.lengths) == table
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from app.core.diff_engines import HistogramEngine, MyersEngine
+from app.core.incremental_diff import LEFT, RIGHT, IncrementalDiff
+
+
+def expected_status(incremental_diff):
+    """Recomputes the per-line status from the opcodes."""
+    status = (bytearray(len(incremental_diff.lines[LEFT])), bytearray(len(incremental_diff.lines[RIGHT])))
+    for tag, i1, i2, j1, j2 in incremental_diff.opcodes:
+        if tag != 'equal':
+            status[LEFT][i1:i2] = b'\x01' * (i2 - i1)
+            status[RIGHT][j1:j2] = b'\x01' * (j2 - j1)
+    return status
+
+
+def check_opcodes(incremental_diff):
+    """Asserts that the opcodes describe the current lines of both sides."""
+    left, right = incremental_diff.lines
+    i = j = 0
+    for tag, i1, i2, j1, j2 in incremental_diff.opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert left[i1:i2] == right[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(left), len(right))
+    assert incremental_diff.status == expected_status(incremental_diff)
+
+
+def test_edit_inside_equal_region():
+    """Test if editing an unchanged line creates a new difference on both sides."""
+    lines = [f"line {i}" for i in range(100)]
+    incremental_diff = IncrementalDiff(MyersEngine(), lines, lines)
+    changed = incremental_diff.replace_lines(RIGHT, 50, 51, ["edited"])
+    check_opcodes(incremental_diff)
+    assert changed == ([50], [50])
+    assert ('replace', 50, 51, 50, 51) in incremental_diff.opcodes
+
+
+def test_revert_edit_removes_difference():
+    """Test if restoring the original text makes the lines equal again."""
+    left = ["a", "b", "c"]
+    incremental_diff = IncrementalDiff(MyersEngine(), left, ["a", "x", "c"])
+    changed = incremental_diff.replace_lines(RIGHT, 1, 2, ["b"])
+    assert incremental_diff.opcodes == [('equal', 0, 3, 0, 3)]
+    assert changed == ([1], [1])
+
+
+def test_inserted_lines_shift_following_hunks():
+    """Test if hunks after the edit move by the number of inserted lines."""
+    left = [f"line {i}" for i in range(20)]
+    right = list(left)
+    right[15] = "changed"
+    incremental_diff = IncrementalDiff(MyersEngine(), left, right)
+    incremental_diff.replace_lines(LEFT, 2, 2, ["new 1", "new 2"])
+    check_opcodes(incremental_diff)
+    assert ('replace', 17, 18, 15, 16) in incremental_diff.opcodes
+
+
+def test_only_region_around_edit_is_rediffed():
+    """Test if the engine only sees the lines around the edit."""
+    class RecordingEngine(MyersEngine):
+        sizes = []
+
+        def get_opcodes(self, a, b):
+            self.sizes.append((len(a), len(b)))
+            return super().get_opcodes(a, b)
+
+    lines = [f"line {i}" for i in range(10000)]
+    incremental_diff = IncrementalDiff(RecordingEngine(), lines, lines)
+    incremental_diff.replace_lines(LEFT, 5000, 5001, ["edited"])
+    assert RecordingEngine.sizes[-1] == (7, 7)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_keep_diff_valid(seed):
+    """Test if random edits always leave a valid diff behind."""
+    rng = random.Random(seed)
+    left = [rng.choice("abcdef") for _ in range(40)]
+    right = [rng.choice("abcdef") for _ in range(40)]
+    incremental_diff = IncrementalDiff(HistogramEngine(), left, right, context=rng.randint(0, 3))
+    for _ in range(50):
+        side = rng.choice((LEFT, RIGHT))
+        start = rng.randint(0, len(incremental_diff.lines[side]))
+        stop = rng.randint(start, min(len(incremental_diff.lines[side]), start + 3))
+        incremental_diff.replace_lines(side, start, stop, [rng.choice("abcdef") for _ in range(rng.randint(0, 3))])
+        check_opcodes(incremental_diff)
@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.intraline import IntralineDiffer
+
+
+def changed_text(line, ranges):
+    """Returns the changed parts of a line."""
+    return [line[start:end] for start, end in ranges]
+
+
+def test_token_granularity():
+    """Test if whole words are reported, even when only part of a word changed."""
+    left, right = "value = compute(total)", "value = compare(total, 2)"
+    left_ranges, right_ranges = IntralineDiffer().diff_lines(left, right)
+    assert changed_text(left, left_ranges) == ["compute"]
+    assert changed_text(right, right_ranges) == ["compare", ", 2"]
+
+
+def test_char_granularity():
+    """Test if single characters are reported at character granularity."""
+    left, right = "value = compute(total)", "value = compare(total)"
+    left_ranges, right_ranges = IntralineDiffer("char").diff_lines(left, right)
+    assert "".join(changed_text(left, left_ranges)) == "ut"
+    assert "".join(changed_text(right, right_ranges)) == "ar"
+
+
+def test_identical_and_empty_lines():
+    """Test if equal lines have no ranges and added text is reported as a whole."""
+    differ = IntralineDiffer()
+    assert differ.diff_lines("same", "same") == ([], [])
+    assert differ.diff_lines("", "new") == ([], [(0, 3)])
+
+
+def test_long_lines_are_coarsened():
+    """Test if a long changed part is reported as one range instead of being diffed."""
+    left = "a = [" + ", ".join(str(i) for i in range(1000)) + "]"
+    right = "a = [" + ", ".join(str(i * 3) for i in range(1000)) + "]"
+    left_ranges, right_ranges = IntralineDiffer(max_line_length=100).diff_lines(left, right)
+    assert len(left_ranges) == len(right_ranges) == 1
+
+
+def test_minified_line_keeps_precise_range():
+    """Test if a small change inside a huge word is found by stripping the common parts."""
+    left = "x" * 10_000 + "a" + "y" * 10_000
+    right = "x" * 10_000 + "b" + "y" * 10_000
+    assert IntralineDiffer(max_line_length=100).diff_lines(left, right) == ([(10_000, 10_001)], [(10_000, 10_001)])
+
+
+def test_results_are_cached():
+    """Test if a line pair is diffed once, within the cache size."""
+    differ = IntralineDiffer(cache_size=1)
+    first = differ.diff_lines("a b", "a c")
+    assert differ.diff_lines("a b", "a c") is first
+    differ.diff_lines("d", "e")
+    assert differ.diff_lines("a b", "a c") is not first
+
+
+def test_paired_line():
+    """Test if lines of replaced hunks are paired in order, within the pair limit."""
+    differ = IntralineDiffer(max_pairs=2)
+    assert differ.paired_line(('replace', 2, 4, 5, 8), 0, 3) == 6
+    assert differ.paired_line(('replace', 2, 4, 5, 8), 1, 6) == 3
+    assert differ.paired_line(('replace', 2, 4, 5, 8), 1, 7) is None
+    assert differ.paired_line(('replace', 0, 3, 0, 3), 0, 0) is None
+    assert differ.paired_line(('delete', 2, 4, 5, 5), 0, 2) is None
+
+
+def test_unknown_granularity():
+    """Test if unknown granularities are rejected."""
+    with pytest.raises(ValueError):
+        IntralineDiffer("line")
@@ -0,0 +1,74 @@
+import sys
+
+import pytest
+from pygments.lexers.data import JsonLexer, YamlLexer
+
+from app.core.lexer_registry import LexerRegistry
+
+
+def test_shared_lexer_per_language():
+    """Test if a language gets one lexer, whatever alias is used."""
+    registry = LexerRegistry()
+    assert registry.get_lexer("python") is registry.get_lexer("py")
+    assert registry.get_lexer("go") is registry.get_lexer("golang")
+    assert registry.get_lexer("yaml") is not registry.get_lexer("json")
+
+
+def test_language_for_filename():
+    """Test if files are matched by extension, including less common languages."""
+    registry = LexerRegistry()
+    assert registry.language_for_filename("config/app.yml") == "yaml"
+    assert registry.language_for_filename("schema.SQL") == "sql"
+    assert registry.language_for_filename("main.go") == "go"
+    assert registry.language_for_filename("Dockerfile") == "docker"
+    assert registry.language_for_filename("notes.unknown-extension") is None
+    assert isinstance(registry.get_lexer(registry.language_for_filename("data.json")).lexer, JsonLexer)
+
+
+def test_language_for_mimetype():
+    """Test if MIME types are resolved, ignoring parameters."""
+    registry = LexerRegistry()
+    assert registry.language_for_mimetype("application/json; charset=utf-8") == "json"
+    assert registry.language_for_mimetype("text/x-rust") == "rust"
+    assert registry.language_for_mimetype("application/x-unknown") is None
+
+
+@pytest.mark.parametrize("content, language", [
+    ("#!/usr/bin/env python3\nprint(1)", "python"),
+    ("#!/bin/bash\necho hi", "bash"),
+    ('{"key": [1, 2]}', "json"),
+    ("SELECT id FROM users;", "sql"),
+    ("package main\n\nfunc main() {}", "go"),
+    ("---\nkey: value", "yaml"),
+    ("with open(path) as file:\n    pass", None),
+    ("def main():\n    pass", None),
+])
+def test_language_for_content(content, language):
+    """Test if the content sniffing recognizes the common languages."""
+    assert LexerRegistry().language_for_content(content) == language
+
+
+def test_resolve_order():
+    """Test if explicit languages win over file names, MIME types and content."""
+    registry = LexerRegistry()
+    assert registry.resolve("yml", filename="a.sql") == "yaml"
+    assert registry.resolve(filename="a.sql", content="{}") == "sql"
+    assert registry.resolve(filename="a.unknown-extension", content="{}") == "json"
+    assert registry.resolve(content="x = 1") == "python"
+    assert isinstance(registry.get_lexer(registry.resolve(mimetype="text/x-yaml")).lexer, YamlLexer)
+
+
+def test_unknown_language():
+    """Test if unknown languages are rejected."""
+    with pytest.raises(ValueError):
+        LexerRegistry().get_lexer("no-such-language")
+
+
+def test_lexer_modules_are_imported_lazily():
+    """Test if resolving a language does not import its lexer module."""
+    sys.modules.pop("pygments.lexers.go", None)
+    registry = LexerRegistry()
+    assert registry.resolve(filename="main.go") == "go"
+    assert "pygments.lexers.go" not in sys.modules
+    registry.get_lexer("go")
+    assert "pygments.lexers.go" in sys.modules
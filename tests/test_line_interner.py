@@ -0,0 +1,94 @@
+import pickle
+import random
+from array import array
+
+import pytest
+
+from app.core.diff_engines import DIFF_ENGINES, get_diff_engine
+from app.core.line_interner import InterningEngine, LineInterner, common_prefix, common_suffix
+
+
+def test_intern():
+    """Test if equal lines share an ID and distinct lines get consecutive IDs."""
+    interner = LineInterner()
+    assert interner.intern_lines(["a", "b", "a", "c"]) == array('i', [0, 1, 0, 2])
+    assert interner.intern("b") == 1
+    assert interner.intern("d") == 3
+    assert len(interner) == 4
+    interner.clear()
+    assert interner.intern("d") == 0
+
+
+def test_intern_normalized():
+    """Test if whitespace and case can be ignored."""
+    interner = LineInterner(ignore_whitespace=True, ignore_case=True)
+    ids = interner.intern_lines(["x = 1", "  X=1\t", "x = 2"])
+    assert ids[0] == ids[1] != ids[2]
+    assert interner.intern("x =2") == ids[2]
+    assert LineInterner(ignore_case=True).normalize(" Straße ") == " strasse "
+
+
+def test_common_prefix_and_suffix():
+    """Test if common ends are measured without overlapping."""
+    assert common_prefix([1, 2, 3, 4], [1, 2, 5]) == 2
+    assert common_suffix([1, 2, 3, 4], [9, 3, 4]) == 2
+    assert common_suffix("aaa", "aa", common_prefix("aaa", "aa")) == 0
+    assert common_prefix("", "abc") == 0
+
+
+@pytest.mark.parametrize("name", sorted(DIFF_ENGINES))
+def test_interning_engine_matches_engine(name):
+    """Test if the opcodes found on interned, trimmed lines cover both documents."""
+    interning = InterningEngine(get_diff_engine(name))
+    rng = random.Random(name)
+    for _ in range(200):
+        a = [rng.choice("abcde") for _ in range(rng.randrange(12))]
+        b = [rng.choice("abcde") for _ in range(rng.randrange(12))]
+        opcodes = interning.get_opcodes(a, b)
+        i = j = equal = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            assert (i1, j1) == (i, j)
+            if tag == 'equal':
+                assert a[i1:i2] == b[j1:j2]
+                equal += i2 - i1
+            i, j = i2, j2
+        assert (i, j) == (len(a), len(b))
+        assert sum(size for _, _, size in interning.get_matches(a, b)) == equal
+
+
+def test_interning_engine_trims_common_ends():
+    """Test if only the middle of the documents reaches the wrapped engine."""
+    class Recorder:
+        name = "recorder"
+
+        def get_opcodes(self, a, b):
+            self.seen = (list(a), list(b))
+            return get_diff_engine("difflib").get_opcodes(a, b)
+
+    recorder = Recorder()
+    engine = InterningEngine(recorder)
+    a = ["head", "x", "tail", "end"]
+    b = ["head", "y", "z", "tail", "end"]
+    assert engine.get_opcodes(a, b) == [
+        ('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 3), ('equal', 2, 4, 3, 5)]
+    assert len(recorder.seen[0]) == 1 and len(recorder.seen[1]) == 2
+    assert engine.get_opcodes(a, a) == [('equal', 0, 4, 0, 4)]
+
+
+def test_interning_engine_ignore_whitespace():
+    """Test if lines differing only in whitespace are equal when asked to."""
+    a, b = ["if x:", "    return 1"], ["if  x:", "\treturn 1"]
+    assert InterningEngine(get_diff_engine("myers")).get_opcodes(a, b) == [('replace', 0, 2, 0, 2)]
+    assert InterningEngine(get_diff_engine("myers"), ignore_whitespace=True).get_opcodes(a, b) == [
+        ('equal', 0, 2, 0, 2)]
+
+
+def test_interning_engine_ids_and_pickle():
+    """Test if arrays of IDs are diffed as they are and the interner is not pickled."""
+    engine = InterningEngine(get_diff_engine("histogram"))
+    a, b = engine.interner.intern_lines(["a", "b"]), engine.interner.intern_lines(["a", "c"])
+    assert engine.get_opcodes(a, b) == [('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2)]
+    copy = pickle.loads(pickle.dumps(engine))
+    assert len(copy.interner) == 0
+    assert copy.name == "histogram"
+    assert copy.get_opcodes(a, b) == engine.get_opcodes(a, b)
@@ -0,0 +1,84 @@
+from app.core.line_map import LineMap
+
+# a b [c -> X Y Z] d [e deleted] f g [Q inserted] h
+OPCODES = [
+    ('equal', 0, 2, 0, 2),
+    ('replace', 2, 3, 2, 5),
+    ('equal', 3, 4, 5, 6),
+    ('delete', 4, 5, 6, 6),
+    ('equal', 5, 7, 6, 8),
+    ('insert', 7, 7, 8, 9),
+    ('equal', 7, 8, 9, 10),
+]
+
+
+def test_map_equal_lines():
+    """Test if lines outside hunks map to their counterpart."""
+    line_map = LineMap(OPCODES)
+    assert [line_map.map_line(0, line) for line in (0, 1, 3, 5, 6, 7)] == [0, 1, 5, 6, 7, 9]
+    assert [line_map.map_line(1, line) for line in (0, 5, 6, 9)] == [0, 3, 5, 7]
+
+
+def test_map_inside_hunks():
+    """Test if positions inside a hunk are mapped proportionally."""
+    line_map = LineMap(OPCODES)
+    assert line_map.map_line(0, 2) == 2
+    assert line_map.map_line(0, 2.5) == 3.5
+    assert line_map.map_line(1, 3) == 2 + 1 / 3
+    # Deleted and inserted lines collapse onto the insertion point
+    assert line_map.map_line(0, 4) == 6
+    assert line_map.map_line(1, 8) == 7
+
+
+def test_no_differences():
+    """Test if a diff without hunks maps every line to itself."""
+    assert LineMap([('equal', 0, 5, 0, 5)]).map_line(0, 3) == 3
+    assert LineMap([]).map_line(1, 7.5) == 7.5
+
+
+def test_hunks_between():
+    """Test if the hunks touching a range of lines are found, including insertion points."""
+    line_map = LineMap(OPCODES)
+    assert line_map.hunks_between(0, 0, 1) == []
+    assert line_map.hunks_between(0, 0, 3) == [('replace', 2, 3, 2, 5)]
+    assert line_map.hunks_between(0, 4, 7) == [('delete', 4, 5, 6, 6), ('insert', 7, 7, 8, 9)]
+    assert line_map.hunks_between(1, 6, 6) == [('delete', 4, 5, 6, 6)]
+
+
+def test_bounds():
+    """Test if the hunk bounds of each side are kept in order."""
+    line_map = LineMap(OPCODES)
+    assert list(line_map.bounds(0)[0]) == [2, 4, 7]
+    assert list(line_map.bounds(1)[1]) == [5, 6, 9]
+
+
+def test_nearest_hunk():
+    """Test if a line finds the hunk containing it, else the closest one."""
+    line_map = LineMap(OPCODES)
+    assert line_map.nearest_hunk(0, 0) == 0
+    assert line_map.nearest_hunk(0, 2) == 0
+    assert line_map.nearest_hunk(0, 3) == 0
+    assert line_map.nearest_hunk(0, 4.5) == 1
+    assert line_map.nearest_hunk(0, 6.5) == 2
+    assert line_map.nearest_hunk(1, 100) == 2
+    assert LineMap([]).nearest_hunk(0, 3) is None
+
+
+def test_hunk_at():
+    """Test if the hunk containing a line is found, including insertion points."""
+    line_map = LineMap(OPCODES)
+    assert [line_map.hunk_at(0, line) for line in range(9)] == [None, None, 0, None, 1, None, None, 2, None]
+    assert line_map.hunk_at(1, 4) == 0
+    assert line_map.hunk_at(1, 6) == 1
+
+
+def test_next_and_previous_hunk():
+    """Test if hunks are stepped through in order from any line."""
+    line_map = LineMap(OPCODES)
+    assert line_map.next_hunk(0, 0) == 0
+    assert line_map.next_hunk(0, 2) == 1
+    assert line_map.next_hunk(0, 7) is None
+    assert line_map.previous_hunk(0, 8) == 2
+    assert line_map.previous_hunk(0, 4) == 0
+    assert line_map.previous_hunk(0, 2) is None
+    assert LineMap([]).next_hunk(0, 0) is None
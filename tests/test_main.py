@@ -0,0 +1,105 @@
+import io
+import json
+
+import pytest
+
+from app.__main__ import main, parse_arguments, write_diff
+from app.core.tracing import default_tracer, set_default_tracer
+
+
+def test_parse_arguments(tmp_path):
+    """Test if two files and the options are accepted."""
+    left, right = tmp_path / "a.py", tmp_path / "b.py"
+    left.write_text("a")
+    right.write_text("b")
+    arguments = parse_arguments([str(left), str(right), "--diff-engine", "myers"])
+    assert (arguments.left, arguments.right) == (str(left), str(right))
+    assert arguments.diff_engine == "myers"
+    assert arguments.language is None
+    assert parse_arguments(["-", str(right)]).left == "-"
+
+
+@pytest.mark.parametrize("argv", [["-", "-"], ["missing.py", "-"], ["only_one.py"]])
+def test_parse_arguments_errors(argv):
+    """Test if unusable command lines are rejected."""
+    with pytest.raises(SystemExit):
+        parse_arguments(argv)
+
+
+def test_parse_arguments_directories(tmp_path):
+    """Test if two directories are accepted, but not a directory and a file."""
+    (tmp_path / "left").mkdir()
+    (tmp_path / "right").mkdir()
+    (tmp_path / "file.py").write_text("a")
+    assert parse_arguments([str(tmp_path / "left"), str(tmp_path / "right")]).right == str(tmp_path / "right")
+    with pytest.raises(SystemExit):
+        parse_arguments([str(tmp_path / "left"), str(tmp_path / "file.py")])
+
+
+def test_write_unified_diff(tmp_path):
+    """Test if a unified diff is written, with exit status 1 for different files and 0 for equal ones."""
+    left, right = tmp_path / "a.py", tmp_path / "b.py"
+    left.write_text("x = 1\ny = 2\n")
+    right.write_text("x = 1\ny = 3\n")
+    output = io.StringIO()
+    assert write_diff(parse_arguments([str(left), str(right), "--format", "unified"]), output) == 1
+    assert output.getvalue().splitlines()[2:] == ["@@ -1,2 +1,2 @@", " x = 1", "-y = 2", "+y = 3"]
+    assert write_diff(parse_arguments([str(left), str(left), "--format", "unified"]), io.StringIO()) == 0
+
+
+def test_write_json_hunks(tmp_path):
+    """Test if JSON hunks are written one per line, with token spans on request."""
+    left, right = tmp_path / "a.py", tmp_path / "b.py"
+    left.write_text("A\nb\nc\n")
+    right.write_text("a\nb\nC\n")
+    output = io.StringIO()
+    arguments = parse_arguments([str(left), str(right), "--format", "json", "--tokens", "--ignore-case"])
+    assert write_diff(arguments, output) == 0
+    assert output.getvalue() == ""
+    write_diff(parse_arguments([str(left), str(right), "--format", "json", "--tokens"]), output)
+    hunks = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(hunk["left"]["start"], hunk["right"]["lines"]) for hunk in hunks] == [(0, ["a"]), (2, ["C"])]
+    assert all(hunk["left"]["tokens"] for hunk in hunks)
+
+
+def test_write_semantic_diff(tmp_path):
+    """Test if --semantic compares Python files function by function."""
+    left, right = tmp_path / "a.py", tmp_path / "b.py"
+    left.write_text("def f():\n    x = 1\n    y = 2\ndef g():\n    pass\n")
+    right.write_text("def f():\n    pass\ndef g():\n    x = 1\n    y = 2\n")
+    output = io.StringIO()
+    write_diff(parse_arguments([str(left), str(right), "--format", "json", "--diff-engine", "myers", "--semantic"]),
+               output)
+    hunks = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(hunk["left"]["lines"], hunk["right"]["lines"]) for hunk in hunks] == [
+        (["    x = 1", "    y = 2"], ["    pass"]), (["    pass"], ["    x = 1", "    y = 2"])]
+
+
+def test_text_output_of_directories(tmp_path):
+    """Test if text output is refused for directories."""
+    (tmp_path / "left").mkdir()
+    (tmp_path / "right").mkdir()
+    with pytest.raises(SystemExit):
+        parse_arguments([str(tmp_path / "left"), str(tmp_path / "right"), "--format", "json"])
+
+
+def test_trace_file(tmp_path):
+    """Test if --trace writes the timings of a text comparison as a Chrome trace."""
+    left, right = tmp_path / "a.py", tmp_path / "b.py"
+    left.write_text("a\nb\n")
+    right.write_text("a\nc\n")
+    trace = tmp_path / "trace.json"
+    previous = default_tracer()
+    try:
+        assert main([str(left), str(right), "--format", "unified", "--no-cache", "--trace", str(trace)]) == 1
+    finally:
+        set_default_tracer(previous)
+    assert "TextComparison.diff" in [event["name"] for event in json.loads(trace.read_text())["traceEvents"]]
+
+
+def test_overlay_needs_window(tmp_path):
+    """Test if the overlay is refused for text output."""
+    left = tmp_path / "a.py"
+    left.write_text("a")
+    with pytest.raises(SystemExit):
+        parse_arguments([str(left), str(left), "--format", "json", "--overlay"])
@@ -0,0 +1,96 @@
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from app.core.three_way_merge import TAKE_BOTH, TAKE_LEFT, TAKE_RIGHT
+from app.widgets.merge_widget import MergeWidget
+
+BASE = "\n".join(f"value_{index} = {index}" for index in range(40))
+
+
+@pytest.fixture(scope="module")
+def app():
+    """Fixture for creating the application."""
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def widget(qtbot, app):
+    """A merge with a change on the left, a change on the right and two conflicts."""
+    left = BASE.replace("value_3 = 3", "value_3 = 'left'").replace("value_10 = 10", "left_10 = 10")
+    left = left.replace("value_30 = 30", "value_30 = 'left'")
+    right = BASE.replace("value_3 = 3", "value_3 = 'right'").replace("value_20 = 20", "right_20 = 20")
+    right = right.replace("value_30 = 30", "value_30 = 'right'")
+    widget = MergeWidget(BASE, left, right, filename="merge.py")
+    qtbot.addWidget(widget)
+    return widget
+
+
+def test_result_shows_the_merge(widget):
+    """Test if the result editor shows the merged text and the conflicts are counted."""
+    assert widget.merge is not None and not widget.is_merging()
+    assert widget.merged_text() == widget.merge.merged_text()
+    assert widget.merged_text().count("<<<<<<< left") == 2
+    assert "left_10 = 10" in widget.merged_text() and "right_20 = 20" in widget.merged_text()
+    assert widget.conflict_label.text() == "2 of 2 conflicts left"
+    status = widget.result_text_edit.diff_overlay.status
+    assert len(status) == widget.result_text_edit.blockCount()
+    assert status[3] == widget.CONFLICTING and status[0] == 0
+
+
+def test_resolve_replaces_only_the_hunk(widget):
+    """Test if resolving conflicts keeps the editor in step with the merge and the other blocks intact."""
+    document = widget.result_text_edit.document()
+    last_block = document.lastBlock()
+    resolved = []
+    widget.hunk_resolved.connect(resolved.append)
+    first, second = widget.merge.conflicts()
+    widget.resolve(first, TAKE_BOTH)
+    assert widget.merged_text() == widget.merge.merged_text()
+    assert len(widget.result_text_edit.diff_overlay.status) == document.blockCount()
+    assert document.lastBlock() == last_block
+    widget.resolve(second, TAKE_RIGHT)
+    widget.resolve(first, None)
+    widget.resolve(first, TAKE_LEFT)
+    assert resolved == [first, second, first, first]
+    assert widget.merge.conflicts() == []
+    assert widget.merged_text() == widget.merge.merged_text()
+    assert "value_3 = 'left'" in widget.merged_text() and "value_30 = 'right'" in widget.merged_text()
+    assert widget.conflict_label.text() == "0 of 2 conflicts left"
+    assert widget.CONFLICTING not in widget.result_text_edit.diff_overlay.status
+
+
+def test_hunk_at_the_end(qtbot, app):
+    """Test if a conflict on the last line is replaced without leaving a line break behind."""
+    widget = MergeWidget("a\nb", "a\nleft", "a\nright")
+    qtbot.addWidget(widget)
+    widget.resolve(0, TAKE_LEFT)
+    assert widget.merged_text() == "a\nleft"
+    widget.resolve(0, None)
+    assert widget.merged_text() == widget.merge.merged_text()
+
+
+def test_conflict_navigation(widget):
+    """Test if the conflicts are visited in order and resolved from the cursor."""
+    first, second = widget.merge.conflicts()
+    assert widget.next_conflict() == first
+    assert widget.current_hunk() == first
+    assert widget.left_text_edit.textCursor().blockNumber() == widget.merge.hunks[first].left[0]
+    assert widget.next_conflict() == second
+    assert widget.next_conflict() is None
+    assert widget.previous_conflict() == first
+    assert widget.resolve_current(TAKE_RIGHT) == first
+    assert widget.merge.conflicts() == [second]
+
+
+def test_large_merge_is_asynchronous(qtbot, app):
+    """Test if large texts are diffed in worker threads and merged once both are done."""
+    base = "\n".join(f"line {index}" for index in range(4000))
+    left = base.replace("line 1000\n", "left 1000\n")
+    right = base.replace("line 1000\n", "right 1000\n").replace("line 3000\n", "right 3000\n")
+    widget = MergeWidget(base, left, right)
+    qtbot.addWidget(widget)
+    assert widget.is_merging() and widget.conflict_label.text() == "Merging..."
+    qtbot.waitUntil(lambda: not widget.is_merging(), timeout=10000)
+    assert widget.merge.conflicts() == [0]
+    assert len(widget.merge.hunks) == 2
+    assert widget.merged_text() == widget.merge.merged_text()
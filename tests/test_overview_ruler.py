@@ -0,0 +1,77 @@
+import pytest
+from PySide6.QtCore import QPoint, Qt
+from PySide6.QtWidgets import QApplication
+
+from app.core.line_map import LineMap
+from app.widgets.code_editor import CodeEditor
+from app.widgets.overview_ruler import OverviewRuler, _marker_spans
+
+# 1000 lines with a hunk at line 100 and an insertion point at line 900
+OPCODES = [
+    ('equal', 0, 100, 0, 100),
+    ('replace', 100, 110, 100, 105),
+    ('equal', 110, 900, 105, 895),
+    ('insert', 900, 900, 895, 900),
+    ('equal', 900, 1000, 900, 1000),
+]
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Fixture to create a QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+@pytest.fixture
+def code_editor(qtbot, app):
+    """Fixture to create a CodeEditor showing the left side of OPCODES in its ruler."""
+    editor = CodeEditor()
+    qtbot.addWidget(editor)
+    editor.setPlainText("\n".join(f"line {index}" for index in range(1000)))
+    line_map = LineMap(OPCODES)
+    editor.show_overview_ruler(lambda: line_map, 0)
+    editor.resize(400, 500)
+    editor.show()
+    qtbot.waitExposed(editor)
+    return editor
+
+
+def test_marker_spans():
+    """Test if scaled hunks are merged when they touch and kept visible when tiny."""
+    assert _marker_spans([10, 12, 50], [11, 13, 50], 1.0, 100) == [(10, 14), (50, 52)]
+    assert _marker_spans([0, 1, 2], [1, 2, 3], 0.1, 100) == [(0, 2)]
+    assert _marker_spans([100], [100], 1.0, 100) == [(98, 100)]
+
+
+def test_ruler_placement(code_editor):
+    """Test if the ruler sits between the text and the scroll bar."""
+    ruler: OverviewRuler = code_editor.overview_ruler
+    assert ruler.isVisible()
+    assert ruler.width() == OverviewRuler.WIDTH
+    assert ruler.geometry().left() == code_editor.viewport().geometry().right() + 1
+
+
+def test_ruler_paints_hunks(code_editor):
+    """Test if the hunk markers are drawn at the scaled position of the hunks."""
+    ruler = code_editor.overview_ruler
+    image = ruler.grab().toImage()
+    x = ruler.width() // 2
+    marked = [y for y in range(image.height()) if image.pixelColor(x, y) == ruler.color]
+    scale = ruler.height() / 1000
+    assert int(100 * scale) in marked
+    assert int(900 * scale) in marked
+    assert int(500 * scale) not in marked
+
+
+def test_click_jumps_to_nearest_hunk(code_editor, qtbot):
+    """Test if clicking the ruler moves the cursor to the closest hunk."""
+    ruler = code_editor.overview_ruler
+    qtbot.mouseClick(ruler, Qt.MouseButton.LeftButton, pos=QPoint(ruler.width() // 2, int(ruler.height() * 0.8)))
+    assert code_editor.textCursor().blockNumber() == 900
+    first, last = code_editor.visible_blocks()
+    assert first <= 900 <= last
+    qtbot.mouseClick(ruler, Qt.MouseButton.LeftButton, pos=QPoint(ruler.width() // 2, 1))
+    assert code_editor.textCursor().blockNumber() == 100
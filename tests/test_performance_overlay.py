@@ -0,0 +1,57 @@
+import pytest
+from PySide6.QtWidgets import QApplication, QWidget
+
+from app.core.tracing import Tracer, default_tracer, set_default_tracer
+from app.widgets.code_compare_widget import CodeCompareWidget
+from app.widgets.performance_overlay import PerformanceOverlay
+
+
+@pytest.fixture(scope="module")
+def app():
+    """Fixture for creating the application."""
+    return QApplication.instance() or QApplication([])
+
+
+def test_overlay_shows_timings(qtbot, app):
+    """Test if the overlay enables its tracer and lists the spans it knows."""
+    parent = QWidget()
+    parent.resize(400, 300)
+    qtbot.addWidget(parent)
+    tracer = Tracer()
+    overlay = PerformanceOverlay(parent, tracer)
+    overlay.show()
+    assert tracer.enabled
+    assert overlay.text() == "no timings yet"
+
+    tracer.add_span("CodeEditor.paintEvent", "paint", 0, 2_000_000)
+    tracer.add_span("TextComparison.diff", "diff", 0, 40_000_000)
+    tracer.add_span("unlisted", "diff", 0, 1)
+    overlay.refresh()
+    lines = overlay.text().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("frame") and "2.00 ms" in lines[0]
+    assert lines[1].startswith("diff") and "40.00 ms" in lines[1]
+    assert overlay.geometry().right() <= parent.width()
+
+
+def test_overlay_over_comparison(qtbot, app):
+    """Test if diffing and painting a comparison shows up in the overlay."""
+    previous = default_tracer()
+    set_default_tracer(Tracer())
+    try:
+        widget = CodeCompareWidget("a\nb\nc", "a\nx\nc")
+        qtbot.addWidget(widget)
+        overlay = PerformanceOverlay(widget)
+        overlay.show()
+        widget.show()
+        qtbot.waitExposed(widget)
+        widget.highlight_differences()
+        widget.left_text_edit.viewport().update()
+        qtbot.wait(20)
+        overlay.refresh()
+        labels = [line.split()[0] for line in overlay.text().splitlines()]
+        assert "frame" in labels and "diff" in labels and "apply" in labels
+        overlay.hide()
+        assert not overlay.isVisible()
+    finally:
+        set_default_tracer(previous)
@@ -56,3 +56,39 @@ def test_get_format(highlighter):
     assert char_format.foreground().color().name() == "#ff79c6"
     assert char_format.fontWeight() == QFont.Bold
     assert char_format.fontItalic() is True
+
+
+def test_multiline_string_highlighted(highlighter, text_document):
+    """Test if lines inside a triple-quoted string are highlighted as strings."""
+    text_document.setPlainText('x = """\ndef inside():\n"""\ndef outside():')
+    highlighter.rehighlight()
+    inside = text_document.findBlockByNumber(1)
+    outside = text_document.findBlockByNumber(3)
+    inside_colors = {fmt.format.foreground().color().name() for fmt in inside.layout().formats()}
+    outside_colors = {fmt.format.foreground().color().name() for fmt in outside.layout().formats()}
+    assert inside_colors == {"#f1fa8c"}
+    assert "#ff79c6" in outside_colors
+    assert inside.userState() != outside.userState()
+
+
+def test_set_language():
+    """Test if switching the language swaps the lexer and highlights again."""
+    document = QTextDocument('SELECT name FROM users')
+    highlighter = PygmentsHighlighter(document)
+    highlighter.set_language("sql")
+    assert highlighter.language == "sql"
+    assert highlighter.lexer.name == "SQL"
+    formats = document.firstBlock().layout().formats()
+    assert any(fmt.format.fontWeight() == QFont.Bold for fmt in formats)
+
+
+def test_lazy_highlights_only_requested_blocks():
+    """Test if a lazy highlighter leaves blocks alone until they are requested."""
+    document = QTextDocument("\n".join(f"value_{i} = 'text'" for i in range(300)))
+    highlighter = PygmentsHighlighter(document, lazy=True)
+    highlighter.highlight_blocks(10, 20)
+    states = [document.findBlockByNumber(i).userState() for i in range(300)]
+    assert all(state != PygmentsHighlighter.UNHIGHLIGHTED for state in states[10:20])
+    assert set(states[:10] + states[20:]) == {PygmentsHighlighter.UNHIGHLIGHTED}
+    assert document.findBlockByNumber(15).layout().formats()
+    assert not document.findBlockByNumber(25).layout().formats()
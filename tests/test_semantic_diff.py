@@ -0,0 +1,133 @@
+import ast
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.diff_engines import MyersEngine
+from app.core.line_interner import InterningEngine
+from app.core.semantic_diff import (CLASS, FUNCTION, ParseCache, SemanticEngine, _definitions, match_definitions,
+                                    top_level_blocks)
+from app.core.text_compare import TextComparison
+
+SOURCE = '''import os
+
+
+@decorator
+def first(path):
+    return os.path.exists(path)
+
+
+TEMPLATE = """
+def not_a_function():
+class NotAClass:
+"""
+
+if os.name == "nt":
+    SEPARATOR = "\\\\"
+else:
+    SEPARATOR = "/"
+
+
+class Store:
+    def load(self):
+        return 1
+
+    async def save(self):
+        return 2
+'''.split("\n")
+
+
+def summary(definitions):
+    """Returns the kind, name and lines of definitions, with the ones they contain."""
+    return [(definition.kind, definition.name, definition.start, definition.end, summary(definition.children))
+            for definition in definitions]
+
+
+def test_top_level_blocks():
+    """Test if statements start blocks, but not decorated definitions, else branches or comments."""
+    starts = top_level_blocks(SOURCE)
+    assert starts[:3] == [0, 3, 8]
+    assert SOURCE.index("else:") not in starts
+    assert SOURCE.index("class NotAClass:") in starts
+
+
+def test_definitions_match_a_whole_parse():
+    """Test if parsing block by block finds what parsing the whole source finds."""
+    definitions = ParseCache().definitions(SOURCE)
+    assert summary(definitions) == summary(_definitions(ast.parse("\n".join(SOURCE)).body))
+    assert [(definition.kind, definition.name) for definition in definitions] == [(FUNCTION, "first"),
+                                                                                  (CLASS, "Store")]
+    assert definitions[0].start == 3
+    assert [child.name for child in definitions[1].children] == ["load", "save"]
+
+
+def test_invalid_source():
+    """Test if a source that is not valid Python has no definitions."""
+    assert ParseCache().definitions(["def broken(:", "    pass"]) is None
+
+
+def test_only_changed_blocks_are_parsed_again():
+    """Test if blocks are cached by content, so an edit only parses the blocks it touched."""
+    cache = ParseCache()
+    cache.definitions(SOURCE)
+    parsed = cache.parses
+    assert cache.definitions(SOURCE) is not None and cache.parses == parsed
+    edited = list(SOURCE)
+    edited[SOURCE.index("        return 1")] = "        return 10"
+    cache.definitions(edited)
+    assert cache.parses == parsed + 1
+
+
+def test_parse_cache_shared_by_threads():
+    """Test if threads sharing a small cache, evicting each other's blocks, all get the right definitions."""
+    cache = ParseCache(max_entries=4)
+    sources = [[f"def f{index}_{block}(): pass" for block in range(10)] for index in range(8)]
+    expected = [summary(ParseCache(max_entries=0).definitions(source)) for source in sources]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda index: [summary(cache.definitions(sources[index])) for _ in range(50)],
+                                    range(8)))
+    assert all(result == [expected[index]] * 50 for index, result in enumerate(results))
+
+
+def test_match_definitions_keeps_order():
+    """Test if definitions are paired by kind and name, dropping the pairs that cross."""
+    left = ParseCache().definitions(["def a(): pass", "def b(): pass", "def c(): pass", "class a: pass"])
+    right = ParseCache().definitions(["def c(): pass", "def a(): pass", "def b(): pass", "def a(): pass"])
+    assert [(pair[0].name, pair[1].start) for pair in match_definitions(left, right)] == [("a", 1), ("b", 2)]
+
+
+def test_bodies_are_diffed_separately():
+    """Test if a body is compared with the old body of the same function, not with similar lines elsewhere."""
+    left = ["def f():", "    x = 1", "    y = 2", "    z = 3", "def g():", "    pass"]
+    right = ["def f():", "    pass", "def g():", "    x = 1", "    y = 2", "    z = 3"]
+    engine = InterningEngine(MyersEngine())
+    assert ('equal', 1, 4, 3, 6) in engine.get_opcodes(left, right)
+    opcodes = SemanticEngine(engine, left, right, ParseCache()).get_opcodes(left, right)
+    assert opcodes == [('equal', 0, 1, 0, 1), ('replace', 1, 4, 1, 2), ('equal', 4, 5, 2, 3),
+                       ('replace', 5, 6, 3, 6)]
+
+
+def test_methods_are_matched_inside_classes():
+    """Test if the methods of a matched class are paired by name too, one of two swapped ones."""
+    left = ["class A:", "    def f(self):", "        return 1", "    def g(self):", "        return 2"]
+    right = ["class A:", "    def g(self):", "        return 2", "    def f(self):", "        return 1"]
+    engine = InterningEngine(MyersEngine())
+    opcodes = SemanticEngine(engine, left, right, ParseCache()).get_opcodes(left, right)
+    assert [opcode for opcode in opcodes if opcode[0] == 'equal'] == [('equal', 0, 1, 0, 1), ('equal', 3, 5, 1, 3)]
+
+
+def test_invalid_source_is_diffed_by_line():
+    """Test if sources that do not parse get the line diff."""
+    left, right = ["x = (", "1"], ["x = (", "2"]
+    engine = InterningEngine(MyersEngine())
+    assert SemanticEngine(engine, left, right, ParseCache()).get_opcodes(left, right) == engine.get_opcodes(left, right)
+
+
+def test_semantic_comparison():
+    """Test if a semantic comparison diffs definition by definition, on interned IDs too, under its own cache key."""
+    left = ["def f():", "    x = 1", "    y = 2", "def g():", "    pass"]
+    right = ["def f():", "    pass", "def g():", "    x = 1", "    y = 2"]
+    comparison = TextComparison("myers", semantic=True)
+    interner = comparison.diff_engine.interner
+    opcodes = comparison.diff(left, right, interner.intern_lines(left), interner.intern_lines(right))
+    assert opcodes == comparison.diff(left, right)
+    assert ('replace', 1, 3, 1, 2) in opcodes
+    assert comparison.cache_key(left, right) != TextComparison("myers").cache_key(left, right)
@@ -0,0 +1,96 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+from PySide6.QtCore import QEvent, QObject
+from PySide6.QtWidgets import QApplication
+
+from app.core.diff_cache import DiffCache
+from app.widgets.code_compare_widget import CodeCompareWidget
+
+# Budgets, several times what a development machine needs, so that only real regressions fail
+IMPORT_BUDGET_S: float = 1.5
+FIRST_PAINT_BUDGET_S: float = 1.5
+
+# Measures the import of a module in a fresh interpreter and lists the modules it must not load
+IMPORT_PROBE: str = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+@pytest.fixture(scope="module")
+def app():
+    """Fixture for creating the application."""
+    return QApplication.instance() or QApplication([])
+
+
+def probe_import(module, deferred):
+    """Returns the import time of a module in a new process and which of the deferred modules it loaded."""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, deferred=deferred)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def test_widget_import_budget():
+    """Test if importing the comparison widget is fast and leaves Pygments lexers and log files for later."""
+    result = probe_import("app.widgets.code_compare_widget", ("pygments.lexer", "logging.handlers"))
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET_S
+
+
+def test_command_line_import_budget():
+    """Test if the command line module imports neither Qt nor the Pygments lexers."""
+    result = probe_import("app.__main__", ("PySide6", "pygments.lexer", "logging.handlers"))
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET_S
+
+
+class PaintRecorder(QObject):
+    """Records when a widget is first painted."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_paint = None
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint and self.first_paint is None:
+            self.first_paint = time.perf_counter()
+        return False
+
+
+def test_first_paint_before_diff(qtbot, app):
+    """Test if a deferred diff runs after the first frame, which is painted within the budget."""
+    left = "\n".join(f"value_{index} = compute({index})" for index in range(3000))
+    right = left.replace("compute(1500)", "compare(1500)")
+    start = time.perf_counter()
+    widget = CodeCompareWidget(left, right, diff_cache=DiffCache(max_bytes=0), defer_diff=True)
+    qtbot.addWidget(widget)
+    recorder = PaintRecorder()
+    widget.left_text_edit.viewport().installEventFilter(recorder)
+    assert widget.is_diff_running()
+    assert widget.line_map().hunks == []
+    # Whether the first frame was painted when the differences were highlighted
+    painted_first = []
+    widget.differences_highlighted.connect(lambda: painted_first.append(recorder.first_paint is not None))
+
+    with qtbot.waitSignal(widget.differences_highlighted, timeout=10000):
+        widget.show()
+    assert painted_first == [True]
+    assert recorder.first_paint - start < FIRST_PAINT_BUDGET_S
+    assert len(widget.line_map().hunks) == 1
+    assert not widget.is_diff_running()
+
+
+def test_explicit_diff_cancels_deferral(qtbot, app):
+    """Test if highlighting the differences before the first frame does not diff again after it."""
+    widget = CodeCompareWidget("a\nb", "a\nc", defer_diff=True)
+    qtbot.addWidget(widget)
+    widget.highlight_differences()
+    assert not widget.is_diff_running()
+    assert len(widget.line_map().hunks) == 1
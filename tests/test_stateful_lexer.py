@@ -0,0 +1,74 @@
+from pygments.lexers import JsonLexer, PythonLexer
+from pygments.token import Token
+
+from app.core.stateful_lexer import ROOT_STATE, StatefulLexer
+
+
+def token_at(spans, index):
+    """Returns the token type of the span covering a character index."""
+    for start, length, token_type in spans:
+        if start <= index < start + length:
+            return token_type
+    return None
+
+
+def test_single_line_matches_pygments():
+    """Test if a self-contained line is tokenized like Pygments does."""
+    lexer = StatefulLexer(PythonLexer())
+    spans, state = lexer.tokenize_line("def f(x):  # comment")
+    assert state == ROOT_STATE
+    assert token_at(spans, 0) in Token.Keyword
+    assert token_at(spans, 4) in Token.Name.Function
+    assert token_at(spans, 11) in Token.Comment
+    assert sum(length for _, length, _ in spans) == len("def f(x):  # comment")
+
+
+def test_triple_quoted_string_spans_lines():
+    """Test if the state of an open triple-quoted string is carried to the next lines."""
+    lexer = StatefulLexer(PythonLexer())
+    _, state = lexer.tokenize_line('text = """first')
+    assert state != ROOT_STATE
+    spans, inner_state = lexer.tokenize_line("def not_a_function():", state)
+    assert inner_state == state
+    assert token_at(spans, 0) in Token.String
+    spans, final_state = lexer.tokenize_line('end"""', inner_state)
+    assert final_state == ROOT_STATE
+    assert token_at(spans, 0) in Token.String
+
+
+def test_results_are_cached():
+    """Test if tokenizing the same line in the same state reuses the cached result."""
+    lexer = StatefulLexer(PythonLexer())
+    first = lexer.tokenize_line("x = 1")
+    assert lexer.tokenize_line("x = 1") is first
+    lexer.clear_cache()
+    assert lexer.tokenize_line("x = 1") is not first
+
+
+def test_cache_is_bounded():
+    """Test if the cache evicts the least recently used line."""
+    lexer = StatefulLexer(PythonLexer(), cache_size=2)
+    first = lexer.tokenize_line("a")
+    lexer.tokenize_line("b")
+    lexer.tokenize_line("c")
+    assert lexer.tokenize_line("a") is not first
+
+
+def test_non_regex_lexer_falls_back_to_stateless():
+    """Test if lexers without a state stack are tokenized line by line."""
+    lexer = StatefulLexer(JsonLexer())
+    assert not lexer.stateful
+    spans, state = lexer.tokenize_line('{"key": 1}')
+    assert state == ROOT_STATE
+    assert token_at(spans, 1) in Token.Name.Tag
+
+
+def test_spans_are_compact():
+    """Test if the spans of a line are kept in an array and still read as (start, length, token type)."""
+    lexer = StatefulLexer(PythonLexer())
+    spans, _ = lexer.tokenize_line("x = 1")
+    assert len(spans) == len(list(spans)) == 5
+    assert spans[0] == (0, 1, Token.Name)
+    assert spans[-1][:2] == (4, 1)
+    assert spans.bounds.typecode == 'I'
+    assert spans == list(spans)
@@ -0,0 +1,113 @@
+import difflib
+import itertools
+import json
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from app.core.diff_cache import DiffCache
+from app.core.lexer_registry import default_registry
+from app.core.text_compare import TextComparison, group_opcodes
+
+
+@pytest.fixture
+def comparison():
+    """Fixture to create a comparison with the default options."""
+    return TextComparison("myers")
+
+
+def test_no_qt_imported():
+    """Test if the core can be used without importing Qt."""
+    code = "import sys, app.core.text_compare; sys.exit('PySide6' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_compare(comparison):
+    """Test if texts are split like documents and diffed."""
+    left, right, opcodes = comparison.compare("a\nb\n", "a\nc\n")
+    assert (left, right) == (["a", "b", ""], ["a", "c", ""])
+    assert opcodes == [('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2), ('equal', 2, 3, 2, 3)]
+
+
+def test_diff_cache():
+    """Test if a comparison made before is taken from the cache, and other options miss it."""
+    cache = DiffCache()
+    comparison = TextComparison("myers", cache=cache)
+    first = comparison.compare("a\nb\n", "a\nc\n")
+    assert comparison.compare("a\nb\n", "a\nc\n") == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    TextComparison("myers", ignore_case=True, cache=cache).compare("a\nb\n", "a\nc\n")
+    TextComparison("histogram", cache=cache).compare("a\nb\n", "a\nc\n")
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_hunks(comparison):
+    """Test if hunks carry the lines, the changed ranges and the token spans of both sides."""
+    left, right, opcodes = comparison.compare("x = 1\ny = 2\n", "x = 1\ny = 3\nz = 4\n")
+    hunks = list(comparison.hunks(left, right, opcodes, default_registry().get_lexer("python")))
+    assert len(hunks) == 1
+    hunk = json.loads(json.dumps(hunks[0]))
+    assert hunk["tag"] == "replace"
+    assert hunk["left"]["lines"] == ["y = 2"] and hunk["right"]["lines"] == ["y = 3", "z = 4"]
+    assert (hunk["left"]["start"], hunk["left"]["end"], hunk["right"]["start"], hunk["right"]["end"]) == (1, 2, 1, 3)
+    assert hunk["left"]["changes"] == [[[4, 5]]]
+    assert hunk["right"]["changes"] == [[[4, 5]], None]
+    assert [4, 1, "Token.Literal.Number.Integer"] in hunk["right"]["tokens"][1]
+
+
+def test_hunk_tokens_carry_state(comparison):
+    """Test if lines inside a multi-line string are lexed as string, even far from the hunk."""
+    left = 'text = """\nfirst\nsecond\n"""\n'
+    right = 'text = """\nfirst\nchanged\n"""\n'
+    hunk, = comparison.hunks(*comparison.compare(left, right), default_registry().get_lexer("python"))
+    assert all("String" in str(token_type) for _, _, token_type in hunk["right"]["tokens"][0])
+
+
+@pytest.mark.parametrize("left, right", [
+    ("a\nb\nc\n", "a\nB\nc\n"),
+    ("a\nb\n", "a\nb"),
+    ("a\nb", "a\nb\nc"),
+    ("", "new\n"),
+    ("\n".join(map(str, range(30))) + "\n", "\n".join(map(str, range(1, 31))) + "\n"),
+])
+def test_unified_diff_matches_difflib(comparison, left, right):
+    """Test if the unified diff is the one difflib writes for the same texts."""
+    lines = comparison.compare(left, right)
+    expected = [line if line.endswith("\n") else line + "\n"
+                for line in difflib.unified_diff(left.splitlines(True), right.splitlines(True), "a", "b")]
+    # difflib does not mark a missing final newline
+    assert [line for line in comparison.unified_diff(*lines) if not line.startswith("\\")] == expected
+
+
+def test_unified_diff_no_newline_marker(comparison):
+    """Test if a missing final newline makes the last lines differ and is marked."""
+    assert list(comparison.unified_diff(*comparison.compare("a\n", "a"))) == [
+        "--- a\n", "+++ b\n", "@@ -1 +1 @@\n", "-a\n", "+a\n", "\\ No newline at end of file\n"]
+    assert list(comparison.unified_diff(*comparison.compare("same", "same"))) == []
+
+
+TRAILING_NEWLINE_TEXTS = ["", "\n", "c", "c\n", "c\n\n", "x\nc\n", "c\n\nc", "\nc", "x\n\n\nc\n", "c\nx"]
+
+
+@pytest.mark.skipif(shutil.which("patch") is None, reason="patch is not installed")
+@pytest.mark.parametrize("engine", ["difflib", "myers", "histogram"])
+def test_unified_diff_applies(tmp_path, engine):
+    """Test if patch turns the left file into the right one with the unified diff, whatever the final newlines."""
+    comparison = TextComparison(engine)
+    for left, right in itertools.product(TRAILING_NEWLINE_TEXTS, repeat=2):
+        (tmp_path / "file").write_text(left)
+        (tmp_path / "diff").write_text("".join(comparison.unified_diff(*comparison.compare(left, right))))
+        if left != right:
+            subprocess.run(["patch", "-s", str(tmp_path / "file"), str(tmp_path / "diff")], check=True)
+        assert (tmp_path / "file").read_text() == right, (left, right)
+
+
+def test_group_opcodes():
+    """Test if hunks are grouped with the context difflib would use."""
+    a = [str(line) for line in range(40)]
+    b = a[:5] + ["new"] + a[6:30] + a[31:]
+    expected = list(difflib.SequenceMatcher(None, a, b).get_grouped_opcodes(2))
+    assert list(group_opcodes(difflib.SequenceMatcher(None, a, b).get_opcodes(), 2)) == expected
+    assert list(group_opcodes([('equal', 0, 5, 0, 5)])) == []
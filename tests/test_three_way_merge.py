@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from app.core.diff_engines import DIFF_ENGINES
+from app.core.three_way_merge import (CONFLICT, LEFT_CHANGE, RIGHT_CHANGE, SAME_CHANGE, TAKE_BASE, TAKE_BOTH,
+                                      TAKE_LEFT, TAKE_RIGHT, ThreeWayMerge)
+
+BASE = ["a", "b", "c", "d", "e", "f", "g"]
+
+
+def random_version(rng, base):
+    """Returns a copy of the base with a few lines replaced, deleted or inserted."""
+    lines = list(base)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(lines))
+        action = rng.choice(("replace", "delete", "insert"))
+        if action == "replace" and position < len(lines):
+            lines[position] = f"x{rng.randint(0, 3)}"
+        elif action == "delete" and position < len(lines) and len(lines) > 1:
+            del lines[position]
+        else:
+            lines.insert(position, f"y{rng.randint(0, 3)}")
+    return lines
+
+
+def test_kinds_of_hunks():
+    """Test if changes are classified by the side they come from."""
+    left = ["a", "B", "c", "d", "E", "f", "g"]
+    right = ["a", "b", "c", "d", "E", "f", "G"]
+    merge = ThreeWayMerge(BASE, left, right)
+    assert [hunk.kind for hunk in merge.hunks] == [LEFT_CHANGE, SAME_CHANGE, RIGHT_CHANGE]
+    assert merge.conflicts() == []
+    assert merge.result == ["a", "B", "c", "d", "E", "f", "G"]
+
+
+def test_conflict_markers():
+    """Test if different changes of the same lines conflict and are written as git does."""
+    merge = ThreeWayMerge(BASE, ["a", "L", "c", "d", "e", "f", "g"], ["a", "R", "c", "d", "e", "f", "g"],
+                          left_name="ours", right_name="theirs")
+    assert [hunk.kind for hunk in merge.hunks] == [CONFLICT]
+    assert merge.conflicts() == [0]
+    assert merge.result == ["a", "<<<<<<< ours", "L", "=======", "R", ">>>>>>> theirs", "c", "d", "e", "f", "g"]
+    assert merge.hunk_at(3) == 0 and merge.hunk_at(6) is None
+
+
+def test_touching_changes_conflict():
+    """Test if changes of adjacent base lines are grouped into one conflict."""
+    merge = ThreeWayMerge(BASE, ["a", "B", "c", "d", "e", "f", "g"], ["a", "b", "C", "d", "e", "f", "g"])
+    assert len(merge.hunks) == 1
+    hunk = merge.hunks[0]
+    assert (hunk.kind, hunk.base, hunk.left, hunk.right) == (CONFLICT, (1, 3), (1, 3), (1, 3))
+
+
+def test_resolve_shifts_later_hunks():
+    """Test if resolving a hunk replaces only its lines and moves the hunks after it."""
+    merge = ThreeWayMerge(BASE, ["a", "L", "c", "d", "e", "F", "g"], ["a", "R", "c", "d", "e", "f", "g"])
+    assert merge.hunks[1].result == (9, 10)
+    replaced, lines = merge.resolve(0, TAKE_BOTH)
+    assert replaced == (1, 6) and lines == ["L", "R"]
+    assert merge.hunks[0].result == (1, 3) and merge.hunks[1].result == (6, 7)
+    assert merge.merged_text() == "a\nL\nR\nc\nd\ne\nF\ng"
+    merge.resolve(0, None)
+    assert merge.conflicts() == [0]
+    with pytest.raises(ValueError):
+        merge.resolve(0, "middle")
+
+
+@pytest.mark.parametrize("engine", sorted(DIFF_ENGINES))
+def test_resolutions_reproduce_each_text(engine):
+    """Test if taking one side, or the base, in every hunk gives back that text."""
+    rng = random.Random(23)
+    for _ in range(300):
+        left, right = random_version(rng, BASE), random_version(rng, BASE)
+        merge = ThreeWayMerge(BASE, left, right, diff_engine=engine)
+        for resolution, expected in ((TAKE_LEFT, left), (TAKE_RIGHT, right), (TAKE_BASE, BASE)):
+            for index in rng.sample(range(len(merge.hunks)), len(merge.hunks)):
+                merge.resolve(index, resolution)
+            assert merge.result == expected
+            assert [merge.hunk_at(hunk.result[0]) for hunk in merge.hunks] == list(range(len(merge.hunks)))
+
+
+def test_precomputed_opcodes():
+    """Test if opcodes computed elsewhere with the same engine give the same merge."""
+    left, right = ["a", "L", "c", "d", "e", "f", "g"], ["a", "b", "c", "d", "e", "f", "R"]
+    merge = ThreeWayMerge(BASE, left, right)
+    ids = [merge.diff_engine.interner.intern_lines(lines) for lines in (BASE, left, right)]
+    opcodes = (merge.diff_engine.get_opcodes(ids[0], ids[1]), merge.diff_engine.get_opcodes(ids[0], ids[2]))
+    again = ThreeWayMerge(BASE, left, right, merge.diff_engine, opcodes=opcodes)
+    assert again.result == merge.result == ["a", "L", "c", "d", "e", "f", "R"]
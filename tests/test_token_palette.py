@@ -0,0 +1,52 @@
+import pytest
+from pygments.token import Token
+from PySide6.QtGui import QFont, QTextDocument
+from PySide6.QtWidgets import QApplication
+
+from app.widgets.pygments_highlighter import PygmentsHighlighter
+from app.widgets.token_palette import DEFAULT_THEME, TokenPalette, default_palette
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Fixture to create a QApplication instance."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
+    return app
+
+
+def test_styled_token_types(app):
+    """Test if the theme entries are turned into formats."""
+    palette = TokenPalette()
+    keyword = palette.format_for(Token.Keyword)
+    assert keyword.foreground().color().name() == "#ff79c6"
+    assert keyword.fontWeight() == QFont.Bold
+    assert palette.format_for(Token.Comment).fontItalic() is True
+
+
+def test_child_token_types_inherit_parent_format(app):
+    """Test if a token type without an entry uses the format of its parent."""
+    palette = TokenPalette()
+    assert palette.format_for(Token.Keyword.Constant) is palette.format_for(Token.Keyword)
+    assert palette.format_for(Token.String.Doc) is palette.format_for(Token.String)
+    assert palette.format_for(Token.Name) is None
+    assert palette.format_for(Token.Text) is None
+
+
+def test_reload_replaces_formats(app, qtbot):
+    """Test if reloading the theme rebuilds the formats and notifies listeners."""
+    palette = TokenPalette()
+    old_format = palette.format_for(Token.String.Double)
+    with qtbot.waitSignal(palette.theme_changed):
+        palette.reload({**DEFAULT_THEME, Token.String: ("#00ff00", False, False)})
+    new_format = palette.format_for(Token.String.Double)
+    assert new_format is not old_format
+    assert new_format.foreground().color().name() == "#00ff00"
+
+
+def test_default_palette_is_shared(app):
+    """Test if highlighters share the default palette."""
+    first = PygmentsHighlighter(QTextDocument())
+    second = PygmentsHighlighter(QTextDocument())
+    assert first.palette is second.palette is default_palette()
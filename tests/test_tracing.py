@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app.core.tracing import PAINT, Tracer, default_tracer, set_default_tracer, traced
+
+
+@pytest.fixture
+def tracer():
+    """Installs an enabled, recording tracer for the duration of a test."""
+    previous = default_tracer()
+    tracer = Tracer(enabled=True, record=True, history=3)
+    set_default_tracer(tracer)
+    yield tracer
+    set_default_tracer(previous)
+
+
+@traced("square", PAINT)
+def square(value):
+    """Instrumented function used by the tests."""
+    return value * value
+
+
+def test_disabled_tracer_records_nothing():
+    """Test if instrumented functions run untouched while tracing is off."""
+    tracer = Tracer()
+    previous = default_tracer()
+    set_default_tracer(tracer)
+    try:
+        assert square(3) == 9
+        with tracer.span("block"):
+            pass
+        tracer.count("calls")
+    finally:
+        set_default_tracer(previous)
+    assert tracer.summary() == {}
+    assert tracer.counters == {}
+    assert tracer.events == []
+
+
+def test_traced_function(tracer):
+    """Test if calls of an instrumented function become complete events."""
+    assert square(4) == 16
+    assert square.__name__ == "square"
+    event, = tracer.events
+    assert (event["name"], event["cat"], event["ph"]) == ("square", PAINT, "X")
+    assert event["dur"] >= 0
+    assert tracer.summary()["square"]["count"] == 1
+
+
+def test_span_of_failing_code(tracer):
+    """Test if a span is recorded even when its body raises."""
+    with pytest.raises(KeyError):
+        with tracer.span("lookup", lines=2):
+            raise KeyError("missing")
+    assert tracer.events[0]["args"] == {"lines": 2}
+
+
+def test_history(tracer):
+    """Test if only the most recent durations are kept per name."""
+    for _ in range(5):
+        square(2)
+    assert len(tracer.recent("square")) == 3
+    summary = tracer.summary()["square"]
+    assert summary["count"] == 3
+    assert summary["max"] >= summary["mean"] >= 0
+    assert tracer.recent("unknown") == []
+
+
+def test_counters(tracer):
+    """Test if counters add up and are traced as counter events."""
+    tracer.count("spans", 4)
+    tracer.count("spans", 2)
+    assert tracer.counters == {"spans": 6}
+    assert [event["args"]["spans"] for event in tracer.events if event["ph"] == "C"] == [4, 6]
+
+
+def test_write(tracer, tmp_path):
+    """Test if the events are written as a Chrome trace file."""
+    square(5)
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+    trace = json.loads(path.read_text())
+    assert [event["name"] for event in trace["traceEvents"]] == ["square"]
+    tracer.clear()
+    assert tracer.events == [] and tracer.summary() == {}
+
+
+def test_slow_spans_are_logged(caplog):
+    """Test if spans over the threshold are logged as warnings."""
+    tracer = Tracer(enabled=True, slow_ms=0)
+    with caplog.at_level("WARNING", logger="app.app_logger"):
+        tracer.add_span("diff", "diff", 0, 5_000_000)
+    assert "Slow diff: 5.0 ms" in caplog.text